@@ -1,17 +1,24 @@
 """
 Streamlitアプリ - メインファイル（処理の流れのみ）
 """
+import os
+import random
+import uuid
 import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
 # 新しいレイヤー構造をインポート
-from infra.db import init_db, get_player_stats, update_exp, DatabaseRepository
+from infra.db import DatabaseRepository
+from infra.exp_buffer import BufferedExpRepository
 from infra.data_fetcher import StockDataFetcher
+from infra.dataset_registry import DatasetKey, DatasetRegistry
+from infra.scenario_pack import ScenarioPack
+from infra.synthetic import synthetic_fetcher
 from domain.models import Portfolio
 from domain.exp import calc_exp_gain, calc_profit_bonus_exp
 from domain.trading import calculate_portfolio_value, execute_buy, execute_sell
-from domain.calculations import calculate_price_change, prepare_display_data
+from domain.calculations import DISPLAY_HISTORY_DAYS, prepare_display_data
 from ui.sidebar import (
     render_control_sidebar,
     render_display_period_selector,
@@ -19,10 +26,12 @@ from ui.sidebar import (
     render_trading_sidebar,
     render_equipment_sidebar,
     render_skip_buttons_sidebar,
+    render_scenario_sidebar,
     render_debug_sidebar
 )
 from ui.hud import render_hud, render_metrics
 from ui.chart_display import render_chart
+from domain.chart_session import ChartSession
 from ui.level_up_handler import handle_level_up_ui
 
 # ページ設定
@@ -39,7 +48,7 @@ def init_session_state():
             "current_date": None,
             "start_date": None,
             "end_date": None,
-            "stock_data": None
+            "dataset_key": None  # 共有データセットのハンドル（株価データ本体はセッションに持たない）
         }
 
     # portfolio_state: ポートフォリオに関する状態
@@ -64,7 +73,8 @@ def init_session_state():
             "needs_levelup_toast": False,
             "levelup_toast_message": "",
             "sma_25_enabled": False,
-            "sma_75_enabled": False
+            "sma_75_enabled": False,
+            "indicators_enabled": {}
         }
 
     _sync_session_state()
@@ -77,11 +87,6 @@ def _sync_session_state():
     else:
         st.session_state.game_state["current_date"] = st.session_state.current_date
 
-    if "stock_data" not in st.session_state:
-        st.session_state.stock_data = st.session_state.game_state.get("stock_data")
-    else:
-        st.session_state.game_state["stock_data"] = st.session_state.stock_data
-
     if "start_date" not in st.session_state:
         st.session_state.start_date = st.session_state.game_state.get("start_date")
     else:
@@ -151,63 +156,130 @@ init_session_state()
 # ============================================================================
 # データベース接続
 # ============================================================================
-if "db_conn" not in st.session_state:
-    st.session_state.db_conn = init_db()
+@st.cache_resource
+def get_db_repository() -> DatabaseRepository:
+    """プロセス全体で共有するリポジトリ（接続プールとステータスのキャッシュはスレッドセーフ）"""
+    return DatabaseRepository()
+
+
+@st.cache_resource
+def get_player_repository(player_id: str) -> BufferedExpRepository:
+    """プレイヤーごとに共有するリポジトリ（同じプレイヤーのタブ同士で経験値のバッファを共有する）"""
+    return BufferedExpRepository(get_db_repository(), player_id=player_id)
+
+
+def get_player_id() -> str:
+    """
+    URLのクエリパラメータ ?player= でプレイヤーを識別する
+
+    ない場合は新しいIDを発行してURLに載せる（同じURLを開けば進行状況を引き継げる）。
+    """
+    if "player_id" not in st.session_state:
+        player_id = st.query_params.get("player")
+        if not player_id:
+            player_id = uuid.uuid4().hex
+            st.query_params["player"] = player_id
+        st.session_state.player_id = player_id
+    return st.session_state.player_id
+
+db_repo = get_player_repository(get_player_id())
 
 # ============================================================================
 # データ取得（キャッシュ化）
 # ============================================================================
-@st.cache_data
-def fetch_stock_data(ticker: str, year: int, days_before_start: int = 220):
+@st.cache_resource
+def get_dataset_registry() -> DatasetRegistry:
     """
-    株価データを取得する（キャッシュ化）
+    プロセス全体で共有するデータセットのレジストリ
 
-    Args:
-        ticker: ティッカーシンボル
-        year: 取得する年
-        days_before_start: 開始日の何日前から取得するか
-
-    Returns:
-        Tuple[DataFrame, start_date, end_date]: (データ, 開始日, 終了日)
+    株価データと計算済みの指標は銘柄・年ごとに1つだけ保持し、セッションはハンドルだけを持つ。
     """
-    data_fetcher = StockDataFetcher()
-    return data_fetcher.fetch_data(ticker, year, days_before_start=days_before_start)
+    # TIME_LEAP_SYNTHETIC=<シード> の場合は合成データで遊ぶ（ネットワーク不要）
+    # TIME_LEAP_OFFLINE=1 の場合はネットワークに接続せず、ディスクキャッシュのみを使う
+    # TIME_LEAP_COMPACT=1 の場合はディスクキャッシュをコンパクトな型で保存する
+    synthetic_seed = os.environ.get("TIME_LEAP_SYNTHETIC")
+    if synthetic_seed:
+        fetcher = synthetic_fetcher(int(synthetic_seed))
+    else:
+        fetcher = StockDataFetcher(
+            offline=os.environ.get("TIME_LEAP_OFFLINE") == "1",
+            compact=os.environ.get("TIME_LEAP_COMPACT") == "1"
+        )
+    # TIME_LEAP_SCENARIO_PACKS にシナリオパックのパスを指定すると、ランダムなシナリオで開始する
+    pack_paths = os.environ.get("TIME_LEAP_SCENARIO_PACKS", "").split(os.pathsep)
+    packs = [ScenarioPack(path) for path in pack_paths if path and os.path.exists(path)]
+    return DatasetRegistry(fetcher, packs=packs)
+
+# シナリオパックがない場合に遊ぶ銘柄・年
+DEFAULT_TICKER = "7203.T"
+DEFAULT_YEAR = 2024
+
+# TIME_LEAP_BINARY_CHART=1 の場合はチャートを型付き配列（日付は整数、価格は float32）で送る
+BINARY_CHART = os.environ.get("TIME_LEAP_BINARY_CHART") == "1"
 
-ticker = "7203.T"
-year = 2024
+dataset_registry = get_dataset_registry()
+scenario_keys = dataset_registry.scenario_keys()
+dataset = None
 
-if st.session_state.stock_data is None:
+
+def choose_dataset_key() -> DatasetKey:
+    """新しいゲームのデータセット（シナリオパックがある場合はランダムに選ぶ）"""
+    if scenario_keys:
+        return random.choice(scenario_keys)
+    # 最長の表示期間でも開始日から表示できるだけの履歴を持たせる（表示期間はこの1つから切り出す）
+    return DatasetKey(DEFAULT_TICKER, DEFAULT_YEAR, days_before_start=DISPLAY_HISTORY_DAYS)
+
+
+if st.session_state.game_state.get("dataset_key") is None:
     with st.spinner("データを取得中..."):
-        data, start_date, end_date = fetch_stock_data(ticker, year, days_before_start=220)
-
-        if data is not None:
-            st.session_state.stock_data = data
-            st.session_state.start_date = start_date
-            st.session_state.end_date = end_date
-            st.session_state.current_date = start_date
-            st.session_state.game_state["stock_data"] = data
-            st.session_state.game_state["start_date"] = start_date
-            st.session_state.game_state["end_date"] = end_date
-            st.session_state.game_state["current_date"] = start_date
+        dataset_key = choose_dataset_key()
+        dataset = dataset_registry.get(dataset_key)
+
+        if dataset is not None:
+            st.session_state.start_date = dataset.start_date
+            st.session_state.end_date = dataset.end_date
+            st.session_state.current_date = dataset.start_date
+            st.session_state.game_state["dataset_key"] = dataset_key
+            st.session_state.game_state["start_date"] = dataset.start_date
+            st.session_state.game_state["end_date"] = dataset.end_date
+            st.session_state.game_state["current_date"] = dataset.start_date
         else:
             st.error("データの取得に失敗しました。")
+else:
+    dataset = dataset_registry.get(st.session_state.game_state["dataset_key"])
+    if dataset is None:
+        st.error("データの取得に失敗しました。")
 
 # ============================================================================
 # メイン処理
 # ============================================================================
-if st.session_state.stock_data is not None and st.session_state.current_date is not None:
-    data = st.session_state.stock_data
+if dataset is not None and st.session_state.current_date is not None:
+    data = dataset.data
     current_date = st.session_state.current_date
     start_date = st.session_state.start_date
     end_date = st.session_state.end_date
 
+    # 営業日カレンダー・SMA・テクニカル指標は全セッションで共有する（計算済み・読み取り専用）
+    calendar = dataset.calendar
+    sma_engine = dataset.sma_engine
+    indicator_library = dataset.indicator_library
+
+    # ゲーム終了時は溜めた経験値をすぐに書き込む
+    if current_date >= end_date:
+        db_repo.flush()
+
     # ========================================================================
     # サイドバー: 表示期間選択
     # ========================================================================
     display_business_days = render_display_period_selector()
 
     # 表示データの準備（純粋関数）
-    display_data, sma_calc_data = prepare_display_data(data, current_date, start_date, display_business_days=display_business_days)
+    display_data, sma_calc_data = prepare_display_data(data, current_date, start_date, display_business_days=display_business_days, calendar=calendar)
+    # 価格の参照はDataFrameではなくNumPy配列の系列で行う
+    # 現在日の前日比・高安値などは計算済みの派生指標テーブルから1行取り出すだけ
+    series = dataset.series
+    current_position = calendar.position_of(current_date)
+    current_row = dataset.metrics.row(current_position) if current_position >= 0 else None
 
     # ========================================================================
     # サイドバー: コントロール
@@ -216,9 +288,9 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
 
     if control_action == "prev":
         if current_date > start_date:
-            prev_data = data[data.index.date < current_date]
-            if not prev_data.empty:
-                st.session_state.current_date = prev_data.index[-1].date()
+            prev_date = calendar.previous(current_date)
+            if prev_date is not None:
+                st.session_state.current_date = prev_date
                 st.session_state.game_state["current_date"] = st.session_state.current_date
                 st.rerun()
 
@@ -240,27 +312,25 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
         st.session_state.ui_state["level_up_toast_shown"] = False
         st.session_state.ui_state["needs_levelup_toast"] = False
         st.session_state.ui_state["levelup_toast_message"] = ""
-        db_repo = DatabaseRepository()
         db_repo.reset_player_stats()
         st.rerun()
 
     elif control_action == "next":
         if current_date < end_date:
-            next_data = data[data.index.date > current_date]
-            if not next_data.empty:
-                current_price_before = display_data.loc[display_data.index[-1], 'Close'] if not display_data.empty else 0
+            next_date = calendar.advance(current_date, 1)
+            if next_date is not None:
+                current_price_before = current_row.close if current_row is not None else 0
                 current_total_before = st.session_state.cash + (st.session_state.shares * current_price_before)
 
-                st.session_state.current_date = next_data.index[0].date()
+                st.session_state.current_date = next_date
                 st.session_state.game_state["current_date"] = st.session_state.current_date
 
-                new_display_data = data[data.index.date <= st.session_state.current_date]
-                new_current_price = new_display_data.loc[new_display_data.index[-1], 'Close'] if not new_display_data.empty else 0
+                new_current_price = series.close_at(calendar.position_of(next_date))
                 new_total_value = st.session_state.cash + (st.session_state.shares * new_current_price)
 
                 exp_to_add = calc_exp_gain(st.session_state.prev_total_value, new_total_value, rate=0.0001)
                 if exp_to_add > 0:
-                    result = update_exp(st.session_state.db_conn, exp_to_add)
+                    result = db_repo.update_exp(exp_to_add)
                     if result and result['level_up']:
                         st.success(f"🎉 レベルアップ！ レベル {result['old_level']} → レベル {result['level']} になりました！")
                         handle_level_up_ui(result)
@@ -277,29 +347,22 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
         if current_date >= end_date:
             return
 
-        future_data = data[data.index.date > current_date]
-        if future_data.empty:
+        new_date = calendar.advance(current_date, days_to_advance)
+        if new_date is None:
             return
 
-        available_dates = list(future_data.index.date)
-        if len(available_dates) >= days_to_advance:
-            new_date = available_dates[days_to_advance - 1]
-        else:
-            new_date = end_date
-
-        current_price_before = display_data.loc[display_data.index[-1], 'Close'] if not display_data.empty else 0
+        current_price_before = current_row.close if current_row is not None else 0
         current_total_before = st.session_state.cash + (st.session_state.shares * current_price_before)
 
         st.session_state.current_date = new_date
         st.session_state.game_state["current_date"] = new_date
 
-        new_display_data = data[data.index.date <= st.session_state.current_date]
-        new_current_price = new_display_data.loc[new_display_data.index[-1], 'Close'] if not new_display_data.empty else 0
+        new_current_price = series.close_at(calendar.position_of(new_date))
         new_total_value = st.session_state.cash + (st.session_state.shares * new_current_price)
 
         exp_to_add = calc_exp_gain(st.session_state.prev_total_value, new_total_value, rate=0.0001)
         if exp_to_add > 0:
-            result = update_exp(st.session_state.db_conn, exp_to_add)
+            result = db_repo.update_exp(exp_to_add)
             if result and result['level_up']:
                 st.success(f"🎉 レベルアップ！ レベル {result['old_level']} → レベル {result['level']} になりました！")
                 handle_level_up_ui(result)
@@ -315,16 +378,34 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
     if skip_days:
         advance_date(skip_days)
 
+    # ========================================================================
+    # サイドバー: シナリオ
+    # ========================================================================
+    if render_scenario_sidebar(len(scenario_keys)):
+        # 新しいシナリオで始め直す（プレイヤーのレベルはそのまま）
+        st.session_state.game_state["dataset_key"] = None
+        st.session_state.cash = 1000000
+        st.session_state.shares = 0
+        st.session_state.buy_dates = []
+        st.session_state.prev_total_value = 1000000
+        st.session_state.portfolio_state = {
+            "cash": 1000000,
+            "shares": 0,
+            "buy_dates": [],
+            "prev_total_value": 1000000
+        }
+        st.rerun()
+
     # ========================================================================
     # サイドバー: デバッグ
     # ========================================================================
     if render_debug_sidebar():
-        result = update_exp(st.session_state.db_conn, 100)
+        result = db_repo.update_exp(100)
         if result and result['level_up']:
             st.success(f"🎉 レベルアップ！ レベル {result['old_level']} → レベル {result['level']} になりました！")
             handle_level_up_ui(result)
         else:
-            player_stats = get_player_stats(st.session_state.db_conn)
+            player_stats = db_repo.get_player_stats()
             st.sidebar.info(f"経験値 +100 獲得！ (現在のレベル: {player_stats['level']})")
         st.rerun()
 
@@ -337,7 +418,7 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
     # サイドバー: 取引
     # ========================================================================
     if not display_data.empty:
-        current_price = display_data.loc[display_data.index[-1], 'Close']
+        current_price = current_row.close
         trading_action = render_trading_sidebar(current_price, current_date, st.session_state.shares)
 
         if trading_action == "buy":
@@ -371,7 +452,7 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
             total_value_after = new_portfolio.cash
             exp_bonus = calc_profit_bonus_exp(profit, rate=0.001)
             if exp_bonus > 0:
-                result = update_exp(st.session_state.db_conn, exp_bonus)
+                result = db_repo.update_exp(exp_bonus)
                 if result and result['level_up']:
                     st.success(f"🎉 レベルアップ！ レベル {result['old_level']} → レベル {result['level']} になりました！")
                     handle_level_up_ui(result)
@@ -387,22 +468,24 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
     # ========================================================================
     # サイドバー: 装備設定
     # ========================================================================
-    player_stats = get_player_stats(st.session_state.db_conn)
+    player_stats = db_repo.get_player_stats()
     equipment_state = render_equipment_sidebar(
         player_stats['level'],
         st.session_state.get("sma_25_enabled", False),
-        st.session_state.get("sma_75_enabled", False)
+        st.session_state.get("sma_75_enabled", False),
+        st.session_state.ui_state.get("indicators_enabled", {})
     )
     st.session_state.sma_25_enabled = equipment_state['sma_25_enabled']
     st.session_state.sma_75_enabled = equipment_state['sma_75_enabled']
     st.session_state.ui_state["sma_25_enabled"] = equipment_state['sma_25_enabled']
     st.session_state.ui_state["sma_75_enabled"] = equipment_state['sma_75_enabled']
+    st.session_state.ui_state["indicators_enabled"] = equipment_state['indicators']
 
     # ========================================================================
     # メイン表示エリア
     # ========================================================================
     if not display_data.empty:
-        current_price = display_data.loc[display_data.index[-1], 'Close']
+        current_price = current_row.close
         total_value = calculate_portfolio_value(
             Portfolio(
                 cash=st.session_state.cash,
@@ -429,17 +512,18 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
         )
 
         # メトリクス表示
-        latest_data = display_data.iloc[-1]
-        change, change_pct = calculate_price_change(display_data)
-        render_metrics(
-            current_price=latest_data.loc['Close'],
-            change=change,
-            change_pct=change_pct,
-            high=latest_data.loc['High'],
-            low=latest_data.loc['Low']
-        )
-
-        # チャート表示
+        render_metrics(current_row)
+
+        # チャート表示（チャートの状態はセッションに持ち、データセットが変わったら作り直す）
+        chart_session = st.session_state.get("chart_session")
+        if chart_session is None or chart_session.series is not series:
+            chart_session = ChartSession(
+                series,
+                non_trading_days=dataset.non_trading_days,
+                pyramid=dataset.pyramid,
+                arrays=dataset.chart_arrays
+            )
+            st.session_state.chart_session = chart_session
         render_chart(
             display_data=display_data,
             buy_dates=st.session_state.buy_dates,
@@ -448,8 +532,13 @@ if st.session_state.stock_data is not None and st.session_state.current_date is
             sma_calc_data=sma_calc_data,
             player_level=player_stats['level'],
             current_date=current_date,
-            year=year,
-            ticker=ticker
+            year=dataset.key.year,
+            ticker=dataset.key.ticker,
+            sma_engine=sma_engine,
+            indicator_library=indicator_library,
+            indicators_enabled=st.session_state.ui_state.get("indicators_enabled", {}),
+            chart_session=chart_session,
+            binary=BINARY_CHART
         )
     else:
         st.warning("表示するデータがありません。")
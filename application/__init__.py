@@ -4,8 +4,11 @@
 
 from .game_service import GameService
 from .trading_service import TradingService
+from .simulation import HeadlessGame, run_batch
 
 __all__ = [
     'GameService',
     'TradingService',
+    'HeadlessGame',
+    'run_batch',
 ]
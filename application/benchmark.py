@@ -0,0 +1,223 @@
+"""
+合成データによるベンチマーク（ネットワーク不要）
+
+データ量を変えながら、データ生成・表示データの準備・チャート生成・シミュレーションの
+処理時間を計測する。--payload を指定した場合は、表示期間の本数ごとにチャートの送信量
+（JSONのバイト数）とシリアライズ時間を、通常の形式と型付き配列の形式（binary=True）で比べる。
+
+使い方:
+    python -m application.benchmark --rows 1000,100000,1000000,10000000
+    python -m application.benchmark --payload 60,250,2500
+"""
+import argparse
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from domain.calculations import calculate_sma_for_display, prepare_display_data
+from domain.chart import LINE_POINT_BUDGET, create_candlestick_chart, lttb_indices
+from domain.chart_session import ChartSession
+from domain.moving_average import MovingAverageEngine
+from domain.price_series import PriceSeries
+from domain.trading_calendar import TradingCalendar, to_day_ordinal
+from infra.synthetic import generate_ohlcv
+from .simulation import BuyAndHoldStrategy, run_strategy
+
+
+# チャート（pandasのナノ秒単位のTimestamp）で扱える範囲の最後の日
+# これより後の営業日は「現在日」にしない（表示データの切り出しは位置ベースなので計測結果は変わらない）
+_LAST_DATE = date(2262, 1, 1)
+
+# チャートのタイトルに出す銘柄名
+_TICKER = "SYNTH"
+
+
+def _timeit(fn: Callable[[], object], repeat: int = 1) -> float:
+    """fn の1回あたりの実行時間（秒、repeat 回の最小値）"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def benchmark_rows(
+    rows: int,
+    seed: int = 0,
+    display_business_days: int = 250,
+    simulation_days: int = 500,
+    repeat: int = 5
+) -> Dict[str, float]:
+    """
+    rows 本のデータで各処理の時間を計測する
+
+    Returns:
+        dict: 処理ごとの時間（ミリ秒。シミュレーションは1日あたりのマイクロ秒）
+    """
+    started = time.perf_counter()
+    data = generate_ohlcv(rows, seed=seed, start=date(1970, 1, 5))
+    generate_ms = (time.perf_counter() - started) * 1000
+
+    calendar_ms = _timeit(lambda: TradingCalendar.from_index(data.index)) * 1000
+    calendar = TradingCalendar.from_index(data.index)
+    engine = MovingAverageEngine.from_data(data)
+
+    # 計測に使う「現在日」（データの最後、ただし _LAST_DATE まで）
+    position = min(rows, int(np.searchsorted(calendar.ordinals, to_day_ordinal(_LAST_DATE), side='right'))) - 1
+    current_date = calendar.date_at(position)
+    start_date = calendar.date_at(max(0, position - simulation_days))
+
+    prepare_ms = _timeit(
+        lambda: prepare_display_data(data, current_date, start_date, display_business_days, calendar=calendar),
+        repeat
+    ) * 1000
+    display_data, sma_calc_data = prepare_display_data(
+        data, current_date, start_date, display_business_days, calendar=calendar
+    )
+    sma_ms = _timeit(lambda: calculate_sma_for_display(sma_calc_data, display_data, engine=engine), repeat) * 1000
+    sma_25, sma_75 = calculate_sma_for_display(sma_calc_data, display_data, engine=engine)
+    chart_ms = _timeit(
+        lambda: create_candlestick_chart(
+            display_data, [], True, True, sma_25, sma_75,
+            player_level=5, current_date=current_date, year=current_date.year, ticker=_TICKER
+        ),
+        repeat
+    ) * 1000
+
+    # 全期間の終値の折れ線をLTTBで間引く時間
+    series = PriceSeries.from_frame(data)
+    lttb_ms = _timeit(lambda: lttb_indices(series.ordinals, series.close, LINE_POINT_BUDGET), repeat) * 1000
+
+    # チャートの差分更新: 1営業日ずつ進めたときの1回あたりの時間
+    session = ChartSession(series)
+    end = position + 1
+    start = max(0, end - display_business_days - repeat)
+    session.update(start, start + display_business_days, [], 5, calendar.date_at(start), current_date.year,
+                   _TICKER, sma_windows=(25, 75), sma_engine=engine)
+    steps = range(start + 1, end - display_business_days + 1)
+
+    def advance_chart():
+        for first in steps:
+            last = first + display_business_days
+            session.update(first, last, [], 5, calendar.date_at(last - 1), current_date.year,
+                           _TICKER, sma_windows=(25, 75), sma_engine=engine)
+
+    chart_update_ms = _timeit(advance_chart) * 1000 / max(1, len(steps))
+
+    started = time.perf_counter()
+    result = run_strategy(data, start_date, BuyAndHoldStrategy(), end_date=current_date, calendar=calendar)
+    simulation_us = (time.perf_counter() - started) * 1e6 / max(1, result.days_played)
+
+    return {
+        'rows': rows,
+        'generate_ms': generate_ms,
+        'bars_per_sec': rows / (generate_ms / 1000),
+        'calendar_ms': calendar_ms,
+        'prepare_display_ms': prepare_ms,
+        'sma_ms': sma_ms,
+        'chart_ms': chart_ms,
+        'chart_update_ms': chart_update_ms,
+        'lttb_ms': lttb_ms,
+        'simulation_us_per_day': simulation_us,
+    }
+
+
+def run_benchmarks(sizes: Sequence[int], seed: int = 0, repeat: int = 5) -> pd.DataFrame:
+    """データ量ごとにベンチマークを実行して表にまとめる"""
+    rows: List[Dict[str, float]] = [benchmark_rows(size, seed=seed, repeat=repeat) for size in sizes]
+    return pd.DataFrame(rows)
+
+
+def benchmark_chart_payload(
+    windows: Sequence[int],
+    player_level: int = 5,
+    seed: int = 0,
+    repeat: int = 5
+) -> pd.DataFrame:
+    """
+    表示期間の本数ごとに、チャートの送信量とシリアライズ時間（Figureの作成 + to_json）を比べる
+
+    session_* の列はアプリと同じ ChartSession のテンプレート（長い期間は週足・月足）の
+    送信量と to_json だけの時間（テンプレートの更新は含まない）。
+
+    Args:
+        windows: 表示期間の本数
+        player_level: チャートのレベル（Lv.5はローソク足 + SMA 2本）
+
+    Returns:
+        pd.DataFrame: 本数ごとの JSON / 型付き配列 のバイト数と時間（ミリ秒）
+    """
+    largest = max(windows)
+    data = generate_ohlcv(largest + 100, seed=seed, start=date(2000, 1, 3))
+    engine = MovingAverageEngine.from_data(data)
+    series = PriceSeries.from_frame(data)
+    rows: List[Dict[str, float]] = []
+    for window in windows:
+        display_data = data.iloc[-window:]
+        sma_25, sma_75 = calculate_sma_for_display(data, display_data, engine=engine)
+        current_date = display_data.index[-1].date()
+
+        def serialize(binary: bool) -> str:
+            return create_candlestick_chart(
+                display_data, [display_data.index[-1].date()], True, True, sma_25, sma_75,
+                player_level=player_level, current_date=current_date, year=current_date.year, ticker=_TICKER,
+                binary=binary
+            ).to_json()
+
+        sessions = {}
+        for binary in (False, True):
+            session = ChartSession(series)
+            session.update(
+                len(series) - window, len(series), [current_date], player_level, current_date,
+                current_date.year, _TICKER, sma_windows=(25, 75), sma_engine=engine, binary=binary
+            )
+            sessions[binary] = session.figure
+
+        json_bytes = len(serialize(False).encode('utf-8'))
+        binary_bytes = len(serialize(True).encode('utf-8'))
+        session_json_bytes = len(sessions[False].to_json().encode('utf-8'))
+        session_binary_bytes = len(sessions[True].to_json().encode('utf-8'))
+        rows.append({
+            'bars': window,
+            'json_bytes': json_bytes,
+            'binary_bytes': binary_bytes,
+            'bytes_ratio': binary_bytes / json_bytes,
+            'json_ms': _timeit(lambda: serialize(False), repeat) * 1000,
+            'binary_ms': _timeit(lambda: serialize(True), repeat) * 1000,
+            'session_json_bytes': session_json_bytes,
+            'session_binary_bytes': session_binary_bytes,
+            'session_bytes_ratio': session_binary_bytes / session_json_bytes,
+            'session_json_ms': _timeit(sessions[False].to_json, repeat) * 1000,
+            'session_binary_ms': _timeit(sessions[True].to_json, repeat) * 1000,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="合成データによるベンチマーク")
+    parser.add_argument('--rows', default="1000,10000,100000,1000000,10000000", help="データの本数（カンマ区切り）")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help="各処理の計測回数（最小値を採用）")
+    parser.add_argument('--out', default=None, help="結果のCSVの出力先")
+    parser.add_argument('--payload', default=None, help="チャートの送信量を比べる表示期間の本数（カンマ区切り）")
+    parser.add_argument('--level', type=int, default=5, help="--payload で使うチャートのレベル")
+    args = parser.parse_args(argv)
+
+    if args.payload:
+        windows = [int(window) for window in args.payload.split(',') if window]
+        frame = benchmark_chart_payload(windows, player_level=args.level, seed=args.seed, repeat=args.repeat)
+    else:
+        sizes = [int(size) for size in args.rows.split(',') if size]
+        frame = run_benchmarks(sizes, seed=args.seed, repeat=args.repeat)
+    with pd.option_context('display.float_format', '{:,.3f}'.format, 'display.width', 200):
+        print(frame.to_string(index=False))
+    if args.out:
+        frame.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    main()
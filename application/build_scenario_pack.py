@@ -0,0 +1,98 @@
+"""
+シナリオパックの作成
+
+株価データのキャッシュから銘柄・年ごとのデータを集め、1つのシナリオパックに書き出す。
+
+使い方:
+    python -m application.build_scenario_pack --tickers 7203.T,6758.T,9984.T --years 2015-2024 \\
+        --out packs/jp_large_caps.tlpack
+"""
+import argparse
+from typing import List, Optional, Sequence
+
+from domain.calculations import DISPLAY_HISTORY_DAYS
+from infra.data_fetcher import StockDataFetcher
+from infra.scenario_pack import ScenarioPackWriter
+
+
+def build_pack(
+    fetcher: StockDataFetcher,
+    tickers: Sequence[str],
+    years: Sequence[int],
+    out: str,
+    days_before_start: int = DISPLAY_HISTORY_DAYS,
+    compact: bool = True
+) -> int:
+    """
+    シナリオパックを作成する
+
+    Args:
+        fetcher: 株価データの取得に使うフェッチャー（オフラインならキャッシュのみを使う）
+        tickers: ティッカーシンボルの一覧
+        years: 年の一覧
+        out: 出力先のパス
+        days_before_start: 開始日の何日前から収録するか
+        compact: Trueの場合はコンパクトな型で収録する（表示する値は変わらない）
+
+    Returns:
+        int: 収録した銘柄・年の数（0件の場合は out を書き換えない）
+    """
+    datasets = fetcher.fetch_many(tickers, years, days_before_start=days_before_start)
+    writer = ScenarioPackWriter(out, compact=compact)
+    try:
+        for (ticker, year), (data, start_date, end_date) in sorted(datasets.items()):
+            if data is None:
+                print(f"データがないためスキップします: {ticker} {year}")
+                continue
+            writer.add(ticker, year, days_before_start, data, start_date, end_date)
+    except BaseException:
+        writer.abort()
+        raise
+
+    count = len(writer)
+    if count == 0:
+        # 既存のパックを空のパックで置き換えない
+        writer.abort()
+    else:
+        writer.close()
+    return count
+
+
+def _parse_years(value: str) -> List[int]:
+    """"2015-2024" や "2020,2022" 形式の年の指定を展開する"""
+    years = []
+    for item in value.split(','):
+        if '-' in item:
+            first, last = item.split('-')
+            years.extend(range(int(first), int(last) + 1))
+        elif item:
+            years.append(int(item))
+    return years
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="株価データのキャッシュからシナリオパックを作成する")
+    parser.add_argument('--tickers', required=True, help="ティッカーシンボル（カンマ区切り）")
+    parser.add_argument('--years', required=True, help="年（例: 2015-2024 または 2020,2022）")
+    parser.add_argument(
+        '--days-before-start', type=int, default=DISPLAY_HISTORY_DAYS,
+        help="開始日の何日前から収録するか（既定はアプリの最長の表示期間に必要な日数）"
+    )
+    parser.add_argument('--online', action='store_true', help="キャッシュにないデータをダウンロードする")
+    parser.add_argument('--out', default="scenarios.tlpack", help="出力先")
+    parser.add_argument('--full-precision', action='store_true', help="コンパクトな型に詰めずに float64 のまま収録する")
+    args = parser.parse_args(argv)
+
+    fetcher = StockDataFetcher(offline=not args.online)
+    tickers = [ticker for ticker in args.tickers.split(',') if ticker]
+    count = build_pack(
+        fetcher, tickers, _parse_years(args.years), args.out,
+        days_before_start=args.days_before_start, compact=not args.full_precision
+    )
+    if count == 0:
+        parser.error("収録できるデータがありません。")
+    print(f"{count}件のシナリオを {args.out} に保存しました。")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+経験値ルール・レベル曲線のパラメータスイープ
+
+経験値レート・利確ボーナスレート・レベル曲線（種類と係数）の組み合わせごとに、
+複数の銘柄・年と戦略の典型パターンでゲームをシミュレーションし、
+レベル到達までの日数の分布と SMA25 / SMA75 の解放日を表にまとめる。
+
+使い方:
+    python -m application.exp_sweep --tickers 7203.T,6758.T --years 2022,2023,2024 \\
+        --exp-rates 0.0001,0.0002 --bonus-rates 0.001 --curves linear,quadratic --curve-bases 25,50 \\
+        --strategies buy_and_hold,sma_crossover,dip_buyer --out sweep.csv
+"""
+import argparse
+import itertools
+from datetime import date
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from domain.exp import ExpParams
+from domain.indicators import SMA_UNLOCK_LEVELS
+from infra.data_fetcher import StockDataFetcher
+from .simulation import STRATEGY_ARCHETYPES, SimulationResult, SimulationTask, run_batch
+
+
+def build_tasks(
+    dataset_keys: Sequence[Hashable],
+    param_grid: Sequence[ExpParams],
+    strategies: Sequence[str],
+    seeds: int = 1
+) -> List[Tuple[Dict, SimulationTask]]:
+    """
+    パラメータ・データセット・戦略の全組み合わせのタスクを作る
+
+    Args:
+        dataset_keys: データセットのキー（(ticker, year)）
+        param_grid: 経験値ルールのパラメータの一覧
+        strategies: 戦略名（STRATEGY_ARCHETYPES のキー）
+        seeds: 乱数を使う戦略の試行回数（シード違い）
+
+    Returns:
+        List[Tuple[dict, SimulationTask]]: (結果表に載せる条件, タスク) のリスト
+    """
+    tasks = []
+    for params, key, strategy_name in itertools.product(param_grid, dataset_keys, strategies):
+        strategy_class = STRATEGY_ARCHETYPES[strategy_name]
+        # 乱数を使う戦略だけシードを変えて複数回試行する
+        for seed in range(seeds if strategy_name == 'random_trader' else 1):
+            strategy = strategy_class(seed=seed) if strategy_name == 'random_trader' else strategy_class()
+            tasks.append((_conditions(params, key, strategy_name, seed), SimulationTask(key, strategy, params)))
+    return tasks
+
+
+def _conditions(params: ExpParams, key: Hashable, strategy_name: str, seed: int) -> Dict:
+    """結果表に載せる条件"""
+    ticker, year = key
+    return {
+        'exp_rate': params.exp_rate,
+        'profit_bonus_rate': params.profit_bonus_rate,
+        'curve': params.curve,
+        'curve_base': params.curve_base,
+        'ticker': ticker,
+        'year': year,
+        'strategy': strategy_name,
+        'seed': seed,
+    }
+
+
+def results_to_frame(
+    conditions: Sequence[Dict],
+    results: Sequence[SimulationResult],
+    max_level: int = 10
+) -> pd.DataFrame:
+    """
+    1ゲーム1行の結果表を作る
+
+    Args:
+        conditions: build_tasks() が返した条件
+        results: 条件と同じ順序のシミュレーション結果
+        max_level: 到達日数の列を作る最大レベル
+
+    Returns:
+        pd.DataFrame: 条件・最終レベル・レベルごとの到達日数・解放日の表
+    """
+    rows = []
+    for condition, result in zip(conditions, results):
+        reached_on = {level: reached for reached, level in result.level_ups}
+        row = dict(condition)
+        row.update({
+            'final_level': result.level,
+            'total_exp': result.total_exp_gained,
+            'profit_loss': result.profit_loss,
+            'trades': result.trades,
+            'days_played': result.days_played,
+            'sma25_unlock_date': reached_on.get(SMA_UNLOCK_LEVELS[25]),
+            'sma75_unlock_date': reached_on.get(SMA_UNLOCK_LEVELS[75]),
+        })
+        for level in range(2, max_level + 1):
+            row[f'days_to_lv{level}'] = result.days_to_level.get(level)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def summarize(frame: pd.DataFrame, max_level: int = 10) -> pd.DataFrame:
+    """
+    パラメータ・戦略ごとにレベル到達日数の分布をまとめる
+
+    Returns:
+        pd.DataFrame: レベルごとの到達率と到達日数の10/50/90パーセンタイル
+    """
+    group_columns = ['exp_rate', 'profit_bonus_rate', 'curve', 'curve_base', 'strategy']
+    summaries = []
+    for keys, group in frame.groupby(group_columns, sort=True):
+        row = dict(zip(group_columns, keys))
+        row['games'] = len(group)
+        row['final_level_median'] = group['final_level'].median()
+        for level in range(2, max_level + 1):
+            days = group[f'days_to_lv{level}'].dropna()
+            row[f'lv{level}_reach_rate'] = len(days) / len(group)
+            row[f'lv{level}_days_p10'] = days.quantile(0.1) if len(days) else None
+            row[f'lv{level}_days_p50'] = days.quantile(0.5) if len(days) else None
+            row[f'lv{level}_days_p90'] = days.quantile(0.9) if len(days) else None
+        summaries.append(row)
+    return pd.DataFrame(summaries)
+
+
+def load_datasets(
+    tickers: Sequence[str],
+    years: Sequence[int],
+    offline: bool = False
+) -> Dict[Hashable, Tuple[pd.DataFrame, date, Optional[date]]]:
+    """銘柄・年ごとの株価データを取得する（不足分はまとめてダウンロードし、ディスクキャッシュを使用）"""
+    fetcher = StockDataFetcher(offline=offline)
+    datasets = {}
+    for (ticker, year), (data, start_date, end_date) in fetcher.fetch_many(tickers, years).items():
+        if data is None:
+            print(f"データを取得できませんでした: {ticker} {year}")
+            continue
+        datasets[(ticker, year)] = (data, start_date, end_date)
+    return datasets
+
+
+def run_sweep(
+    datasets: Dict[Hashable, Tuple[pd.DataFrame, date, Optional[date]]],
+    param_grid: Sequence[ExpParams],
+    strategies: Sequence[str],
+    seeds: int = 1,
+    processes: Optional[int] = None,
+    max_level: int = 10
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    パラメータスイープを実行する
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: (1ゲーム1行の結果表, 集計表)
+    """
+    tasks = build_tasks(list(datasets.keys()), param_grid, strategies, seeds=seeds)
+    results = run_batch([task for _, task in tasks], datasets, processes=processes)
+    frame = results_to_frame([condition for condition, _ in tasks], results, max_level=max_level)
+    return frame, summarize(frame, max_level=max_level)
+
+
+def _parse_list(value: str, cast):
+    return [cast(item) for item in value.split(',') if item]
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = argparse.ArgumentParser(description="経験値ルール・レベル曲線のパラメータスイープ")
+    parser.add_argument('--tickers', default="7203.T")
+    parser.add_argument('--years', default="2024")
+    parser.add_argument('--exp-rates', default="0.0001")
+    parser.add_argument('--bonus-rates', default="0.001")
+    parser.add_argument('--curves', default="linear", help="レベル曲線の種類（linear, quadratic, exponential）")
+    parser.add_argument('--curve-bases', default="50", help="レベル曲線の係数")
+    parser.add_argument('--strategies', default=",".join(STRATEGY_ARCHETYPES))
+    parser.add_argument('--seeds', type=int, default=1, help="乱数を使う戦略の試行回数")
+    parser.add_argument('--processes', type=int, default=None, help="ワーカープロセス数（デフォルト: CPUコア数）")
+    parser.add_argument('--max-level', type=int, default=10)
+    parser.add_argument('--offline', action='store_true', help="ネットワークに接続せずキャッシュのみを使う")
+    parser.add_argument('--out', default="exp_sweep.csv", help="1ゲーム1行の結果表の出力先（集計表は *_summary.csv）")
+    args = parser.parse_args(argv)
+
+    curve_bases = _parse_list(args.curve_bases, int)
+    if any(base <= 0 for base in curve_bases):
+        parser.error("--curve-bases には正の値を指定してください。")
+    param_grid = [
+        ExpParams(exp_rate=exp_rate, profit_bonus_rate=bonus_rate, curve=curve, curve_base=curve_base)
+        for exp_rate, bonus_rate, curve, curve_base in itertools.product(
+            _parse_list(args.exp_rates, float),
+            _parse_list(args.bonus_rates, float),
+            _parse_list(args.curves, str),
+            curve_bases
+        )
+    ]
+    datasets = load_datasets(_parse_list(args.tickers, str), _parse_list(args.years, int), offline=args.offline)
+    if not datasets:
+        parser.error("シミュレーションできるデータがありません。")
+
+    frame, summary = run_sweep(
+        datasets,
+        param_grid,
+        _parse_list(args.strategies, str),
+        seeds=args.seeds,
+        processes=args.processes,
+        max_level=args.max_level
+    )
+
+    summary_path = args.out[:-4] + "_summary.csv" if args.out.endswith(".csv") else args.out + "_summary.csv"
+    frame.to_csv(args.out, index=False)
+    summary.to_csv(summary_path, index=False)
+    print(f"{len(frame)}ゲームの結果を {args.out} に、集計を {summary_path} に保存しました。")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,8 +14,9 @@ from infra.db import DatabaseRepository
 class GameService:
     """ゲーム進行を管理するサービス"""
 
-    def __init__(self, db_repo: DatabaseRepository):
+    def __init__(self, db_repo: DatabaseRepository, exp_rate: float = 0.0001):
         self.db_repo = db_repo
+        self.exp_rate = exp_rate  # 総資産増加に対する経験値レート（デフォルト: 0.01%）
 
     def advance_date(
         self,
@@ -37,33 +38,24 @@ class GameService:
         if game_state.stock_data is None or game_state.current_date is None:
             return game_state, portfolio, None
 
-        # 現在の日付より後のデータを取得
-        future_data = game_state.stock_data[
-            game_state.stock_data.index.date > game_state.current_date
-        ]
+        # 営業日を指定日数分進める（残りが足りない場合は最後の営業日）
+        calendar = game_state.get_calendar()
+        new_position = calendar.advance_position(game_state.current_date, days)
 
-        if future_data.empty:
+        if new_position is None:
             return game_state, portfolio, None
 
-        # 営業日を指定日数分進める
-        available_dates = list(future_data.index.date)
-        if len(available_dates) >= days:
-            new_date = available_dates[days - 1]
-        else:
-            new_date = game_state.end_date
+        new_date = calendar.date_at(new_position)
 
         # 新しい日付での総資産を計算
-        new_display_data = game_state.stock_data[
-            game_state.stock_data.index.date <= new_date
-        ]
-        new_current_price = new_display_data.loc[new_display_data.index[-1], 'Close'] if not new_display_data.empty else 0
+        new_current_price = game_state.close_at(new_position)
         new_total_value = calculate_portfolio_value(portfolio, new_current_price)
 
         # 経験値を計算・加算
         exp_to_add = calc_exp_gain(
             portfolio.prev_total_value,
             new_total_value,
-            rate=0.0001  # 0.01%
+            rate=self.exp_rate
         )
 
         level_up_result = None
@@ -75,7 +67,9 @@ class GameService:
             current_date=new_date,
             start_date=game_state.start_date,
             end_date=game_state.end_date,
-            stock_data=game_state.stock_data
+            stock_data=game_state.stock_data,
+            calendar=calendar,
+            dataset_key=game_state.dataset_key
         )
 
         new_portfolio = Portfolio(
@@ -104,7 +98,9 @@ class GameService:
             current_date=game_state.start_date,
             start_date=game_state.start_date,
             end_date=game_state.end_date,
-            stock_data=game_state.stock_data
+            stock_data=game_state.stock_data,
+            calendar=game_state.calendar,
+            dataset_key=game_state.dataset_key
         )
 
         new_portfolio = Portfolio(
@@ -0,0 +1,423 @@
+"""
+ヘッドレスなゲームシミュレーション（Streamlit・SQLite非依存）
+
+GameService / TradingService を画面なしで動かし、スクリプト化した戦略や
+記録済みの操作列から1ゲームを最後まで進める。多数のゲームをプロセスプールで
+並列実行することもできる（レベル曲線の調整やルール変更の回帰確認用）。
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from domain.exp import ExpParams, DEFAULT_EXP_PARAMS
+from domain.models import GameState, Portfolio, PlayerState
+from domain.trading import calculate_portfolio_value
+from domain.trading_calendar import TradingCalendar
+from infra.memory_repo import InMemoryRepository
+from .game_service import GameService
+from .trading_service import TradingService
+
+
+@dataclass
+class SimulationResult:
+    """1ゲーム分のシミュレーション結果"""
+    final_value: float
+    profit_loss: float
+    level: int
+    exp: int
+    total_exp_gained: int
+    days_played: int
+    trades: int
+    level_ups: List[Tuple[date, int]] = field(default_factory=list)  # (到達日, 到達レベル)
+    days_to_level: Dict[int, int] = field(default_factory=dict)  # {到達レベル: 到達までの営業日数}
+
+
+class HeadlessGame:
+    """
+    画面なしで1ゲームを進めるクラス
+
+    app.py のボタン操作（次の日・スキップ・買い・売り）と同じルールで
+    GameService / TradingService を呼び出す。経験値はメモリ上のリポジトリに保存する。
+    """
+
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        start_date: date,
+        end_date: Optional[date] = None,
+        calendar: Optional[TradingCalendar] = None,
+        repository: Optional[InMemoryRepository] = None,
+        initial_capital: int = 1000000,
+        params: ExpParams = DEFAULT_EXP_PARAMS
+    ):
+        calendar = calendar if calendar is not None else TradingCalendar.from_index(data.index)
+        self.repository = repository if repository is not None else InMemoryRepository(
+            curve=params.level_curve
+        )
+        self.game_service = GameService(self.repository, exp_rate=params.exp_rate)
+        self.trading_service = TradingService(self.repository, profit_bonus_rate=params.profit_bonus_rate)
+
+        self.game_state = GameState(
+            current_date=start_date,
+            start_date=start_date,
+            # データの最終日より後の終了日は最終日に揃える（それ以上は進めないので）
+            end_date=min(end_date, calendar.last_date) if end_date is not None else calendar.last_date,
+            stock_data=data,
+            calendar=calendar
+        )
+        self.portfolio = Portfolio(
+            cash=initial_capital,
+            shares=0,
+            buy_dates=[],
+            prev_total_value=initial_capital
+        )
+        self.player_state = PlayerState(initial_capital=initial_capital)
+
+        self._close = data['Close'].to_numpy()
+        self._start_position = calendar.position_of(start_date)
+        self._position = self._start_position
+        self.trades = 0
+        self.level_ups: List[Tuple[date, int]] = []
+        self.days_to_level: Dict[int, int] = {}
+
+    @property
+    def current_date(self) -> date:
+        return self.game_state.current_date
+
+    @property
+    def current_price(self) -> float:
+        return float(self._close[self._position])
+
+    @property
+    def position(self) -> int:
+        """現在の行位置"""
+        return self._position
+
+    def recent_closes(self, count: int) -> np.ndarray:
+        """現在の日を含む直近count本の終値（コピーなし）"""
+        return self._close[max(0, self._position + 1 - count):self._position + 1]
+
+    @property
+    def days_played(self) -> int:
+        return self._position - self._start_position
+
+    @property
+    def is_finished(self) -> bool:
+        """終了日に達したか、次の営業日のデータがない"""
+        game_state = self.game_state
+        return (
+            game_state.current_date >= game_state.end_date
+            or game_state.calendar.advance_position(game_state.current_date) is None
+        )
+
+    def _record_level_up(self, level_up_result: Optional[dict]):
+        """レベルアップした日と到達レベルを記録する"""
+        if level_up_result and level_up_result['level_up']:
+            for level in range(level_up_result['old_level'] + 1, level_up_result['level'] + 1):
+                self.level_ups.append((self.game_state.current_date, level))
+                self.days_to_level[level] = self.days_played
+
+    def advance(self, days: int = 1) -> Optional[dict]:
+        """営業日を進める（「次の日」「スキップ」ボタンと同じ）"""
+        if self.is_finished:
+            return None
+        self.game_state, self.portfolio, level_up_result = self.game_service.advance_date(
+            self.game_state, self.portfolio, days=days
+        )
+        self._position = self.game_state.calendar.position_of(self.game_state.current_date)
+        self._record_level_up(level_up_result)
+        return level_up_result
+
+    def buy(self) -> bool:
+        """買い注文（「買い」ボタンと同じ）"""
+        self.portfolio, shares, cost, success = self.trading_service.buy_stock(
+            self.portfolio, self.current_price, self.game_state.current_date
+        )
+        if success:
+            self.trades += 1
+        return success
+
+    def sell(self) -> Optional[dict]:
+        """売り注文（「売り」ボタンと同じ）"""
+        if self.portfolio.shares <= 0:
+            return None
+        self.portfolio, sold_shares, proceeds, profit, level_up_result = self.trading_service.sell_stock(
+            self.portfolio, self.current_price
+        )
+        self.trades += 1
+        self._record_level_up(level_up_result)
+        return level_up_result
+
+    def apply(self, action: str, days: int = 1):
+        """
+        操作名で1操作を実行する
+
+        Args:
+            action: "buy", "sell", "next", "skip" のいずれか
+            days: "skip" の場合に進める営業日数
+        """
+        if action == "buy":
+            self.buy()
+        elif action == "sell":
+            self.sell()
+        elif action == "next":
+            self.advance(1)
+        elif action == "skip":
+            self.advance(days)
+        else:
+            raise ValueError(f"不明な操作です: {action}")
+
+    def result(self) -> SimulationResult:
+        """現在の状態からシミュレーション結果を作成する"""
+        final_value = calculate_portfolio_value(self.portfolio, self.current_price)
+        stats = self.repository.get_player_stats()
+        return SimulationResult(
+            final_value=final_value,
+            profit_loss=final_value - self.player_state.initial_capital,
+            level=stats['level'],
+            exp=stats['exp'],
+            total_exp_gained=self.repository.total_exp_gained,
+            days_played=self.days_played,
+            trades=self.trades,
+            level_ups=list(self.level_ups),
+            days_to_level=dict(self.days_to_level)
+        )
+
+
+# ============================================================================
+# 戦略
+# ============================================================================
+
+class Strategy:
+    """
+    1営業日ごとに売買を決める戦略の基底クラス
+
+    サブクラスは decide() を実装する。プロセスプールで使うためpickle可能にしておくこと。
+    状態を持つ戦略があるため、1ゲームごとに新しいインスタンスを使う。
+    """
+
+    def decide(self, game: HeadlessGame) -> Optional[str]:
+        """
+        現在の日の操作を決める
+
+        Returns:
+            Optional[str]: "buy", "sell", または None（何もしない）
+        """
+        raise NotImplementedError
+
+
+class BuyAndHoldStrategy(Strategy):
+    """初日に全力で買い、最後まで保有する戦略"""
+
+    def decide(self, game: HeadlessGame) -> Optional[str]:
+        return "buy" if game.portfolio.shares == 0 and game.days_played == 0 else None
+
+
+class IdleStrategy(Strategy):
+    """売買せずに日付だけを進める戦略（経験値が増えない下限の確認用）"""
+
+    def decide(self, game: HeadlessGame) -> Optional[str]:
+        return None
+
+
+class SmaCrossoverStrategy(Strategy):
+    """終値が移動平均を上抜けたら買い、下抜けたら売るトレンドフォロー戦略"""
+
+    def __init__(self, window: int = 25):
+        self.window = window
+
+    def decide(self, game: HeadlessGame) -> Optional[str]:
+        closes = game.recent_closes(self.window)
+        if len(closes) < self.window:
+            return None
+        price = closes[-1]
+        average = closes.mean()
+        if game.portfolio.shares == 0 and price > average:
+            return "buy"
+        if game.portfolio.shares > 0 and price < average:
+            return "sell"
+        return None
+
+
+class DipBuyerStrategy(Strategy):
+    """直近高値から一定以上下がったら買い、一定の利益で売る逆張り戦略"""
+
+    def __init__(self, lookback: int = 20, dip: float = 0.05, take_profit: float = 0.05):
+        self.lookback = lookback
+        self.dip = dip
+        self.take_profit = take_profit
+        self._entry_price = None
+
+    def decide(self, game: HeadlessGame) -> Optional[str]:
+        closes = game.recent_closes(self.lookback)
+        price = closes[-1]
+        if game.portfolio.shares == 0:
+            if price <= closes.max() * (1.0 - self.dip):
+                self._entry_price = price
+                return "buy"
+            return None
+        if self._entry_price is None or price >= self._entry_price * (1.0 + self.take_profit):
+            self._entry_price = None
+            return "sell"
+        return None
+
+
+class RandomTraderStrategy(Strategy):
+    """一定の確率でランダムに売買する戦略（乱数シードで再現可能）"""
+
+    def __init__(self, trade_probability: float = 0.1, seed: int = 0):
+        self.trade_probability = trade_probability
+        self.seed = seed
+        self._rng = np.random.default_rng(seed)
+
+    def decide(self, game: HeadlessGame) -> Optional[str]:
+        if self._rng.random() >= self.trade_probability:
+            return None
+        return "sell" if game.portfolio.shares > 0 else "buy"
+
+
+class RecordedStrategy(Strategy):
+    """記録済みの {日付: 操作} に従って売買する戦略"""
+
+    def __init__(self, actions: Dict[date, str]):
+        self.actions = actions
+
+    def decide(self, game: HeadlessGame) -> Optional[str]:
+        return self.actions.get(game.current_date)
+
+
+# スイープなどで名前から選べる戦略の典型パターン
+STRATEGY_ARCHETYPES = {
+    'idle': IdleStrategy,
+    'buy_and_hold': BuyAndHoldStrategy,
+    'sma_crossover': SmaCrossoverStrategy,
+    'dip_buyer': DipBuyerStrategy,
+    'random_trader': RandomTraderStrategy,
+}
+
+
+def run_strategy(
+    data: pd.DataFrame,
+    start_date: date,
+    strategy: Strategy,
+    end_date: Optional[date] = None,
+    calendar: Optional[TradingCalendar] = None,
+    params: ExpParams = DEFAULT_EXP_PARAMS
+) -> SimulationResult:
+    """
+    戦略に従って1ゲームを最後まで進める
+
+    Args:
+        data: 株価データ
+        start_date: ゲームの開始日
+        strategy: 売買戦略
+        end_date: ゲームの終了日（Noneの場合はデータの最終日）
+        calendar: dataの営業日カレンダー（Noneの場合は作成）
+        params: 経験値ルールのパラメータ
+
+    Returns:
+        SimulationResult: シミュレーション結果
+    """
+    game = HeadlessGame(data, start_date, end_date=end_date, calendar=calendar, params=params)
+    while True:
+        action = strategy.decide(game)
+        if action is not None:
+            game.apply(action)
+        if game.is_finished:
+            break
+        position = game.position
+        game.advance(1)
+        if game.position == position:
+            # 進めなかった場合（データの終わりなど）は打ち切る
+            break
+    return game.result()
+
+
+def replay_actions(
+    data: pd.DataFrame,
+    start_date: date,
+    actions: Sequence[Tuple[str, int]],
+    end_date: Optional[date] = None,
+    calendar: Optional[TradingCalendar] = None,
+    params: ExpParams = DEFAULT_EXP_PARAMS
+) -> SimulationResult:
+    """
+    記録済みの操作列（ボタン操作の履歴）を再生する
+
+    Args:
+        data: 株価データ
+        start_date: ゲームの開始日
+        actions: (操作名, 日数) のリスト。操作名は HeadlessGame.apply() と同じ
+        end_date: ゲームの終了日（Noneの場合はデータの最終日）
+        calendar: dataの営業日カレンダー（Noneの場合は作成）
+        params: 経験値ルールのパラメータ
+
+    Returns:
+        SimulationResult: シミュレーション結果
+    """
+    game = HeadlessGame(data, start_date, end_date=end_date, calendar=calendar, params=params)
+    for action, days in actions:
+        game.apply(action, days)
+    return game.result()
+
+
+# ============================================================================
+# プロセスプールによる一括実行
+# ============================================================================
+
+@dataclass
+class SimulationTask:
+    """一括実行する1ゲーム分の指定"""
+    dataset_key: Hashable
+    strategy: Strategy
+    params: ExpParams = DEFAULT_EXP_PARAMS
+
+
+# ワーカープロセスごとのデータセット（初期化時に一度だけ受け取る）
+_worker_datasets: Dict[Hashable, Tuple[pd.DataFrame, date, Optional[date], TradingCalendar]] = {}
+
+
+def _init_worker(datasets: Dict[Hashable, Tuple[pd.DataFrame, date, Optional[date]]]):
+    """ワーカープロセスの初期化（データセットとカレンダーを準備）"""
+    _worker_datasets.clear()
+    for key, (data, start_date, end_date) in datasets.items():
+        _worker_datasets[key] = (data, start_date, end_date, TradingCalendar.from_index(data.index))
+
+
+def _run_task(task: SimulationTask) -> SimulationResult:
+    """ワーカープロセスで1ゲームを実行する"""
+    data, start_date, end_date, calendar = _worker_datasets[task.dataset_key]
+    return run_strategy(data, start_date, task.strategy, end_date=end_date, calendar=calendar, params=task.params)
+
+
+def run_batch(
+    tasks: Sequence[SimulationTask],
+    datasets: Dict[Hashable, Tuple[pd.DataFrame, date, Optional[date]]],
+    processes: Optional[int] = None
+) -> List[SimulationResult]:
+    """
+    多数のゲームをプロセスプールで並列実行する
+
+    データセットはワーカーの初期化時に一度だけ渡し、タスクごとには送らない。
+
+    Args:
+        tasks: 実行するゲームの一覧
+        datasets: {データセットのキー: (株価データ, 開始日, 終了日)}
+        processes: ワーカープロセス数（Noneの場合はCPUコア数、1の場合は同一プロセスで実行）
+
+    Returns:
+        List[SimulationResult]: tasks と同じ順序の結果
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        _init_worker(datasets)
+        return [_run_task(task) for task in tasks]
+
+    chunksize = max(1, len(tasks) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(datasets,)) as executor:
+        return list(executor.map(_run_task, tasks, chunksize=chunksize))
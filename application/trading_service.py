@@ -13,8 +13,9 @@ from infra.db import DatabaseRepository
 class TradingService:
     """売買を管理するサービス"""
 
-    def __init__(self, db_repo: DatabaseRepository):
+    def __init__(self, db_repo: DatabaseRepository, profit_bonus_rate: float = 0.001):
         self.db_repo = db_repo
+        self.profit_bonus_rate = profit_bonus_rate  # 利確ボーナスの経験値レート（デフォルト: 0.1%）
 
     def buy_stock(
         self,
@@ -33,8 +34,7 @@ class TradingService:
         Returns:
             Tuple[Portfolio, int, float, bool]: (新しいポートフォリオ, 購入株数, 購入コスト, 成功フラグ)
         """
-        new_portfolio, shares, cost = execute_buy(portfolio, current_price, current_date)
-        success = shares > 0
+        new_portfolio, shares, cost, success = execute_buy(portfolio, current_price, current_date)
         return new_portfolio, shares, cost, success
 
     def sell_stock(
@@ -56,7 +56,7 @@ class TradingService:
         new_portfolio, sold_shares, proceeds, profit = execute_sell(portfolio, current_price)
 
         # 利益が出た場合のみ経験値を加算
-        exp_bonus = calc_profit_bonus_exp(profit, rate=0.001)  # 0.1%
+        exp_bonus = calc_profit_bonus_exp(profit, rate=self.profit_bonus_rate)
 
         level_up_result = None
         if exp_bonus > 0:
@@ -3,22 +3,43 @@
 """
 
 from .models import GameState, Portfolio, PlayerState
-from .exp import calc_exp_gain, calc_profit_bonus_exp, check_level_up
+from .trading_calendar import TradingCalendar
+from .exp import calc_exp_gain, calc_profit_bonus_exp, check_level_up, LevelCurve, get_level_curve
 from .trading import calculate_portfolio_value, execute_buy, execute_sell
 from .chart import create_candlestick_chart
+from .chart_session import ChartArrays, ChartSession
+from .columnar import ColumnarPrices, open_columnar
+from .compact import CompactOHLCV
+from .price_series import PriceSeries
+from .pyramid import OHLCPyramid
+from .indicators import IndicatorLibrary
+from .metrics import MetricsRow, MetricsTable
 from .calculations import calculate_price_change, prepare_display_data, calculate_sma_for_display
 
 __all__ = [
     'GameState',
     'Portfolio',
     'PlayerState',
+    'TradingCalendar',
     'calc_exp_gain',
     'calc_profit_bonus_exp',
     'check_level_up',
+    'LevelCurve',
+    'get_level_curve',
     'calculate_portfolio_value',
     'execute_buy',
     'execute_sell',
     'create_candlestick_chart',
+    'ChartArrays',
+    'ChartSession',
+    'ColumnarPrices',
+    'open_columnar',
+    'CompactOHLCV',
+    'PriceSeries',
+    'OHLCPyramid',
+    'IndicatorLibrary',
+    'MetricsRow',
+    'MetricsTable',
     'calculate_sma_for_display',
     'calculate_price_change',
     'prepare_display_data',
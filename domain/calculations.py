@@ -1,36 +1,77 @@
 """
 純粋な計算ロジック（副作用なし）
 """
+import math
 import pandas as pd
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Union
 
+from .indicators import SMA_UNLOCK_LEVELS
+from .moving_average import MovingAverageEngine
+from .price_series import PriceSeries
+from .trading_calendar import TradingCalendar
 
-def calculate_price_change(display_data: pd.DataFrame) -> Tuple[float, float]:
+
+def calculate_price_change(display_data: Union[PriceSeries, pd.DataFrame]) -> Tuple[float, float]:
     """
     前日比を計算する（純粋関数）
 
     Args:
-        display_data: 表示データ（DataFrame）
+        display_data: 表示データ（PriceSeries または DataFrame）
 
     Returns:
         Tuple[float, float]: (変化額, 変化率%)
     """
+    if isinstance(display_data, PriceSeries):
+        return display_data.price_change()
+
     if len(display_data) <= 1:
         return 0.0, 0.0
 
-    current_price = display_data.loc[display_data.index[-1], 'Close']
-    prev_price = display_data.loc[display_data.index[-2], 'Close']
+    # ラベル検索を使わず、終値の配列を位置で参照する
+    close = display_data['Close'].to_numpy()
+    current_price = float(close[-1])
+    prev_price = float(close[-2])
     change = current_price - prev_price
     change_pct = (change / prev_price) * 100
 
     return change, change_pct
 
 
+# 営業日数を暦日数に換算する係数（年間約245営業日。祝日の多い年でも足りるよう余裕を持たせる）
+CALENDAR_DAYS_PER_BUSINESS_DAY = 1.5
+
+
+def history_days_for(display_business_days: int, minimum: int = 0) -> int:
+    """
+    開始日に display_business_days 本を表示するのに必要な、開始日より前の暦日数（純粋関数）
+
+    表示する本数に加えて、表示期間の先頭から最長のSMAを描けるだけの本数を含める。
+
+    Args:
+        display_business_days: 表示する営業日数
+        minimum: 最小の日数（データセットの既定の日数など）
+
+    Returns:
+        int: 開始日より前に取得する暦日数
+    """
+    business_days = display_business_days + max(SMA_UNLOCK_LEVELS)
+    return max(minimum, math.ceil(business_days * CALENDAR_DAYS_PER_BUSINESS_DAY))
+
+
+# 表示期間の選択肢の最長（約5年）
+MAX_DISPLAY_BUSINESS_DAYS = 1250
+
+# データセットに持たせる開始日より前の暦日数（最長の表示期間でも開始日から表示できるだけの履歴。
+# 表示期間ごとに別のデータセットを作らず、この1つから切り出す）
+DISPLAY_HISTORY_DAYS = history_days_for(MAX_DISPLAY_BUSINESS_DAYS, minimum=220)
+
+
 def prepare_display_data(
     data: pd.DataFrame,
     current_date,
     start_date,
-    display_business_days: int = 60
+    display_business_days: int = 60,
+    calendar: Optional[TradingCalendar] = None
 ) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     表示用データとSMA計算用データを準備する（純粋関数）
@@ -42,35 +83,32 @@ def prepare_display_data(
         start_date: ゲームの開始日（参考用、未使用）
         display_business_days: 表示したい営業日数（デフォルト: 60日）
                              最新から数えてこの日数分のデータを表示
+        calendar: dataの営業日カレンダー（Noneの場合はその場で作成）
 
     Returns:
         Tuple[pd.DataFrame, pd.DataFrame]: (表示用データ, SMA計算用データ)
     """
-    # ステップ1: 現在のトレード日までのデータ全体を取得
-    available_data = data[data.index.date <= current_date]
+    if calendar is None:
+        calendar = TradingCalendar.from_index(data.index)
+
+    # ステップ1: 現在のトレード日までのデータ全体を取得（位置ベースの切り出し）
+    # SMA計算には過去のデータも必要なので、SMA計算用データは全期間とする
+    sma_calc_data = calendar.window(data, current_date)
 
-    if len(available_data) == 0:
+    if len(sma_calc_data) == 0:
         return pd.DataFrame(), pd.DataFrame()
 
     # ステップ2: 最新から数えて display_business_days 分のデータを切り出す
-    if len(available_data) <= display_business_days:
-        # データが指定日数より少ない場合は全て表示
-        display_data = available_data
-    else:
-        # 最新から display_business_days 分だけを取得（スライディングウィンドウ）
-        # インデックスは時系列順なので、最後の display_business_days 行を取得
-        display_data = available_data.iloc[-display_business_days:]
-
-    # ステップ3: SMA計算用データ（現在の日付までの全データ）
-    # SMA計算には過去のデータも必要なので、全期間のデータを返す
-    sma_calc_data = data[data.index.date <= current_date]
+    # データが指定日数より少ない場合は全て表示
+    display_data = calendar.window(data, current_date, display_business_days)
 
     return display_data, sma_calc_data
 
 
 def calculate_sma_for_display(
     sma_calc_data: pd.DataFrame,
-    display_data: pd.DataFrame
+    display_data: pd.DataFrame,
+    engine: Optional[MovingAverageEngine] = None
 ) -> Tuple[pd.Series, pd.Series]:
     """
     SMAを計算し、表示期間に合わせてフィルタリングする（純粋関数）
@@ -78,17 +116,17 @@ def calculate_sma_for_display(
     Args:
         sma_calc_data: SMA計算用データ（全期間）
         display_data: 表示用データ
+        engine: データセットのSMAエンジン（Noneの場合はsma_calc_dataから作成）
 
     Returns:
         Tuple[pd.Series, pd.Series]: (SMA25, SMA75) - 表示期間にフィルタリング済み
     """
-    sma_25_full = sma_calc_data['Close'].rolling(window=25, min_periods=25).mean()
-    sma_75_full = sma_calc_data['Close'].rolling(window=75, min_periods=75).mean()
+    if engine is None:
+        engine = MovingAverageEngine.from_data(sma_calc_data, windows=(25, 75))
 
-    sma_25 = sma_25_full[sma_25_full.index.isin(display_data.index)]
-    sma_75 = sma_75_full[sma_75_full.index.isin(display_data.index)]
+    # 表示データはSMA計算用データの末尾なので、位置だけで対応が取れる
+    end = len(sma_calc_data)
+    sma_25 = engine.series_for(25, display_data, end)
+    sma_75 = engine.series_for(75, display_data, end)
 
     return sma_25, sma_75
-
-
-
@@ -1,10 +1,231 @@
 """
 チャート生成ロジック（Plotly、Streamlit非依存）
 """
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from dataclasses import replace
 from datetime import date, timedelta
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+from .chart_payload import EpochDayAxis, encode_figure
+from .indicators import SMA_UNLOCK_LEVELS, IndicatorOverlay
+from .moving_average import MovingAverageEngine
+from .trading_calendar import NonTradingDays, TradingCalendar
+
+# 下段パネル（オシレーター）1つあたりの高さ（全体に対する割合）と追加する高さ(px)
+LOWER_PANEL_HEIGHT = 0.2
+LOWER_PANEL_GAP = 0.03
+LOWER_PANEL_PIXELS = 150
+
+
+# 移動平均線の表示名・色（解放レベルは SMA_UNLOCK_LEVELS）
+SMA_STYLES = {
+    25: ("SMA (25)", '#FF9900'),
+    75: ("SMA (75)", '#A55EEA'),
+}
+
+# 買いマーカーを置く位置（Lv.1は終値、Lv.2以上は安値に対する比率）
+BUY_MARKER_OFFSET = 0.995
+
+# 折れ線1本あたりに送る点数の上限（チャートの横幅のピクセル数程度。超える場合はLTTBで間引く）
+LINE_POINT_BUDGET = 500
+
+# 表示期間の本数がこれを超える折れ線は WebGL（Scattergl）で描画する
+# （WebGLのトレースは rangebreaks に対応していないので、土日を削除しない Lv.2 以下だけ）
+WEBGL_THRESHOLD = 1000
+
+# チャートタイトルに表示する会社名（ない銘柄はティッカーシンボルだけを表示する）
+COMPANY_NAMES = {
+    "7203.T": "トヨタ自動車",
+    "6758.T": "ソニーグループ",
+    "9984.T": "ソフトバンクグループ",
+}
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets で折れ線を threshold 点に間引くときに残す点の位置
+
+    先頭と末尾の点は必ず残し、間を threshold - 2 個のバケットに分けて、各バケットから
+    「前に選んだ点」と「次のバケットの平均」と作る三角形の面積が最大になる点を1つ選ぶ。
+    山と谷が残るので、単純な間引きより見た目が元の線に近い。バケットの平均と各バケット内の
+    面積はベクトル演算で求め、Pythonのループはバケットの数（threshold）回だけ。
+    y がNaNの点（SMAの先頭など）は除いてから間引く。
+
+    Args:
+        x: 各点のX座標（日付はエポックからの日数など、数値にしたもの）
+        y: 各点の値
+        threshold: 残す点数（3未満または点数以上の場合は間引かない）
+
+    Returns:
+        np.ndarray: 残す点の位置（昇順）
+    """
+    finite = np.flatnonzero(np.isfinite(y))
+    n = len(finite)
+    if threshold < 3 or n <= threshold:
+        return finite
+    x = np.asarray(x, dtype=np.float64)[finite]
+    y = np.asarray(y, dtype=np.float64)[finite]
+
+    # 先頭と末尾を除いた点を threshold - 2 個のバケットに分ける
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    # 各バケットの「次のバケットの平均」（最後のバケットは末尾の点）
+    mean_x = np.append(np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / counts, x[-1])[1:]
+    mean_y = np.append(np.add.reduceat(y[1:n - 1], edges[:-1] - 1) / counts, y[-1])[1:]
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        area = np.abs(
+            (x[a] - mean_x[bucket]) * (y[lo:hi] - y[a])
+            - (x[a] - x[lo:hi]) * (mean_y[bucket] - y[a])
+        )
+        a = lo + int(np.argmax(area))
+        selected[bucket + 1] = a
+    return finite[selected]
+
+
+def use_webgl(player_level: int, points: int) -> bool:
+    """折れ線を WebGL（Scattergl）で描画するかどうか"""
+    return player_level < 3 and points > WEBGL_THRESHOLD
+
+
+def _scatter_class(webgl: bool):
+    return go.Scattergl if webgl else go.Scatter
+
+
+def price_trace(player_level: int, x, open_, high, low, close, webgl: bool = False):
+    """価格のトレース（Lv.1は折れ線、Lv.2以上はローソク足）"""
+    if player_level == 1:
+        return _scatter_class(webgl)(
+            x=x,
+            y=close,
+            mode='lines',
+            name='終値',
+            line=dict(color='#3399FF', width=2),
+        )
+    return go.Candlestick(x=x, open=open_, high=high, low=low, close=close)
+
+
+def buy_marker_trace(x, y) -> go.Scatter:
+    """買いを実行した日付の三角形マーカー"""
+    return go.Scatter(
+        x=x,
+        y=y,
+        mode='markers',
+        marker=dict(
+            symbol='triangle-up',
+            size=15,
+            color='green',
+            line=dict(color='darkgreen', width=2)
+        ),
+        name='買いエントリー',
+        hovertemplate='<b>買いエントリー</b><br>日付: %{x}<br>価格: ¥%{y:,.0f}<extra></extra>'
+    )
+
+
+def sma_trace(window: int, x, y, webgl: bool = False):
+    """移動平均線のトレース"""
+    name, color = SMA_STYLES[window]
+    return _scatter_class(webgl)(
+        x=x,
+        y=y,
+        mode='lines',
+        name=name,
+        line=dict(color=color, width=2),
+        hovertemplate=f'<b>{name}</b><br>日付: %{{x}}<br>価格: ¥%{{y:,.0f}}<extra></extra>'
+    )
+
+
+def overlay_trace(overlay: IndicatorOverlay, x, yaxis: str, webgl: bool = False):
+    """テクニカル指標のトレース"""
+    if overlay.kind == 'bar':
+        return go.Bar(
+            x=x,
+            y=overlay.values,
+            name=overlay.name,
+            marker_color=overlay.color,
+            yaxis=yaxis
+        )
+    return _scatter_class(webgl)(
+        x=x,
+        y=overlay.values,
+        mode='lines',
+        name=overlay.name,
+        line=dict(color=overlay.color, width=1.5, dash=overlay.dash),
+        yaxis=yaxis
+    )
+
+
+def overlay_axes(overlays: List[IndicatorOverlay]) -> Tuple[List[str], List[str]]:
+    """
+    指標ごとのY軸を決める（価格軸に重ねるものと下段パネルに出すもの）
+
+    Returns:
+        Tuple[List[str], List[str]]: (指標ごとのY軸名, 下段パネル名の一覧)
+    """
+    lower_panels = []
+    axes = []
+    for overlay in overlays:
+        if overlay.panel == 'price':
+            axes.append('y')
+            continue
+        if overlay.panel not in lower_panels:
+            lower_panels.append(overlay.panel)
+        axes.append(f"y{lower_panels.index(overlay.panel) + 2}")
+    return axes, lower_panels
+
+
+def chart_title(ticker: str, player_level: int, year: int) -> str:
+    """チャートタイトル（会社名が分かる銘柄は「会社名 (ティッカー)」）"""
+    name = COMPANY_NAMES.get(ticker)
+    title = f"{name} ({ticker}) - {year}年" if name else f"{ticker} - {year}年"
+    if player_level >= 3:
+        title += " ⚡️ Market Time Vision (土日削除中)"
+    return title
+
+
+def chart_layout(ticker: str, player_level: int, year: int, xaxis_config: dict, lower_panels: List[str]) -> dict:
+    """
+    チャートのレイアウト
+
+    Args:
+        ticker: ティッカーシンボル
+        player_level: プレイヤーのレベル
+        year: 年
+        xaxis_config: X軸の設定（範囲・rangebreaks。下段パネルがある場合は anchor を追加する）
+        lower_panels: 下段パネル名の一覧
+    """
+    # 下段パネルがある場合は価格チャートの下に積み上げる
+    panel_layout = {}
+    if lower_panels:
+        step = LOWER_PANEL_HEIGHT + LOWER_PANEL_GAP
+        panel_layout['yaxis'] = dict(domain=[step * len(lower_panels), 1.0])
+        for i, panel in enumerate(reversed(lower_panels)):
+            axis_number = len(lower_panels) - i + 1
+            panel_layout[f"yaxis{axis_number}"] = dict(
+                domain=[step * i, step * i + LOWER_PANEL_HEIGHT],
+                anchor='x',
+                title=panel.upper()
+            )
+        # X軸の目盛りは一番下のパネルに表示する
+        xaxis_config['anchor'] = f"y{len(lower_panels) + 1}"
+
+    return dict(
+        xaxis_rangeslider_visible=False,
+        height=500 + LOWER_PANEL_PIXELS * len(lower_panels),
+        title=chart_title(ticker, player_level, year),
+        xaxis_title="日付",
+        yaxis_title="株価 (円)",
+        showlegend=True,
+        margin=dict(l=50, r=50, t=50, b=50),
+        xaxis=xaxis_config,
+        **panel_layout
+    )
 
 
 def create_candlestick_chart(
@@ -17,7 +238,10 @@ def create_candlestick_chart(
     player_level: int = 1,
     current_date: date = None,
     year: int = 2024,
-    ticker: str = "7203.T"
+    ticker: str = "7203.T",
+    indicator_overlays: Optional[List[IndicatorOverlay]] = None,
+    non_trading_days: Optional[NonTradingDays] = None,
+    binary: bool = False
 ) -> go.Figure:
     """
     チャートを生成する（純粋関数、Streamlit非依存）
@@ -31,29 +255,32 @@ def create_candlestick_chart(
         current_date: 現在の日付
         year: 年
         ticker: ティッカーシンボル
+        indicator_overlays: 重ねて表示する指標（表示データと位置が揃った系列）
+        non_trading_days: データセットの休場日（Noneの場合は表示データから作成）
+        binary: Trueの場合、日付を整数・価格を float32 の型付き配列にして送信量を減らす
+            （X軸は数値の軸になり、Lv.3以上は rangebreaks の代わりに営業日の番号で休場日を詰める）
 
     Returns:
         go.Figure: PlotlyのFigureオブジェクト
     """
+    # 折れ線は LINE_POINT_BUDGET 点を超える分をLTTBで間引き、長い期間は WebGL で描画する
+    day_ordinals = display_data.index.values.astype('datetime64[D]').astype(np.int64)
+    webgl = use_webgl(player_level, len(display_data))
+
+    def line_points(values) -> np.ndarray:
+        return lttb_indices(day_ordinals, np.asarray(values, dtype=np.float64), LINE_POINT_BUDGET)
+
     # レベルに応じてチャートタイプを切り替え
-    if player_level == 1:
-        # Lv.1: 折れ線グラフ
-        fig = go.Figure(data=[go.Scatter(
-            x=display_data.index,
-            y=display_data.loc[:, 'Close'],
-            mode='lines',
-            name='終値',
-            line=dict(color='#3399FF', width=2),
-        )])
-    else:
-        # Lv.2以上: ローソク足チャート
-        fig = go.Figure(data=[go.Candlestick(
-            x=display_data.index,
-            open=display_data.loc[:, 'Open'],
-            high=display_data.loc[:, 'High'],
-            low=display_data.loc[:, 'Low'],
-            close=display_data.loc[:, 'Close']
-        )])
+    price_rows = slice(None) if player_level > 1 else line_points(display_data['Close'].values)
+    fig = go.Figure(data=[price_trace(
+        player_level,
+        display_data.index[price_rows],
+        display_data['Open'].values[price_rows],
+        display_data['High'].values[price_rows],
+        display_data['Low'].values[price_rows],
+        display_data['Close'].values[price_rows],
+        webgl=webgl
+    )])
 
     # 買いを実行した日付に三角形マーカーを追加
     if buy_dates:
@@ -63,82 +290,52 @@ def create_candlestick_chart(
 
         if not buy_markers_data.empty:
             # マーカーの位置を調整
-            if player_level == 1:
-                marker_y = buy_markers_data.loc[:, 'Close'] * 0.995
-            else:
-                marker_y = buy_markers_data.loc[:, 'Low'] * 0.995
-
-            fig.add_trace(go.Scatter(
-                x=buy_markers_data.index,
-                y=marker_y,
-                mode='markers',
-                marker=dict(
-                    symbol='triangle-up',
-                    size=15,
-                    color='green',
-                    line=dict(color='darkgreen', width=2)
-                ),
-                name='買いエントリー',
-                hovertemplate='<b>買いエントリー</b><br>日付: %{x}<br>価格: ¥%{y:,.0f}<extra></extra>'
-            ))
-
-    # 移動平均線の追加
-    if sma_25_enabled and sma_25_data is not None and player_level >= 4:
-        sma_25_clean = sma_25_data.dropna()
-        if len(sma_25_clean) > 0:
-            fig.add_trace(go.Scatter(
-                x=sma_25_clean.index,
-                y=sma_25_clean.values,
-                mode='lines',
-                name='SMA (25)',
-                line=dict(color='#FF9900', width=2),
-                hovertemplate='<b>SMA (25)</b><br>日付: %{x}<br>価格: ¥%{y:,.0f}<extra></extra>'
-            ))
-
-    if sma_75_enabled and sma_75_data is not None and player_level >= 5:
-        sma_75_clean = sma_75_data.dropna()
-        if len(sma_75_clean) > 0:
-            fig.add_trace(go.Scatter(
-                x=sma_75_clean.index,
-                y=sma_75_clean.values,
-                mode='lines',
-                name='SMA (75)',
-                line=dict(color='#A55EEA', width=2),
-                hovertemplate='<b>SMA (75)</b><br>日付: %{x}<br>価格: ¥%{y:,.0f}<extra></extra>'
-            ))
+            anchor_column = 'Close' if player_level == 1 else 'Low'
+            marker_y = buy_markers_data.loc[:, anchor_column] * BUY_MARKER_OFFSET
+            fig.add_trace(buy_marker_trace(buy_markers_data.index, marker_y))
+
+    # 移動平均線の追加（NaNの先頭は line_points() で除かれる）
+    for window, enabled, sma_data in ((25, sma_25_enabled, sma_25_data), (75, sma_75_enabled, sma_75_data)):
+        if enabled and sma_data is not None and player_level >= SMA_UNLOCK_LEVELS[window]:
+            rows = line_points(sma_data.values)
+            if len(rows) > 0:
+                fig.add_trace(sma_trace(window, sma_data.index[rows], sma_data.values[rows], webgl=webgl))
+
+    # テクニカル指標の追加（価格軸に重ねるものと下段パネルに出すもの）
+    overlays = indicator_overlays or []
+    axes, lower_panels = overlay_axes(overlays)
+    for overlay, yaxis in zip(overlays, axes):
+        if overlay.kind == 'bar':
+            fig.add_trace(overlay_trace(overlay, display_data.index, yaxis))
+            continue
+        rows = line_points(overlay.values)
+        fig.add_trace(overlay_trace(
+            replace(overlay, values=overlay.values[rows]), display_data.index[rows], yaxis, webgl=webgl
+        ))
 
     # X軸の範囲を設定（現在のトレード日より5日分未来まで余白を作る）
     xaxis_max = current_date + timedelta(days=5) if current_date else display_data.index[-1]
 
-    # チャートタイトルの設定
-    chart_title = f"トヨタ自動車 (7203.T) - {year}年"
-    if player_level >= 3:
-        chart_title += " ⚡️ Market Time Vision (土日削除中)"
-
     # X軸の設定
     xaxis_config = dict(
         range=[display_data.index[0], xaxis_max]
     )
 
     # Lv.3以上の場合、データが存在しない日付（土日・祝日）を全て削除
+    # （土日は曜日の bounds、祝日は表示期間内の日付だけを渡す）
     if player_level >= 3:
-        dt_all = pd.date_range(start=display_data.index[0], end=display_data.index[-1], freq='D')
-        dt_breaks = dt_all.difference(display_data.index).strftime("%Y-%m-%d").tolist()
-        if len(dt_breaks) > 0:
-            xaxis_config['rangebreaks'] = [
-                dict(values=dt_breaks)
-            ]
-
-    fig.update_layout(
-        xaxis_rangeslider_visible=False,
-        height=500,
-        title=chart_title,
-        xaxis_title="日付",
-        yaxis_title="株価 (円)",
-        showlegend=True,
-        margin=dict(l=50, r=50, t=50, b=50),
-        xaxis=xaxis_config
-    )
+        ordinals = TradingCalendar.from_index(display_data.index).ordinals
+        if non_trading_days is None:
+            non_trading_days = NonTradingDays(ordinals)
+        breaks = non_trading_days.rangebreaks(ordinals[0], ordinals[-1])
+        if breaks:
+            xaxis_config['rangebreaks'] = breaks
+
+    fig.update_layout(**chart_layout(ticker, player_level, year, xaxis_config, lower_panels))
+
+    if binary:
+        axis = EpochDayAxis.from_index(display_data.index, trading=player_level >= 3)
+        encode_figure(fig, axis, current_date)
 
     return fig
 
@@ -159,6 +356,7 @@ def calculate_sma(
     Returns:
         Tuple[pd.Series, pd.Series]: (SMA25, SMA75)
     """
-    sma_25 = data['Close'].rolling(window=window_25, min_periods=window_25).mean()
-    sma_75 = data['Close'].rolling(window=window_75, min_periods=window_75).mean()
+    engine = MovingAverageEngine.from_data(data, windows=(window_25, window_75))
+    sma_25 = engine.series_for(window_25, data, len(data))
+    sma_75 = engine.series_for(window_75, data, len(data))
     return sma_25, sma_75
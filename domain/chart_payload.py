@@ -0,0 +1,140 @@
+"""
+チャートの送信量を減らす配列の形式（日付を整数、価格を float32 の型付き配列にする）
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+from .compact import PRICE_DECIMALS, encode_plot_values
+from .trading_calendar import to_day_ordinal
+
+
+# X軸の目盛りの数（整数のX軸は自動では日付の目盛りにならないので、こちらで決めて渡す）
+TICK_COUNT = 8
+
+# ローソク足の価格の属性
+_PRICE_PROPS = ('open', 'high', 'low', 'close')
+
+
+def day_labels(ordinals: np.ndarray) -> np.ndarray:
+    """エポックからの日数を 'YYYY-MM-DD' の文字列にする"""
+    return np.datetime_as_string(np.asarray(ordinals).astype('datetime64[D]'), unit='D').astype(object)
+
+
+@dataclass(frozen=True)
+class EpochDayAxis:
+    """
+    日付のX軸を整数で送るための変換と目盛りのフォーマッタ
+
+    Plotlyの日付の軸は数値をミリ秒として扱うので、日数の整数を送る場合は数値の軸にして、
+    目盛りの日付は tickvals / ticktext でこちらから渡す。
+    trading=False の場合、x はエポックからの日数（土日・祝日は隙間になる。Lv.2以下の見た目）。
+    trading=True の場合、x は表示期間の何営業日目か（休場日は詰まるので、数値の軸では使えない
+    rangebreaks と同じ見た目になる。Lv.3以上）。
+    """
+    ordinals: np.ndarray  # 表示期間の各行の日付（エポックからの日数、昇順）
+    trading: bool = False
+
+    @classmethod
+    def from_index(cls, index: pd.DatetimeIndex, trading: bool = False) -> 'EpochDayAxis':
+        return cls(index.values.astype('datetime64[D]').astype(np.int64), trading)
+
+    def positions(self, ordinals: np.ndarray) -> np.ndarray:
+        """日付（エポックからの日数）をX軸の値（int32）にする"""
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        if self.trading:
+            return np.searchsorted(self.ordinals, ordinals).astype(np.int32)
+        return ordinals.astype(np.int32)
+
+    def axis_layout(self, current_date: Optional[date] = None) -> dict:
+        """
+        X軸の設定（範囲と日付の目盛り）
+
+        Args:
+            current_date: 現在のトレード日（範囲はこの5日後まで。Noneの場合は表示期間の最後まで）
+        """
+        x = self.positions(self.ordinals)
+        last = int(x[-1])
+        if current_date is not None:
+            margin_end = current_date + timedelta(days=5)
+            if self.trading:
+                last += int(np.busday_count(current_date, margin_end))
+            else:
+                last = to_day_ordinal(margin_end)
+        rows = np.unique(np.linspace(0, len(x) - 1, min(TICK_COUNT, len(x))).astype(np.int64))
+        return dict(
+            type='linear',
+            range=[int(x[0]), last],
+            tickmode='array',
+            tickvals=x[rows],
+            ticktext=list(day_labels(self.ordinals[rows])),
+        )
+
+
+def numeric_axis_hover(index: int, trace) -> dict:
+    """
+    数値のX軸でのホバーの設定
+
+    数値のX軸ではホバーに日付が出ない。1点ごとの日付の文字列を送ると型付き配列にした意味が
+    薄れる（送信量もシリアライズ時間も増える）ので、ホバーには値だけを出し、日付はX軸の目盛りで読む。
+
+    Args:
+        index: Figure内のトレースの番号（0番目が価格のトレース）
+        trace: トレース
+    """
+    if trace.type == 'candlestick':
+        return dict(hoverinfo='y')
+    if index == 0:
+        return dict(hovertemplate=f'{trace.name}: ¥%{{y:,.0f}}<extra></extra>')
+    if trace.hovertemplate:
+        return dict(hovertemplate=trace.hovertemplate.replace('日付: %{x}<br>', ''))
+    return dict(hoverinfo='y+name')
+
+
+def encode_figure(
+    fig: go.Figure,
+    axis: EpochDayAxis,
+    current_date: Optional[date] = None,
+    decimals: int = PRICE_DECIMALS
+) -> go.Figure:
+    """
+    create_candlestick_chart() のFigureの配列を型付き配列にする（Figureをそのまま書き換える）
+
+    各トレースのX（ISO形式の日時の文字列）は int32 の日数に、価格の軸のY（OHLC・SMA・買いマーカー・
+    EMAなど価格に重ねる指標）は float32 にする。下段パネルの指標は値の桁が価格と違うのでYはそのまま。
+    ホバーには日付を出さない（numeric_axis_hover()。日付はX軸の目盛りの ticktext で読む）。
+
+    Args:
+        fig: create_candlestick_chart() で作ったFigure
+        axis: 表示期間のX軸
+        current_date: 現在のトレード日（X軸の範囲の計算に使う）
+        decimals: 価格の小数点以下の桁数
+
+    Returns:
+        go.Figure: 書き換えたFigure
+    """
+    for index, trace in enumerate(fig.data):
+        if trace.x is None or len(trace.x) == 0:
+            continue
+        ordinals = np.asarray(trace.x).astype('datetime64[D]').astype(np.int64)
+        changes = {'x': axis.positions(ordinals)}
+        if trace.type == 'candlestick':
+            changes.update({name: encode_plot_values(getattr(trace, name), decimals) for name in _PRICE_PROPS})
+        elif trace.yaxis in (None, 'y'):
+            changes['y'] = encode_plot_values(trace.y, decimals)
+
+        changes.update(numeric_axis_hover(index, trace))
+        # trace.update() は1回ごとに batch_update を挟むので、属性ごとに代入する
+        for name, value in changes.items():
+            trace[name] = value
+
+    # 数値の軸では rangebreaks を使えない（trading=True の場合は営業日の番号で詰めてある）
+    xaxis = fig.layout.xaxis
+    xaxis.rangebreaks = None
+    for name, value in axis.axis_layout(current_date).items():
+        xaxis[name] = value
+    return fig
@@ -0,0 +1,347 @@
+"""
+チャートのサーバー側の差分更新（Figureをテンプレートとして保持し、変わった配列だけを差し替える）
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import plotly.graph_objects as go
+
+from .chart import (
+    BUY_MARKER_OFFSET,
+    LINE_POINT_BUDGET,
+    buy_marker_trace,
+    chart_layout,
+    chart_title,
+    lttb_indices,
+    overlay_axes,
+    overlay_trace,
+    price_trace,
+    sma_trace,
+    use_webgl,
+)
+from .chart_payload import EpochDayAxis, numeric_axis_hover
+from .compact import PRICE_DECIMALS, encode_plot_values
+from .indicators import SMA_UNLOCK_LEVELS, IndicatorOverlay
+from .moving_average import MovingAverageEngine
+from .price_series import PriceSeries
+from .pyramid import LEVEL_LABELS, MAX_VISIBLE_BARS, OHLCPyramid
+from .trading_calendar import NonTradingDays, to_day_ordinal
+
+
+@dataclass(frozen=True)
+class ChartArrays:
+    """
+    チャートに渡すデータセットの全期間分の配列（データセットごとに一度だけ作り、全セッションで共有する）
+
+    日付のラベルは 'YYYY-MM-DD'（Timestampより短く、PlotlyはそのままX軸の日付として扱う）、
+    価格は表示桁数に丸めた値。セッションは位置で切り出すだけにする。
+    """
+    labels: np.ndarray
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    decimals: int
+
+    @classmethod
+    def from_series(cls, series: PriceSeries, decimals: int = PRICE_DECIMALS) -> 'ChartArrays':
+        """株価系列から作成する"""
+        return cls(
+            labels=np.datetime_as_string(series.ordinals.astype('datetime64[D]'), unit='D').astype(object),
+            open=np.round(series.open, decimals),
+            high=np.round(series.high, decimals),
+            low=np.round(series.low, decimals),
+            close=np.round(series.close, decimals),
+            decimals=decimals
+        )
+
+
+class ChartSession:
+    """
+    セッションごとのチャートの状態
+
+    トレースの構成（チャートの種類・表示中のSMAと指標）が同じ間は go.Figure を作り直さず、
+    表示期間・買いマーカー・X軸など変わった配列だけを差し替える。表示期間の本数が上限を
+    超える場合は多解像度OHLC（OHLCPyramid）から週足・月足を選び、描画する本数を一定に保つ。
+    Lv.1の折れ線は足をまとめずにLTTBで間引き（山と谷を残す）、長い期間は WebGL で描画する。日付のラベルと
+    表示桁数に丸めた価格はデータセットの ChartArrays を位置で切り出すだけにする
+    （配列のコピーはPlotlyに渡すときの1回だけ）。
+    update(binary=True) の場合はテンプレートを型付き配列の形式（encode_figure() と同じ）で持つ。
+
+    減るのはサーバー側でFigureを組み立てる処理だけで、st.plotly_chart() は毎回Figure全体を
+    シリアライズして送る（送信量は作り直した場合とほぼ同じ）。
+    """
+
+    def __init__(
+        self,
+        series: PriceSeries,
+        decimals: int = PRICE_DECIMALS,
+        non_trading_days: Optional[NonTradingDays] = None,
+        pyramid: Optional[OHLCPyramid] = None,
+        bar_budget: int = MAX_VISIBLE_BARS,
+        line_budget: int = LINE_POINT_BUDGET,
+        arrays: Optional[ChartArrays] = None
+    ):
+        """
+        Args:
+            series: データセットの株価系列
+            decimals: チャートに渡す価格の小数点以下の桁数（送信するJSONを小さくする。arrays を渡した場合はその桁数）
+            non_trading_days: データセットの休場日（Noneの場合は系列から作成）
+            pyramid: データセットの多解像度OHLC（Noneの場合は系列から作成）
+            bar_budget: 一度に描画する本数の上限（超える期間は週足・月足にまとめる）
+            line_budget: 折れ線1本あたりに送る点数の上限（超える場合はLTTBで間引く）
+            arrays: データセットのチャート用の配列（Noneの場合は系列から作成）
+        """
+        if arrays is None:
+            arrays = ChartArrays.from_series(series, decimals)
+        self.series = series
+        self.arrays = arrays
+        self.decimals = arrays.decimals
+        self.non_trading_days = non_trading_days if non_trading_days is not None else NonTradingDays(series.ordinals)
+        self.pyramid = pyramid if pyramid is not None else OHLCPyramid.daily(series)
+        self.bar_budget = bar_budget
+        self.line_budget = line_budget
+        self.figure: Optional[go.Figure] = None
+        self._structure: Optional[Tuple] = None
+        self._trace_keys: Dict[Tuple[int, str], Hashable] = {}
+        self._layout_keys: Dict[str, Hashable] = {}
+
+    def _marker_positions(self, buy_dates: Sequence[date], start: int, end: int) -> np.ndarray:
+        """表示期間 [start, end) に入っている買い日付の行位置"""
+        if not buy_dates:
+            return np.empty(0, dtype=np.int64)
+        ordinals = np.unique(np.fromiter((to_day_ordinal(d) for d in buy_dates), dtype=np.int64))
+        positions = np.searchsorted(self.series.ordinals, ordinals)
+        found = positions < len(self.series)
+        positions, ordinals = positions[found], ordinals[found]
+        positions = positions[self.series.ordinals[positions] == ordinals]
+        return positions[(positions >= start) & (positions < end)]
+
+    def update(
+        self,
+        start: int,
+        end: int,
+        buy_dates: Sequence[date],
+        player_level: int,
+        current_date: date,
+        year: int,
+        ticker: str,
+        sma_windows: Sequence[int] = (),
+        sma_engine: Optional[MovingAverageEngine] = None,
+        indicator_overlays: Optional[List[IndicatorOverlay]] = None,
+        binary: bool = False
+    ):
+        """
+        表示期間 [start, end) のチャートに更新する
+
+        Args:
+            start: 表示データの先頭の行位置
+            end: 表示データの最後の行位置 + 1
+            buy_dates: 買いを実行した日付
+            player_level: プレイヤーのレベル
+            current_date: 現在の日付
+            year: 年
+            ticker: ティッカーシンボル
+            sma_windows: 表示するSMAのウィンドウ（解放レベルに達していないものは表示しない）
+            sma_engine: データセットのSMAエンジン
+            indicator_overlays: 表示期間に切り出した指標（build_indicator_overlays() の結果）
+            binary: Trueの場合、日付を整数・価格を float32 の型付き配列にして送信量を減らす
+                （encode_figure() と同じ形式。テンプレートをこの形式のまま保持して差し替える）
+        """
+        overlays = indicator_overlays or []
+        windows = tuple(
+            window for window in sma_windows
+            if sma_engine is not None and player_level >= SMA_UNLOCK_LEVELS[window]
+        )
+        axes, lower_panels = overlay_axes(overlays)
+        webgl = use_webgl(player_level, end - start)
+        structure = (
+            player_level == 1,
+            webgl,
+            windows,
+            tuple((overlay.name, overlay.kind, axis) for overlay, axis in zip(overlays, axes)),
+            binary,
+        )
+
+        if structure != self._structure:
+            self._build(structure, windows, overlays, axes, lower_panels, player_level, year, ticker, webgl, binary)
+
+        # 表示期間の本数が上限を超える場合は週足・月足にまとめる
+        # （Lv.1の折れ線は終値だけをまとめると山と谷が消えるので、日足のままLTTBで間引く）
+        if player_level == 1:
+            level = self.pyramid.levels[0]
+        else:
+            level = self.pyramid.select(start, end, self.bar_budget)
+        key = (level.name, start, end)
+        decimals = self.decimals
+        if level is self.pyramid.levels[0]:
+            bars = None
+            ordinals = self.series.ordinals[start:end]
+            labels = self.arrays.labels[start:end]
+            columns = {
+                'open': self.arrays.open[start:end],
+                'high': self.arrays.high[start:end],
+                'low': self.arrays.low[start:end],
+                'close': self.arrays.close[start:end],
+            }
+        else:
+            bars = self.pyramid.window(level, start, end)
+            ordinals = self.series.ordinals[bars.first_positions]
+            labels = self.arrays.labels[bars.first_positions]
+            columns = {
+                'open': np.round(bars.open, decimals),
+                'high': np.round(bars.high, decimals),
+                'low': np.round(bars.low, decimals),
+                'close': np.round(bars.close, decimals),
+            }
+
+        def sample(values: np.ndarray) -> np.ndarray:
+            """表示期間に切り出した元の系列の値を、各足の最後の行の値にする"""
+            return values if bars is None else values[bars.last_positions - start]
+
+        # 型付き配列の場合、Xは整数の日数（Lv.3以上は表示期間の何営業日目か）、価格の軸のYは float32 にする
+        if binary:
+            axis = EpochDayAxis(self.series.ordinals[start:end], trading=player_level >= 3)
+            x = axis.positions(ordinals)
+            columns = {name: encode_plot_values(values, decimals) for name, values in columns.items()}
+
+            def price_values(values: np.ndarray) -> np.ndarray:
+                return encode_plot_values(values, decimals)
+        else:
+            x = labels
+
+            def price_values(values: np.ndarray) -> np.ndarray:
+                return np.round(values, decimals)
+
+        fig = self.figure
+        with fig.batch_update():
+            # 価格（0番目のトレース）
+            if player_level == 1:
+                self._set_line(fig, 0, x, ordinals, columns['close'], key)
+            else:
+                self._set(fig, 0, {'x': x, **columns}, key)
+
+            # 買いマーカー（1番目のトレース。期間内にない場合は空にして凡例から外す）
+            marker_positions = self._marker_positions(buy_dates, start, end)
+            marker_key = (player_level == 1, level.name, tuple(marker_positions.tolist()))
+            if bars is not None:
+                positions = np.unique(np.searchsorted(bars.first_positions, marker_positions, side='right') - 1)
+                marker_key += (start, end)
+            else:
+                positions = marker_positions - start
+                if binary:
+                    # 営業日の番号のXは表示期間の先頭からの位置なので、期間がずれると変わる
+                    marker_key += (start, end)
+            anchor = columns['close'] if player_level == 1 else columns['low']
+            self._set(fig, 1, {
+                'x': x[positions],
+                'y': price_values(anchor[positions] * BUY_MARKER_OFFSET),
+                'showlegend': len(positions) > 0,
+            }, marker_key)
+
+            index = 2
+            for window in windows:
+                values = price_values(sample(sma_engine.values(window, start, end)))
+                self._set_line(fig, index, x, ordinals, values, key)
+                index += 1
+
+            for overlay, overlay_axis in zip(overlays, axes):
+                values = sample(overlay.values)
+                if binary and overlay_axis == 'y':
+                    values = price_values(values)
+                if overlay.kind == 'bar':
+                    self._set(fig, index, {'x': x, 'y': values}, key)
+                else:
+                    self._set_line(fig, index, x, ordinals, values, key)
+                index += 1
+
+            if binary:
+                # 数値の軸では rangebreaks を使えないので、範囲と日付の目盛りをこちらで渡す
+                for name, value in axis.axis_layout(current_date).items():
+                    if name in ('range', 'tickvals', 'ticktext'):
+                        self._relayout(fig, f'xaxis.{name}', value)
+            else:
+                # X軸の範囲（現在のトレード日より5日分未来まで余白を作る）と土日・祝日の削除
+                xaxis_max = (current_date + timedelta(days=5)).isoformat() if current_date else labels[-1]
+                self._relayout(fig, 'xaxis.range', [labels[0], xaxis_max])
+                breaks = []
+                if player_level >= 3:
+                    ordinals = self.series.ordinals
+                    breaks = self.non_trading_days.rangebreaks(ordinals[start], ordinals[end - 1])
+                self._relayout(fig, 'xaxis.rangebreaks', breaks)
+            title = chart_title(ticker, player_level, year)
+            if bars is not None and level.name in LEVEL_LABELS:
+                title += f"（{LEVEL_LABELS[level.name]}）"
+            self._relayout(fig, 'title.text', title)
+
+    def _build(
+        self,
+        structure: Tuple,
+        windows: Tuple[int, ...],
+        overlays: List[IndicatorOverlay],
+        axes: List[str],
+        lower_panels: List[str],
+        player_level: int,
+        year: int,
+        ticker: str,
+        webgl: bool,
+        binary: bool
+    ):
+        """トレースの構成が変わったときにテンプレートのFigureを作り直す"""
+        empty = np.empty(0)
+        traces = [
+            price_trace(player_level, empty, empty, empty, empty, empty, webgl=webgl),
+            buy_marker_trace(empty, empty),
+        ]
+        traces.extend(sma_trace(window, empty, empty, webgl=webgl) for window in windows)
+        traces.extend(overlay_trace(overlay, empty, axis, webgl=webgl) for overlay, axis in zip(overlays, axes))
+        self.figure = go.Figure(data=traces, layout=chart_layout(ticker, player_level, year, {}, lower_panels))
+        if binary:
+            for index, trace in enumerate(self.figure.data):
+                trace.update(numeric_axis_hover(index, trace))
+            self.figure.layout.xaxis.update(type='linear', tickmode='array')
+        self._structure = structure
+        self._trace_keys.clear()
+        self._layout_keys.clear()
+
+    def _set(self, fig: go.Figure, index: int, props: Dict[str, object], key: Hashable):
+        """トレースの属性を、前回と内容（key）が変わった場合だけ差し替える"""
+        changed = {name: value for name, value in props.items() if self._trace_keys.get((index, name)) != key}
+        if not changed:
+            return
+        fig.data[index].update(changed)
+        for name in changed:
+            self._trace_keys[(index, name)] = key
+
+    def _set_line(
+        self,
+        fig: go.Figure,
+        index: int,
+        x: np.ndarray,
+        ordinals: np.ndarray,
+        values: np.ndarray,
+        key: Tuple
+    ):
+        """
+        折れ線の配列を差し替える（点数が line_budget を超える場合はLTTBで間引く）
+
+        key は表示期間の (段の名前, start, end)。同じ期間なら間引きもやり直さない。
+        """
+        props = {'x': x, 'y': values}
+        if len(values) > self.line_budget:
+            if {self._trace_keys.get((index, name)) for name in props} == {key}:
+                return
+            rows = lttb_indices(ordinals, values, self.line_budget)
+            props = {name: array[rows] for name, array in props.items()}
+        self._set(fig, index, props, key)
+
+    def _relayout(self, fig: go.Figure, path: str, value):
+        """レイアウトの属性を、前回と値が変わった場合だけ差し替える"""
+        key = repr(value)
+        if self._layout_keys.get(path) == key:
+            return
+        fig.layout[path] = value
+        self._layout_keys[path] = key
+
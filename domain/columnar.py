@@ -0,0 +1,102 @@
+"""
+列指向の株価データ（メモリマップで開く読み取り専用の配列）
+"""
+import json
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .compact import CompactOHLCV
+from .price_series import OHLCV_COLUMNS, PriceSeries
+from .trading_calendar import TradingCalendar, from_day_ordinal
+
+
+# 1データセットは次のファイルで構成する:
+#   {name}.json       開始日・終了日と配列ファイル名（最後に置き換えるので、常に揃った配列を指す）
+#   {name}.*.ohlcv.npy (5, n) の float64 配列（行が OHLCV_COLUMNS の順。列ごとに連続したメモリ）
+#   {name}.*.days.npy  (n,) の int64 配列（エポックからの日数）
+# コンパクト形式（CompactOHLCV）の場合は ohlcv の代わりに次のファイルを置き、日付は int32 にする:
+#   {name}.*.prices.npy (4, n) の価格（int32 / float32 / float64。倍率はメタデータの price_scale）
+#   {name}.*.volume.npy (n,) の出来高（uint32 / uint64 / float64）
+META_SUFFIX = ".json"
+
+
+@dataclass(frozen=True)
+class ColumnarPrices:
+    """
+    メモリマップした1データセット分のOHLCV
+
+    配列はページキャッシュ上のファイルをそのまま参照するので、同じファイルを開いた
+    全プロセスでメモリを共有し、開くときにパースやコピーが発生しない。
+    """
+    ordinals: np.ndarray  # 営業日（エポックからの日数、int64）
+    values: np.ndarray  # OHLCV（行が OHLCV_COLUMNS の順、float64）
+    start_date: date  # ゲームの開始日
+    end_date: date  # ゲームの終了日
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def column(self, name: str) -> np.ndarray:
+        """列の配列を返す（コピーなし）"""
+        return self.values[OHLCV_COLUMNS.index(name)]
+
+    def calendar(self) -> TradingCalendar:
+        """営業日カレンダーを作成する（日付の配列はコピーしない）"""
+        return TradingCalendar(self.ordinals)
+
+    def to_series(self) -> PriceSeries:
+        """PriceSeries として返す（各列はメモリマップの行をそのまま参照する）"""
+        return PriceSeries.from_columns(self.ordinals, self.values)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        DataFrameとして返す
+
+        値は1つの2次元配列の転置ビューなので、DataFrameもメモリマップを参照したままになる
+        （コピーされるのは日付のインデックスだけ）。
+        """
+        index = pd.DatetimeIndex(self.ordinals.astype('datetime64[D]'), name='Date')
+        return pd.DataFrame(self.values.T, index=index, columns=list(OHLCV_COLUMNS), copy=False)
+
+
+def open_columnar(path: Union[str, Path]) -> Optional[ColumnarPrices]:
+    """
+    列指向の株価データをメモリマップで開く
+
+    Args:
+        path: データセットのパス（{name}.json の拡張子を除いた部分）
+
+    コンパクト形式で保存されている場合は float64 に戻したコピーを返す。
+
+    Returns:
+        Optional[ColumnarPrices]: 読み取り専用のデータ（ファイルが揃っていない場合はNone）
+    """
+    path = Path(path)
+    meta_path = path.with_name(path.name + META_SUFFIX)
+    if not meta_path.exists():
+        return None
+
+    meta = json.loads(meta_path.read_text())
+    ordinals = np.load(path.with_name(meta['days']), mmap_mode='r')
+    if 'prices' in meta:
+        ordinals, values = CompactOHLCV(
+            ordinals=ordinals,
+            prices=np.load(path.with_name(meta['prices']), mmap_mode='r'),
+            volume=np.load(path.with_name(meta['volume']), mmap_mode='r'),
+            price_scale=meta['price_scale']
+        ).decode()
+        ordinals.setflags(write=False)
+        values.setflags(write=False)
+    else:
+        values = np.load(path.with_name(meta['values']), mmap_mode='r')
+    return ColumnarPrices(
+        ordinals=ordinals,
+        values=values,
+        start_date=from_day_ordinal(meta['start']),
+        end_date=from_day_ordinal(meta['end'])
+    )
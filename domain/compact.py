@@ -0,0 +1,163 @@
+"""
+OHLCVのコンパクトな保存形式（表示する値が変わらない範囲で小さい型に詰める）
+"""
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+
+# 往復精度を保証する小数点以下の桁数（UIの表・チャートの表示桁数以上）
+PRICE_DECIMALS = 2
+
+# 価格を整数にするときに試す倍率（1円単位・0.1円単位・0.01単位）
+_PRICE_SCALES = (1, 10, 100)
+
+_INT32_MAX = np.iinfo(np.int32).max
+_UINT32_MAX = np.iinfo(np.uint32).max
+
+
+def encode_prices(prices: np.ndarray, decimals: int = PRICE_DECIMALS) -> Tuple[np.ndarray, int]:
+    """
+    価格の配列をできるだけ小さい型にする
+
+    1. 呼値が整数倍になっている価格（東証の1円・0.1円単位など）は倍率を掛けた int32
+       （元の float64 と完全に同じ値に戻る）
+    2. float32 に丸めても小数点以下 decimals 桁の表示が変わらない場合は float32
+    3. それ以外は float64 のまま
+
+    Args:
+        prices: 価格（float64）
+        decimals: 往復精度を保証する小数点以下の桁数
+
+    Returns:
+        Tuple[np.ndarray, int]: (詰めた配列, 倍率。浮動小数点のままの場合は0)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if prices.size == 0:
+        return prices.astype(np.float32), 0
+
+    if np.isfinite(prices).all():
+        largest = float(np.abs(prices).max())
+        for scale in _PRICE_SCALES:
+            if largest * scale > _INT32_MAX:
+                break
+            scaled = np.rint(prices * scale)
+            if np.array_equal(scaled / scale, prices):
+                return scaled.astype(np.int32), scale
+
+    return _float32_if_exact(prices, decimals), 0
+
+
+def _float32_if_exact(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    float32 に丸めても小数点以下 decimals 桁の表示が変わらない場合は float32、それ以外は元の配列
+
+    誤差が半桁未満でも丸めの境目（2345.6749999 など）をまたぐと表示が変わるので、
+    全ての値について小数点以下 decimals 桁に丸めた値が一致することを確かめる（NaN同士は一致とみなす）。
+    """
+    as_float32 = values.astype(np.float32)
+    if np.array_equal(
+        np.round(as_float32.astype(np.float64), decimals),
+        np.round(values, decimals),
+        equal_nan=True
+    ):
+        return as_float32
+    return values
+
+
+def decode_prices(encoded: np.ndarray, scale: int) -> np.ndarray:
+    """encode_prices() で詰めた価格を float64 に戻す"""
+    if scale:
+        return encoded.astype(np.float64) / scale
+    return encoded.astype(np.float64)
+
+
+def encode_plot_values(values: np.ndarray, decimals: int = PRICE_DECIMALS) -> np.ndarray:
+    """
+    チャートに渡す価格を小数点以下 decimals 桁に丸め、表示が変わらない範囲で float32 にする
+
+    Plotlyは NumPy 配列を型付き配列（base64）で送るので、float32 にすると送信量が半分になる。
+    整数にした価格はそのままでは描画できないので、encode_prices() と違って倍率は使わない。
+    NaN（SMAの先頭など）はそのまま残す。
+
+    Returns:
+        np.ndarray: float32（表示が変わる場合は float64）
+    """
+    values = np.round(np.asarray(values, dtype=np.float64), decimals)
+    return _float32_if_exact(values, decimals)
+
+
+def encode_volume(volume: np.ndarray) -> np.ndarray:
+    """
+    出来高を符号なし整数にする（整数でない値や欠損を含む場合は float64 のまま）
+
+    Returns:
+        np.ndarray: uint32（収まらない場合は uint64）または float64
+    """
+    volume = np.asarray(volume)
+    if volume.size == 0:
+        return volume.astype(np.uint32)
+    as_float = volume.astype(np.float64)
+    if not np.isfinite(as_float).all() or (as_float < 0).any() or not np.array_equal(np.floor(as_float), as_float):
+        return as_float
+    largest = volume.max()
+    return volume.astype(np.uint32 if largest <= _UINT32_MAX else np.uint64)
+
+
+@dataclass(frozen=True)
+class CompactOHLCV:
+    """
+    コンパクトな型で持つ1データセット分のOHLCV
+
+    日付は int32（エポックからの日数）、価格は encode_prices() の型、出来高は符号なし整数。
+    float64 / int64 のままより保存サイズがおよそ半分になる。
+    計算や描画の前に decode() で float64 に戻す。
+    """
+    ordinals: np.ndarray  # 営業日（int32）
+    prices: np.ndarray  # 始値・高値・安値・終値（4×n）
+    volume: np.ndarray  # 出来高（n）
+    price_scale: int  # 価格を整数にした倍率（浮動小数点のままの場合は0）
+
+    @classmethod
+    def encode(cls, ordinals: np.ndarray, values: np.ndarray, decimals: int = PRICE_DECIMALS) -> 'CompactOHLCV':
+        """
+        日付と (5, n) のOHLCV配列（OHLCV_COLUMNS の順）をコンパクトな型にする
+
+        Args:
+            ordinals: 営業日（エポックからの日数）
+            values: OHLCV（float64）
+            decimals: 価格の往復精度を保証する小数点以下の桁数
+        """
+        prices, scale = encode_prices(np.asarray(values[:4]), decimals)
+        return cls(
+            ordinals=np.asarray(ordinals).astype(np.int32),
+            prices=np.ascontiguousarray(prices),
+            volume=encode_volume(values[4]),
+            price_scale=scale
+        )
+
+    def decode(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        float64 に戻す
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: (日付 int64, OHLCV (5, n) float64)
+        """
+        values = np.empty((5, len(self.ordinals)), dtype=np.float64)
+        values[:4] = decode_prices(self.prices, self.price_scale)
+        values[4] = self.volume
+        return self.ordinals.astype(np.int64), values
+
+    def describe(self) -> dict:
+        """保存時にメタデータへ書き込む型の情報"""
+        return {
+            'days': self.ordinals.dtype.str,
+            'prices': self.prices.dtype.str,
+            'volume': self.volume.dtype.str,
+            'price_scale': self.price_scale,
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return self.ordinals.nbytes + self.prices.nbytes + self.volume.nbytes
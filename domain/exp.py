@@ -1,7 +1,136 @@
 """
 経験値・レベルアップ計算ロジック（純粋関数）
 """
-from typing import Dict
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+class LevelCurve:
+    """
+    レベル曲線: レベルごとの必要経験値と、レベル1からの累積経験値の表
+
+    累積経験値の表を前計算しておき、総経験値からのレベル判定を二分探索（O(log n)）で行う。
+    表は必要に応じて倍々に拡張する。サブクラスは required_exp() を実装する。
+    """
+
+    INITIAL_TABLE_SIZE = 128
+
+    def __init__(self):
+        # _cumulative[i] = レベル(i + 1)に到達するまでの累積経験値（_cumulative[0] = 0）
+        self._cumulative: List[int] = [0]
+        self._extend(self.INITIAL_TABLE_SIZE)
+
+    def required_exp(self, level: int) -> int:
+        """レベル level から次のレベルに上がるのに必要な経験値"""
+        raise NotImplementedError
+
+    def _extend(self, size: int):
+        """累積経験値の表を size レベル分まで作る"""
+        while len(self._cumulative) < size:
+            level = len(self._cumulative)
+            self._cumulative.append(self._cumulative[-1] + self.required_exp(level))
+
+    def cumulative_exp(self, level: int) -> int:
+        """レベル1からレベル level に到達するまでの累積経験値"""
+        if level > len(self._cumulative):
+            self._extend(max(level, 2 * len(self._cumulative)))
+        return self._cumulative[level - 1]
+
+    def total_exp(self, level: int, exp: int) -> int:
+        """(レベル, レベル内の経験値) を総経験値に変換する"""
+        return self.cumulative_exp(level) + exp
+
+    def level_for_total(self, total_exp: int) -> int:
+        """総経験値から到達レベルを求める（二分探索）"""
+        while total_exp >= self._cumulative[-1]:
+            self._extend(2 * len(self._cumulative))
+        return max(1, bisect_right(self._cumulative, total_exp))
+
+    def resolve(self, total_exp: int) -> Tuple[int, int]:
+        """
+        総経験値を (レベル, レベル内の経験値) に変換する
+
+        Returns:
+            Tuple[int, int]: (レベル, レベル内の経験値)
+        """
+        level = self.level_for_total(total_exp)
+        return level, total_exp - self.cumulative_exp(level)
+
+
+def _check_base(base: int) -> int:
+    """レベル曲線の係数を検証する（0以下だと累積経験値が増えず、レベル判定の表が無限に伸びる）"""
+    if base <= 0:
+        raise ValueError(f"レベル曲線の係数は正の値にしてください: {base}")
+    return base
+
+
+class LinearLevelCurve(LevelCurve):
+    """線形のレベル曲線（必要経験値 = レベル * base）"""
+
+    def __init__(self, base: int = 50):
+        self.base = _check_base(base)
+        super().__init__()
+
+    def required_exp(self, level: int) -> int:
+        return level * self.base
+
+
+class QuadraticLevelCurve(LevelCurve):
+    """二次のレベル曲線（必要経験値 = レベル^2 * base）"""
+
+    def __init__(self, base: int = 50):
+        self.base = _check_base(base)
+        super().__init__()
+
+    def required_exp(self, level: int) -> int:
+        return level * level * self.base
+
+
+class ExponentialLevelCurve(LevelCurve):
+    """指数のレベル曲線（必要経験値 = base * growth^(レベル - 1)）"""
+
+    def __init__(self, base: int = 50, growth: float = 1.5):
+        self.base = _check_base(base)
+        self.growth = growth
+        super().__init__()
+
+    def required_exp(self, level: int) -> int:
+        return max(1, int(round(self.base * self.growth ** (level - 1))))
+
+
+LEVEL_CURVES = {
+    'linear': LinearLevelCurve,
+    'quadratic': QuadraticLevelCurve,
+    'exponential': ExponentialLevelCurve,
+}
+
+
+@lru_cache(maxsize=None)
+def get_level_curve(kind: str = 'linear', base: int = 50) -> LevelCurve:
+    """種類と係数に対応するレベル曲線を返す（同じ組み合わせでは表を共有する）"""
+    return LEVEL_CURVES[kind](base)
+
+
+# ゲーム本編のレベル曲線（線形: レベル * 50で序盤を早く）
+DEFAULT_LEVEL_CURVE = get_level_curve('linear', 50)
+
+
+@dataclass(frozen=True)
+class ExpParams:
+    """経験値ルールのパラメータ（レベル曲線の調整用）"""
+    exp_rate: float = 0.0001  # 総資産増加に対する経験値レート（0.01%）
+    profit_bonus_rate: float = 0.001  # 利確ボーナスの経験値レート（0.1%）
+    curve: str = 'linear'  # レベル曲線の種類（LEVEL_CURVES のキー）
+    curve_base: int = 50  # レベル曲線の係数
+
+    @property
+    def level_curve(self) -> LevelCurve:
+        return get_level_curve(self.curve, self.curve_base)
+
+
+DEFAULT_EXP_PARAMS = ExpParams()
 
 
 def calc_exp_gain(before_value: float, after_value: float, rate: float = 0.0001) -> int:
@@ -38,7 +167,7 @@ def calc_profit_bonus_exp(profit: float, rate: float = 0.001) -> int:
     return int(profit * rate)
 
 
-def check_level_up(level: int, exp: int, exp_to_add: int) -> Dict:
+def check_level_up(level: int, exp: int, exp_to_add: int, curve: Optional[LevelCurve] = None) -> Dict:
     """
     レベルアップ判定を行う（純粋関数、SQLiteに依存しない）
 
@@ -46,6 +175,7 @@ def check_level_up(level: int, exp: int, exp_to_add: int) -> Dict:
         level: 現在のレベル
         exp: 現在の経験値
         exp_to_add: 追加する経験値
+        curve: レベル曲線（デフォルト: レベル * 50 の線形）
 
     Returns:
         dict: {
@@ -55,23 +185,19 @@ def check_level_up(level: int, exp: int, exp_to_add: int) -> Dict:
             'old_level': 元のレベル
         }
     """
-    new_exp = exp + exp_to_add
-    current_level = level
+    curve = curve if curve is not None else DEFAULT_LEVEL_CURVE
 
-    # レベルアップ判定（線形: レベル * 50で序盤を早く）
-    required_exp = current_level * 50
-    new_level = current_level
+    # 総経験値に換算して累積経験値の表から一度でレベルを求める
+    total_exp = curve.total_exp(level, exp + exp_to_add)
+    new_level, new_exp = curve.resolve(total_exp)
 
-    level_up = False
-    while new_exp >= required_exp:
-        new_exp -= required_exp
-        new_level += 1
-        required_exp = new_level * 50
-        level_up = True
+    # レベルが下がることはない
+    if new_level <= level:
+        new_level, new_exp = level, exp + exp_to_add
 
     return {
         'level': new_level,
         'exp': new_exp,
-        'level_up': level_up,
-        'old_level': current_level
+        'level_up': new_level > level,
+        'old_level': level
     }
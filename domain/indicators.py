@@ -0,0 +1,238 @@
+"""
+テクニカル指標の一括計算（NumPyベクトル演算、純粋なデータ構造）
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+# 移動平均線の解放レベル（ウィンドウ → レベル）
+SMA_UNLOCK_LEVELS = {
+    25: 4,
+    75: 5,
+}
+
+# 指標ごとの解放レベル（装備サイドバーで使用）
+INDICATOR_UNLOCK_LEVELS = {
+    'ema': 6,
+    'bollinger': 7,
+    'rsi': 8,
+    'macd': 9,
+    'atr': 10,
+}
+
+# 指標ごとの表示名
+INDICATOR_LABELS = {
+    'ema': "指数平滑移動平均 (EMA 20)",
+    'bollinger': "ボリンジャーバンド (20, ±2σ)",
+    'rsi': "RSI (14)",
+    'macd': "MACD (12, 26, 9)",
+    'atr': "ATR (14)",
+}
+
+
+@dataclass
+class IndicatorOverlay:
+    """チャートに重ねる指標の1系列（表示データと位置が揃った配列）"""
+    name: str
+    values: np.ndarray
+    color: str
+    panel: str = 'price'  # 'price'はローソク足と同じ軸、それ以外は下段のパネル名
+    dash: Optional[str] = None
+    kind: str = 'line'  # 'line' または 'bar'
+
+
+def _ewm(values: np.ndarray, alpha: float) -> np.ndarray:
+    """
+    指数平滑（adjust=False、先頭値で初期化）をブロック単位のベクトル演算で計算する
+
+    ブロック内では閉形式 e[k] = d^(k+1)·e0 + α·Σ d^(k-j)·x[j]（d = 1 - α）を
+    累積和で求める。d^(-k) が大きくなりすぎないようにブロック長を決める。
+    """
+    n = len(values)
+    result = np.empty(n)
+    if n == 0:
+        return result
+
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        result[:] = values
+        return result
+
+    block = max(1, min(n, int(np.log(1e4) / -np.log(decay))))
+    powers = decay ** np.arange(1, block + 1)  # d^1 .. d^B
+    inverse = decay ** -np.arange(block)  # d^0 .. d^-(B-1)
+
+    previous = values[0]
+    for begin in range(0, n, block):
+        chunk = values[begin:begin + block]
+        size = len(chunk)
+        weighted = np.cumsum(chunk * inverse[:size]) * (powers[:size] / decay)
+        result[begin:begin + size] = powers[:size] * previous + alpha * weighted
+        previous = result[begin + size - 1]
+
+    return result
+
+
+def _mask_head(values: np.ndarray, count: int) -> np.ndarray:
+    """先頭count本を計算期間不足としてNaNにする"""
+    values[:min(count, len(values))] = np.nan
+    return values
+
+
+class IndicatorLibrary:
+    """
+    データセットごとのテクニカル指標を計算・保持するクラス
+
+    全期間の指標を一度にベクトル演算で計算し、(指標名, パラメータ) ごとにキャッシュする。
+    返す配列は元データの行位置と揃っているので、表示期間は位置で切り出すだけでよい。
+    """
+
+    def __init__(self, open_: np.ndarray, high: np.ndarray, low: np.ndarray, close: np.ndarray):
+        self._open = np.ascontiguousarray(open_, dtype=np.float64)
+        self._high = np.ascontiguousarray(high, dtype=np.float64)
+        self._low = np.ascontiguousarray(low, dtype=np.float64)
+        self._close = np.ascontiguousarray(close, dtype=np.float64)
+        self._cache: Dict[Tuple, object] = {}
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame) -> 'IndicatorLibrary':
+        """株価データ（DataFrame）から作成する"""
+        return cls(
+            data['Open'].to_numpy(),
+            data['High'].to_numpy(),
+            data['Low'].to_numpy(),
+            data['Close'].to_numpy()
+        )
+
+    def __len__(self) -> int:
+        return len(self._close)
+
+    def _cached(self, key: Tuple, compute):
+        """キーに対応する計算結果をキャッシュから返す（なければ計算して保存）"""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    def ema(self, span: int = 20) -> np.ndarray:
+        """指数平滑移動平均（EMA）"""
+        def compute():
+            return _mask_head(_ewm(self._close, 2.0 / (span + 1)), span - 1)
+        return self._cached(('ema', span), compute)
+
+    def rsi(self, period: int = 14) -> np.ndarray:
+        """RSI（ワイルダーの平滑化）"""
+        def compute():
+            delta = np.diff(self._close, prepend=self._close[:1])
+            gain = np.clip(delta, 0.0, None)
+            loss = np.clip(-delta, 0.0, None)
+            avg_gain = _ewm(gain[1:], 1.0 / period)
+            avg_loss = _ewm(loss[1:], 1.0 / period)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rs = avg_gain / avg_loss
+                rsi = np.where(avg_loss == 0.0, 100.0, 100.0 - 100.0 / (1.0 + rs))
+            return _mask_head(np.concatenate(([np.nan], rsi)), period)
+        return self._cached(('rsi', period), compute)
+
+    def bollinger(self, window: int = 20, num_std: float = 2.0) -> Dict[str, np.ndarray]:
+        """ボリンジャーバンド {'middle', 'upper', 'lower'}"""
+        def compute():
+            n = len(self._close)
+            middle = np.full(n, np.nan)
+            std = np.full(n, np.nan)
+            if n >= window:
+                windows = sliding_window_view(self._close, window)
+                middle[window - 1:] = windows.mean(axis=1)
+                std[window - 1:] = windows.std(axis=1)
+            return {
+                'middle': middle,
+                'upper': middle + num_std * std,
+                'lower': middle - num_std * std,
+            }
+        return self._cached(('bollinger', window, num_std), compute)
+
+    def macd(self, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+        """MACD {'macd', 'signal', 'histogram'}"""
+        def compute():
+            macd = _ewm(self._close, 2.0 / (fast + 1)) - _ewm(self._close, 2.0 / (slow + 1))
+            signal_line = _ewm(macd, 2.0 / (signal + 1))
+            histogram = macd - signal_line
+            return {
+                'macd': _mask_head(macd, slow - 1),
+                'signal': _mask_head(signal_line, slow + signal - 2),
+                'histogram': _mask_head(histogram, slow + signal - 2),
+            }
+        return self._cached(('macd', fast, slow, signal), compute)
+
+    def atr(self, period: int = 14) -> np.ndarray:
+        """ATR（ワイルダーの平滑化）"""
+        def compute():
+            prev_close = np.concatenate((self._close[:1], self._close[:-1]))
+            true_range = np.maximum.reduce([
+                self._high - self._low,
+                np.abs(self._high - prev_close),
+                np.abs(self._low - prev_close),
+            ])
+            return _mask_head(_ewm(true_range, 1.0 / period), period - 1)
+        return self._cached(('atr', period), compute)
+
+    def compute_all(self):
+        """解放対象の全指標（デフォルトパラメータ）をまとめて計算する"""
+        self.ema()
+        self.rsi()
+        self.bollinger()
+        self.macd()
+        self.atr()
+
+
+def unlocked_indicators(player_level: int) -> List[str]:
+    """プレイヤーのレベルで解放済みの指標名を返す"""
+    return [name for name, level in INDICATOR_UNLOCK_LEVELS.items() if player_level >= level]
+
+
+def build_indicator_overlays(
+    library: IndicatorLibrary,
+    enabled: Dict[str, bool],
+    player_level: int,
+    start: int,
+    end: int
+) -> List[IndicatorOverlay]:
+    """
+    有効な指標を表示期間 [start, end) に切り出してチャート用の系列にする（純粋関数）
+
+    Args:
+        library: データセットの指標ライブラリ
+        enabled: 指標名ごとの有効/無効
+        player_level: プレイヤーのレベル（未解放の指標は表示しない）
+        start: 表示データの先頭の行位置
+        end: 表示データの最後の行位置 + 1
+
+    Returns:
+        List[IndicatorOverlay]: チャートに重ねる系列
+    """
+    overlays = []
+    for name in unlocked_indicators(player_level):
+        if not enabled.get(name, False):
+            continue
+
+        if name == 'ema':
+            overlays.append(IndicatorOverlay("EMA (20)", library.ema()[start:end], '#20BF6B'))
+        elif name == 'bollinger':
+            bands = library.bollinger()
+            overlays.append(IndicatorOverlay("BB +2σ", bands['upper'][start:end], '#778CA3', dash='dot'))
+            overlays.append(IndicatorOverlay("BB 中心線", bands['middle'][start:end], '#778CA3'))
+            overlays.append(IndicatorOverlay("BB -2σ", bands['lower'][start:end], '#778CA3', dash='dot'))
+        elif name == 'rsi':
+            overlays.append(IndicatorOverlay("RSI (14)", library.rsi()[start:end], '#EB3B5A', panel='rsi'))
+        elif name == 'macd':
+            lines = library.macd()
+            overlays.append(IndicatorOverlay("MACD", lines['macd'][start:end], '#3867D6', panel='macd'))
+            overlays.append(IndicatorOverlay("シグナル", lines['signal'][start:end], '#FA8231', panel='macd'))
+            overlays.append(IndicatorOverlay("ヒストグラム", lines['histogram'][start:end], '#A5B1C2', panel='macd', kind='bar'))
+        elif name == 'atr':
+            overlays.append(IndicatorOverlay("ATR (14)", library.atr()[start:end], '#8854D0', panel='atr'))
+
+    return overlays
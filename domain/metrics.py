@@ -0,0 +1,151 @@
+"""
+データセットごとの派生指標テーブル（1本ごとの前日比・窓・期間高安値）
+"""
+from dataclasses import dataclass
+from datetime import date
+
+import numpy as np
+
+from .price_series import PriceSeries
+
+
+# 窓開けとみなす始値の変化率（前日終値比、%）
+GAP_THRESHOLD_PCT = 2.0
+
+# 期間高値・安値の本数（約1年）
+RANGE_DAYS = 250
+
+
+@dataclass(frozen=True)
+class MetricsRow:
+    """派生指標テーブルの1行（HUD・メトリクスの描画にそのまま使う）"""
+    date: date
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+    change: float  # 前日比（金額）
+    change_pct: float  # 前日比（%）
+    gap: float  # 窓（始値 - 前日終値）
+    gap_pct: float  # 窓（%）
+    gap_direction: int  # 窓開け（1: 上、-1: 下、0: なし）
+    range_high: float  # 直近 range_days 本の最高値
+    range_low: float  # 直近 range_days 本の最安値
+
+
+def _rolling_extreme(values: np.ndarray, days: int, reducer, fill: float) -> np.ndarray:
+    """
+    直近 days 本（データが少ない先頭は全て）の最大値・最小値
+
+    days 本ごとのブロック内の前方・後方の累積を組み合わせる方法（van Herk / Gil-Werman）で、
+    ウィンドウの長さによらずO(n)で計算する。
+
+    Args:
+        values: 値
+        days: ウィンドウの本数
+        reducer: np.maximum または np.minimum
+        fill: ブロックの端数を埋める単位元（np.maximum なら -inf）
+    """
+    n = len(values)
+    result = np.empty(n)
+    if n == 0:
+        return result
+
+    head = min(days - 1, n)
+    result[:head] = reducer.accumulate(values[:head])
+    if n < days:
+        return result
+
+    blocks = -(-n // days)
+    padded = np.full(blocks * days, fill)
+    padded[:n] = values
+    padded = padded.reshape(blocks, days)
+    forward = reducer.accumulate(padded, axis=1).ravel()
+    backward = reducer.accumulate(padded[:, ::-1], axis=1)[:, ::-1].ravel()
+    result[days - 1:] = reducer(backward[:n - days + 1], forward[days - 1:n])
+    return result
+
+
+class MetricsTable:
+    """
+    データセットの全期間の派生指標を一度だけベクトル演算で計算して保持するテーブル
+
+    全ての列は元データの行位置と揃った読み取り専用の配列なので、HUD・メトリクスの現在日の値
+    （終値・前日比・窓・期間高安値）は row() で1行を取り出すだけになる（計算量は表示期間の長さによらず一定）。
+    SMA・指標はデータセットの MovingAverageEngine / IndicatorLibrary が、チャートの表示期間の
+    切り出しは ChartSession が受け持つので、このテーブルには持たない。
+    """
+
+    def __init__(
+        self,
+        series: PriceSeries,
+        range_days: int = RANGE_DAYS,
+        gap_threshold_pct: float = GAP_THRESHOLD_PCT
+    ):
+        """
+        Args:
+            series: 株価系列
+            range_days: 期間高値・安値の本数
+            gap_threshold_pct: 窓開けとみなす始値の変化率（%）
+        """
+        self.series = series
+        self.range_days = range_days
+        close = series.close
+        n = len(series)
+
+        # 先頭の行は前日がないので、前日比・窓とも0になるようにする
+        prev_close = np.empty(n)
+        gap_base = np.empty(n)
+        if n > 0:
+            prev_close[0] = close[0]
+            prev_close[1:] = close[:-1]
+            gap_base[0] = series.open[0]
+            gap_base[1:] = close[:-1]
+
+        change = close - prev_close
+        gap = series.open - gap_base
+        with np.errstate(divide='ignore', invalid='ignore'):
+            change_pct = np.where(prev_close != 0, change / prev_close * 100, 0.0)
+            gap_pct = np.where(gap_base != 0, gap / gap_base * 100, 0.0)
+        gap_direction = np.sign(gap_pct).astype(np.int8) * (np.abs(gap_pct) >= gap_threshold_pct)
+
+        self.change = _frozen(change)
+        self.change_pct = _frozen(change_pct)
+        self.gap = _frozen(gap)
+        self.gap_pct = _frozen(gap_pct)
+        self.gap_direction = _frozen(gap_direction)
+        self.range_high = _frozen(_rolling_extreme(series.high, range_days, np.maximum, -np.inf))
+        self.range_low = _frozen(_rolling_extreme(series.low, range_days, np.minimum, np.inf))
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def row(self, position: int) -> MetricsRow:
+        """
+        行位置の派生指標を返す（O(1)）
+
+        Args:
+            position: 行位置（TradingCalendar.position_of() の結果など）
+        """
+        series = self.series
+        return MetricsRow(
+            date=series.date_at(position),
+            open=float(series.open[position]),
+            high=float(series.high[position]),
+            low=float(series.low[position]),
+            close=float(series.close[position]),
+            volume=float(series.volume[position]),
+            change=float(self.change[position]),
+            change_pct=float(self.change_pct[position]),
+            gap=float(self.gap[position]),
+            gap_pct=float(self.gap_pct[position]),
+            gap_direction=int(self.gap_direction[position]),
+            range_high=float(self.range_high[position]),
+            range_low=float(self.range_low[position])
+        )
+
+
+def _frozen(values: np.ndarray) -> np.ndarray:
+    values.setflags(write=False)
+    return values
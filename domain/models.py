@@ -1,11 +1,14 @@
 """
 ドメインモデル: ゲームの状態を表すクラス
 """
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date
-from typing import List, Optional
+from typing import Hashable, List, Optional
+import numpy as np
 import pandas as pd
 
+from .trading_calendar import TradingCalendar
+
 
 @dataclass
 class GameState:
@@ -14,24 +17,73 @@ class GameState:
     start_date: Optional[date] = None
     end_date: Optional[date] = None
     stock_data: Optional[pd.DataFrame] = None
+    calendar: Optional[TradingCalendar] = None  # stock_dataの営業日カレンダー
+    dataset_key: Optional[Hashable] = None  # 共有データセットのハンドル（to_dict()はデータの代わりにこれを保存する）
+    _close_prices: Optional[np.ndarray] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # 終値の配列は作成時に一度だけ取り出して保持する（列のビューなのでコピーは発生しない）
+        if self.stock_data is not None:
+            self._close_prices = self.stock_data['Close'].to_numpy()
+
+    def get_calendar(self) -> Optional[TradingCalendar]:
+        """営業日カレンダーを取得（未作成の場合はstock_dataから一度だけ作成）"""
+        if self.calendar is None and self.stock_data is not None:
+            self.calendar = TradingCalendar.from_index(self.stock_data.index)
+        return self.calendar
+
+    def close_at(self, position: int) -> float:
+        """行位置の終値を返す"""
+        if self._close_prices is None:
+            self._close_prices = self.stock_data['Close'].to_numpy()
+        return float(self._close_prices[position])
 
     def to_dict(self) -> dict:
-        """辞書形式に変換（session_state保存用）"""
+        """
+        辞書形式に変換（session_state保存用）
+
+        共有データセットを使っている場合は、株価データではなくハンドルだけを保存する。
+        """
+        if self.dataset_key is not None:
+            return {
+                "current_date": self.current_date,
+                "start_date": self.start_date,
+                "end_date": self.end_date,
+                "dataset_key": self.dataset_key
+            }
         return {
             "current_date": self.current_date,
             "start_date": self.start_date,
             "end_date": self.end_date,
-            "stock_data": self.stock_data
+            "stock_data": self.stock_data,
+            "calendar": self.calendar
         }
 
     @classmethod
-    def from_dict(cls, data: dict) -> 'GameState':
-        """辞書から復元"""
+    def from_dict(cls, data: dict, dataset=None) -> 'GameState':
+        """
+        辞書から復元
+
+        Args:
+            data: to_dict()の戻り値
+            dataset: dataset_keyに対応する共有データセット（data, calendarを持つ）
+        """
+        if dataset is not None:
+            return cls(
+                current_date=data.get("current_date"),
+                start_date=data.get("start_date"),
+                end_date=data.get("end_date"),
+                stock_data=dataset.data,
+                calendar=dataset.calendar,
+                dataset_key=data.get("dataset_key")
+            )
         return cls(
             current_date=data.get("current_date"),
             start_date=data.get("start_date"),
             end_date=data.get("end_date"),
-            stock_data=data.get("stock_data")
+            stock_data=data.get("stock_data"),
+            calendar=data.get("calendar"),
+            dataset_key=data.get("dataset_key")
         )
 
 
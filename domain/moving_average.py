@@ -0,0 +1,111 @@
+"""
+移動平均線の逐次計算エンジン（純粋なデータ構造）
+"""
+from typing import Dict, Iterable
+
+import numpy as np
+import pandas as pd
+
+
+class MovingAverageEngine:
+    """
+    データセットごとの単純移動平均（SMA）を保持するエンジン
+
+    ウィンドウごとに直近の終値の合計（ランニングサム）を持ち、1営業日進むたびに
+    O(1)で1本分だけ計算を追加する。スキップなどで一度に複数日進んだ場合は
+    不足分を累積和でまとめて計算する。計算済みの値は全期間の配列に保持するので、
+    戻る・表示期間を変えるといった操作は位置ベースの切り出しだけで済む。
+    """
+
+    def __init__(self, close: np.ndarray, windows: Iterable[int] = (25, 75)):
+        """
+        Args:
+            close: 全期間の終値
+            windows: 計算するSMAのウィンドウサイズ
+        """
+        self._close = np.ascontiguousarray(close, dtype=np.float64)
+        self.windows = tuple(windows)
+        self._values: Dict[int, np.ndarray] = {
+            window: np.full(len(self._close), np.nan) for window in self.windows
+        }
+        self._sums: Dict[int, float] = {window: 0.0 for window in self.windows}
+        self._computed = 0  # 計算済みの本数（先頭からの行数）
+
+    @classmethod
+    def from_data(cls, data: pd.DataFrame, windows: Iterable[int] = (25, 75)) -> 'MovingAverageEngine':
+        """株価データ（DataFrame）からエンジンを作成する"""
+        return cls(data['Close'].to_numpy(), windows)
+
+    def __len__(self) -> int:
+        return len(self._close)
+
+    def _push(self):
+        """次の1本分のSMAをランニングサムで計算する（O(1)）"""
+        i = self._computed
+        price = self._close[i]
+        for window in self.windows:
+            total = self._sums[window] + price
+            if i >= window:
+                total -= self._close[i - window]
+            self._sums[window] = total
+            if i >= window - 1:
+                self._values[window][i] = total / window
+        self._computed += 1
+
+    def _extend(self, end: int):
+        """未計算の [計算済み位置, end) をまとめて計算する（累積和によるベクトル演算）"""
+        begin = self._computed
+        for window in self.windows:
+            first = max(begin, window - 1)
+            if first < end:
+                offset = first - window + 1
+                prefix = np.concatenate(([0.0], np.cumsum(self._close[offset:end])))
+                self._values[window][first:end] = (prefix[window:] - prefix[:-window]) / window
+            # ランニングサムを新しい末尾に合わせて作り直す
+            self._sums[window] = float(self._close[max(0, end - window):end].sum())
+        self._computed = end
+
+    def ensure(self, end: int):
+        """
+        先頭から end 本目までのSMAを計算済みにする
+
+        Args:
+            end: 必要な本数（表示する最後の行位置 + 1）
+        """
+        end = min(end, len(self._close))
+        if end <= self._computed:
+            return
+        if end == self._computed + 1:
+            self._push()
+        else:
+            self._extend(end)
+
+    def values(self, window: int, start: int, end: int) -> np.ndarray:
+        """
+        指定ウィンドウのSMAを位置 [start, end) で切り出す（コピーなし）
+
+        Args:
+            window: ウィンドウサイズ
+            start: 開始位置（含む）
+            end: 終了位置（含まない）
+
+        Returns:
+            np.ndarray: SMAの値（ウィンドウに満たない位置はNaN）
+        """
+        self.ensure(end)
+        return self._values[window][start:end]
+
+    def series_for(self, window: int, display_data: pd.DataFrame, end: int) -> pd.Series:
+        """
+        表示データに位置を合わせたSMAのSeriesを返す
+
+        Args:
+            window: ウィンドウサイズ
+            display_data: 表示用データ（全データの [end - len(display_data), end) の範囲）
+            end: 表示データの最後の行位置 + 1
+
+        Returns:
+            pd.Series: display_dataと同じインデックスのSMA
+        """
+        start = end - len(display_data)
+        return pd.Series(self.values(window, start, end), index=display_data.index, name=f"SMA{window}")
@@ -0,0 +1,157 @@
+"""
+NumPy配列による株価系列（ドメイン層のホットパス用の軽量コンテナ）
+"""
+from bisect import bisect_right
+from datetime import date
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .trading_calendar import from_day_ordinal, to_day_ordinal
+
+
+OHLCV_COLUMNS = ('Open', 'High', 'Low', 'Close', 'Volume')
+
+
+def _readonly(array: np.ndarray, dtype) -> np.ndarray:
+    """連続した読み取り専用の配列にする（元が連続していれば複製しない）"""
+    array = np.ascontiguousarray(array, dtype=dtype)
+    if array.flags.writeable:
+        array = array.view()
+        array.setflags(write=False)
+    return array
+
+
+class PriceSeries:
+    """
+    変更不可の株価系列
+
+    日付はエポックからの日数（int64）、OHLCVは列ごとに連続した float64 配列で持つ。
+    位置による値の取得はO(1)、期間の切り出しはコピーなしのビューで行うので、
+    再描画ごとのドメイン処理でpandasのラベル検索を使わずに済む。
+    DataFrameへの変換はUIとの境界（チャート・表の描画）でだけ行う。
+    """
+
+    __slots__ = ('ordinals', 'open', 'high', 'low', 'close', 'volume', '_ordinal_list')
+
+    def __init__(
+        self,
+        ordinals: np.ndarray,
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray
+    ):
+        """
+        Args:
+            ordinals: 営業日（エポックからの日数、昇順）
+            open_, high, low, close, volume: 各列の値（ordinalsと同じ長さ）
+        """
+        set_slot = object.__setattr__
+        set_slot(self, 'ordinals', _readonly(ordinals, np.int64))
+        for name, values in (('open', open_), ('high', high), ('low', low), ('close', close), ('volume', volume)):
+            values = _readonly(values, np.float64)
+            if len(values) != len(self.ordinals):
+                raise ValueError(f"{name} の長さが日付の数と一致しません")
+            set_slot(self, name, values)
+        # 1件ずつの日付検索用（必要になったときに一度だけ作る）
+        set_slot(self, '_ordinal_list', None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PriceSeries は変更できません")
+
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame) -> 'PriceSeries':
+        """DataFrame（DatetimeIndex + OHLCV列）から作成する"""
+        index = data.index.tz_localize(None) if data.index.tz is not None else data.index
+        ordinals = index.to_numpy(dtype='datetime64[D]').astype(np.int64)
+        return cls(ordinals, *(data[column].to_numpy(dtype=np.float64) for column in OHLCV_COLUMNS))
+
+    @classmethod
+    def from_columns(cls, ordinals: np.ndarray, values: np.ndarray) -> 'PriceSeries':
+        """日付と (5, n) のOHLCV配列から作成する（行が連続していれば複製しない）"""
+        return cls(ordinals, *values)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrameに変換する（UIとの境界で使う）"""
+        index = pd.DatetimeIndex(self.ordinals.astype('datetime64[D]'), name='Date')
+        return pd.DataFrame(
+            {column: getattr(self, column.lower()) for column in OHLCV_COLUMNS},
+            index=index,
+            copy=False
+        )
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def __getitem__(self, key: slice) -> 'PriceSeries':
+        """位置による切り出し（コピーなしのビュー）"""
+        if not isinstance(key, slice) or key.step not in (None, 1):
+            raise TypeError("PriceSeries は連続した範囲のスライスだけで切り出せます")
+        start, stop, _ = key.indices(len(self))
+        return PriceSeries(
+            self.ordinals[start:stop],
+            self.open[start:stop],
+            self.high[start:stop],
+            self.low[start:stop],
+            self.close[start:stop],
+            self.volume[start:stop]
+        )
+
+    def _ordinals_as_list(self) -> list:
+        if self._ordinal_list is None:
+            object.__setattr__(self, '_ordinal_list', self.ordinals.tolist())
+        return self._ordinal_list
+
+    @property
+    def first_date(self) -> Optional[date]:
+        return self.date_at(0) if len(self) > 0 else None
+
+    @property
+    def last_date(self) -> Optional[date]:
+        return self.date_at(len(self) - 1) if len(self) > 0 else None
+
+    @property
+    def last_close(self) -> float:
+        """最新の終値"""
+        return float(self.close[-1])
+
+    def date_at(self, position: int) -> date:
+        """行位置の日付（O(1)）"""
+        return from_day_ordinal(self.ordinals[position])
+
+    def close_at(self, position: int) -> float:
+        """行位置の終値（O(1)）"""
+        return float(self.close[position])
+
+    def position_of(self, d: date) -> int:
+        """指定日以前で最も新しい営業日の行位置（指定日以前にデータがない場合は-1）"""
+        return bisect_right(self._ordinals_as_list(), to_day_ordinal(d)) - 1
+
+    def window(self, d: date, size: Optional[int] = None) -> 'PriceSeries':
+        """
+        指定日までの最新 size 本を切り出す（コピーなし）
+
+        Args:
+            d: 基準日（この日を含む）
+            size: 切り出す本数（Noneの場合は先頭から全て）
+        """
+        end = self.position_of(d) + 1
+        start = 0 if size is None else max(0, end - size)
+        return self[start:end]
+
+    def price_change(self) -> Tuple[float, float]:
+        """
+        最新の終値の前日比
+
+        Returns:
+            Tuple[float, float]: (変化額, 変化率%)
+        """
+        if len(self) <= 1:
+            return 0.0, 0.0
+        current_price = float(self.close[-1])
+        prev_price = float(self.close[-2])
+        change = current_price - prev_price
+        return change, (change / prev_price) * 100
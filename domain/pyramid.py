@@ -0,0 +1,221 @@
+"""
+OHLCの多解像度ピラミッド（日足 → 週足 → 月足、分足 → 時間足 → 日足）
+"""
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .price_series import PriceSeries
+
+
+# チャートに一度に描画する本数の上限（これを超える期間は粗い足にまとめる）
+MAX_VISIBLE_BARS = 260
+
+# 段の表示名（まとめた足を表示するときにチャートのタイトルに添える）
+LEVEL_LABELS = {
+    'hour': "時間足",
+    'day': "日足",
+    'week': "週足",
+    'month': "月足",
+}
+
+
+def _week_keys(ordinals: np.ndarray) -> np.ndarray:
+    """週の番号（月曜日始まり。1970-01-01 は木曜日）"""
+    return (ordinals + 3) // 7
+
+
+def _month_keys(ordinals: np.ndarray) -> np.ndarray:
+    """月の番号（1970年1月からの月数）"""
+    return ordinals.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+
+
+@dataclass(frozen=True)
+class OHLCLevel:
+    """
+    ピラミッドの1段（1つの解像度の足）
+
+    各足は元の系列の連続した行 [starts[i], starts[i + 1]) をまとめたもの。
+    """
+    name: str
+    starts: np.ndarray  # 各足の最初の行位置（元の系列、int64）
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def bar_range(self, start: int, end: int) -> Tuple[int, int]:
+        """元の系列の [start, end) と重なる足の範囲 [first, last)"""
+        if start >= end:
+            return 0, 0
+        first = int(np.searchsorted(self.starts, start, side='right')) - 1
+        last = int(np.searchsorted(self.starts, end, side='left'))
+        return max(first, 0), last
+
+
+@dataclass(frozen=True)
+class OHLCWindow:
+    """表示期間をある解像度の足に切り出した結果（各足は元の系列の [first_positions, last_positions] の行）"""
+    level: str
+    first_positions: np.ndarray  # 各足の最初の行位置（X軸のラベルに使う）
+    last_positions: np.ndarray  # 各足の最後の行位置（SMAなど元の系列の値を取るときに使う）
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.first_positions)
+
+
+def aggregate(starts: np.ndarray, open_, high, low, close, volume) -> Tuple[np.ndarray, ...]:
+    """
+    連続した行のまとまりごとにOHLCVを集計する（ベクトル演算）
+
+    Args:
+        starts: 各まとまりの最初の行位置（昇順、先頭は0）
+
+    Returns:
+        Tuple[np.ndarray, ...]: (始値, 高値, 安値, 終値, 出来高)
+    """
+    ends = np.append(starts[1:], len(close))
+    return (
+        open_[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends - 1],
+        np.add.reduceat(volume, starts),
+    )
+
+
+class OHLCPyramid:
+    """
+    データセットごとに一度だけ作る多解像度のOHLC
+
+    1段目は元の系列そのもので、2段目以降は時刻から求めたキー（週・月など）が同じ行を
+    まとめた足を持つ。表示期間に合わせて select() で本数が上限に収まる最も細かい段を選び、
+    window() で切り出す。期間の端で途中までしか含まれない足は、未来の値が混ざらないように
+    表示期間内の行だけで集計し直す（その2本だけなので、期間の長さによらず処理量は一定）。
+    """
+
+    def __init__(
+        self,
+        keys_base: np.ndarray,
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray,
+        levels: Sequence[Tuple[str, Optional[Callable[[np.ndarray], np.ndarray]]]]
+    ):
+        """
+        Args:
+            keys_base: 各行の時刻（日足ならエポックからの日数、分足ならエポックからの秒数）
+            open_, high, low, close, volume: 元の系列
+            levels: (段の名前, 時刻から足のキーを求める関数) の一覧。細かい順で、先頭は元の系列（関数はNone）
+        """
+        self._open = np.asarray(open_, dtype=np.float64)
+        self._high = np.asarray(high, dtype=np.float64)
+        self._low = np.asarray(low, dtype=np.float64)
+        self._close = np.asarray(close, dtype=np.float64)
+        self._volume = np.asarray(volume, dtype=np.float64)
+        n = len(self._close)
+
+        self.levels: List[OHLCLevel] = []
+        for name, key_fn in levels:
+            if key_fn is None or n == 0:
+                starts = np.arange(n, dtype=np.int64)
+                bars = (self._open, self._high, self._low, self._close, self._volume)
+            else:
+                # キーが変わる行が次の足の始まり
+                keys = key_fn(np.asarray(keys_base))
+                starts = np.concatenate(([0], np.flatnonzero(np.diff(keys)) + 1)).astype(np.int64)
+                bars = aggregate(starts, self._open, self._high, self._low, self._close, self._volume)
+            self.levels.append(OHLCLevel(name, starts, *bars))
+
+    @classmethod
+    def daily(cls, series: PriceSeries) -> 'OHLCPyramid':
+        """日足の系列から 日足 → 週足 → 月足 のピラミッドを作る"""
+        return cls(
+            series.ordinals, series.open, series.high, series.low, series.close, series.volume,
+            levels=(('day', None), ('week', _week_keys), ('month', _month_keys))
+        )
+
+    @classmethod
+    def intraday(
+        cls,
+        seconds: np.ndarray,
+        open_: np.ndarray,
+        high: np.ndarray,
+        low: np.ndarray,
+        close: np.ndarray,
+        volume: np.ndarray
+    ) -> 'OHLCPyramid':
+        """分足の系列（時刻はエポックからの秒数）から 分足 → 時間足 → 日足 のピラミッドを作る"""
+        return cls(
+            seconds, open_, high, low, close, volume,
+            levels=(('minute', None), ('hour', lambda s: s // 3600), ('day', lambda s: s // 86400))
+        )
+
+    def level(self, name: str) -> OHLCLevel:
+        for level in self.levels:
+            if level.name == name:
+                return level
+        raise KeyError(name)
+
+    def select(self, start: int, end: int, budget: int = MAX_VISIBLE_BARS) -> OHLCLevel:
+        """
+        表示期間 [start, end) の本数が budget 以下になる最も細かい段を選ぶ（O(log n)）
+
+        どの段でも上限を超える場合は最も粗い段を返す。
+        """
+        for level in self.levels:
+            first, last = level.bar_range(start, end)
+            if last - first <= budget:
+                return level
+        return self.levels[-1]
+
+    def window(self, level: OHLCLevel, start: int, end: int) -> OHLCWindow:
+        """
+        表示期間 [start, end) を指定した段の足に切り出す
+
+        Args:
+            level: select() で選んだ段
+            start: 表示期間の最初の行位置（元の系列）
+            end: 表示期間の最後の行位置 + 1
+        """
+        first, last = level.bar_range(start, end)
+        starts = level.starts
+        first_positions = np.maximum(starts[first:last], start)
+        last_positions = np.minimum(np.append(starts[first + 1:last], end), end) - 1
+        columns = [
+            np.array(values[first:last], dtype=np.float64)
+            for values in (level.open, level.high, level.low, level.close, level.volume)
+        ]
+
+        # 期間の端で途中までしか含まれない足は、期間内の行だけで集計し直す
+        if last > first:
+            for i in {0, last - first - 1}:
+                bar_start, bar_end = first_positions[i], last_positions[i] + 1
+                full_start = starts[first + i]
+                full_end = starts[first + i + 1] if first + i + 1 < len(starts) else len(self._close)
+                if bar_start == full_start and bar_end == full_end:
+                    continue
+                bar = aggregate(
+                    np.array([0]),
+                    self._open[bar_start:bar_end],
+                    self._high[bar_start:bar_end],
+                    self._low[bar_start:bar_end],
+                    self._close[bar_start:bar_end],
+                    self._volume[bar_start:bar_end]
+                )
+                for column, value in zip(columns, bar):
+                    column[i] = value[0]
+
+        return OHLCWindow(level.name, first_positions, last_positions, *columns)
@@ -0,0 +1,231 @@
+"""
+営業日カレンダー: 日付と行位置の対応（純粋なデータ構造）
+"""
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+_EPOCH = date(1970, 1, 1)
+
+
+def to_day_ordinal(d: date) -> int:
+    """日付をエポック（1970-01-01）からの日数に変換"""
+    return (d - _EPOCH).days
+
+
+def from_day_ordinal(ordinal: int) -> date:
+    """エポック（1970-01-01）からの日数を日付に変換"""
+    return _EPOCH + timedelta(days=int(ordinal))
+
+
+class TradingCalendar:
+    """
+    データセットの営業日と行位置の対応表
+
+    データセットごとに一度だけ作成し、日付から行位置への変換を二分探索（O(log n)）、
+    行位置から日付への変換をO(1)で行う。DataFrameの切り出しは位置ベースなので
+    日付オブジェクトの配列やブールマスクを作らない。
+    """
+
+    def __init__(self, ordinals: np.ndarray):
+        """
+        Args:
+            ordinals: 昇順に並んだ営業日（エポックからの日数、int64）
+        """
+        self.ordinals = np.ascontiguousarray(ordinals, dtype=np.int64)
+        # 1件ずつの検索はPythonのリストに対するbisectの方が速い
+        self._ordinal_list = self.ordinals.tolist()
+
+    @classmethod
+    def from_index(cls, index: pd.DatetimeIndex) -> 'TradingCalendar':
+        """DatetimeIndexからカレンダーを作成する"""
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        return cls(index.to_numpy(dtype='datetime64[D]').astype(np.int64))
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    @property
+    def first_date(self) -> Optional[date]:
+        """最初の営業日"""
+        return self.date_at(0) if len(self) > 0 else None
+
+    @property
+    def last_date(self) -> Optional[date]:
+        """最後の営業日"""
+        return self.date_at(len(self) - 1) if len(self) > 0 else None
+
+    def date_at(self, position: int) -> date:
+        """行位置の日付を返す"""
+        return from_day_ordinal(self._ordinal_list[position])
+
+    def position_of(self, d: date) -> int:
+        """
+        指定日以前で最も新しい営業日の行位置を返す
+
+        Returns:
+            int: 行位置（指定日以前にデータがない場合は-1）
+        """
+        return bisect_right(self._ordinal_list, to_day_ordinal(d)) - 1
+
+    def next_position(self, d: date) -> int:
+        """
+        指定日より後の最初の営業日の行位置を返す
+
+        Returns:
+            int: 行位置（指定日より後にデータがない場合はlen(self)）
+        """
+        return bisect_right(self._ordinal_list, to_day_ordinal(d))
+
+    def advance_position(self, d: date, days: int = 1) -> Optional[int]:
+        """
+        指定日から営業日を指定日数分進めた行位置を返す
+
+        Returns:
+            Optional[int]: 進めた行位置（残りが足りない場合は最後の行位置、指定日より後にデータがない場合はNone）
+        """
+        next_pos = self.next_position(d)
+        if next_pos >= len(self):
+            return None
+        return min(next_pos + days - 1, len(self) - 1)
+
+    def advance(self, d: date, days: int = 1) -> Optional[date]:
+        """
+        指定日から営業日を指定日数分進めた日付を返す
+
+        Args:
+            d: 基準日
+            days: 進める営業日数
+
+        Returns:
+            Optional[date]: 進めた日付（残りが足りない場合は最後の営業日、指定日より後にデータがない場合はNone）
+        """
+        position = self.advance_position(d, days)
+        return self.date_at(position) if position is not None else None
+
+    def previous(self, d: date) -> Optional[date]:
+        """
+        指定日より前の最も新しい営業日を返す
+
+        Returns:
+            Optional[date]: 前の営業日（存在しない場合はNone）
+        """
+        prev_pos = bisect_left(self._ordinal_list, to_day_ordinal(d)) - 1
+        if prev_pos < 0:
+            return None
+        return self.date_at(prev_pos)
+
+    def window(self, data: pd.DataFrame, d: date, size: Optional[int] = None) -> pd.DataFrame:
+        """
+        指定日までのデータを位置ベースで切り出す（コピーなし）
+
+        Args:
+            data: カレンダーの元になったDataFrame
+            d: 基準日（この日を含む）
+            size: 切り出す行数（Noneの場合は先頭から全て）
+
+        Returns:
+            pd.DataFrame: 指定日までの最新size行
+        """
+        end = self.position_of(d) + 1
+        start = 0 if size is None else max(0, end - size)
+        return data.iloc[start:end]
+
+
+# Plotly の rangebreaks で使う曜日名（月曜日=0）
+_WEEKDAY_NAMES = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+def _weekday(ordinals: np.ndarray) -> np.ndarray:
+    """エポックからの日数の曜日（月曜日=0。1970-01-01 は木曜日）"""
+    return (ordinals + 3) % 7
+
+
+class NonTradingDays:
+    """
+    データセットの休場日（チャートの rangebreaks 用）
+
+    データセットごとに一度だけ作成し、毎週休みの曜日（土日など）は曜日のパターン、
+    それ以外の休場日（祝日など）は日付の配列として持つ。表示期間ごとの rangebreaks は
+    曜日の bounds 1つと期間内の祝日の短いリストになり、再描画のたびに日付の文字列を
+    大量に作らずに済む。
+    """
+
+    # 曜日のパターンを判定するのに必要な期間（日数）
+    MIN_SPAN_DAYS = 14
+
+    def __init__(self, ordinals: np.ndarray):
+        """
+        Args:
+            ordinals: 昇順に並んだ営業日（エポックからの日数）
+        """
+        ordinals = np.asarray(ordinals, dtype=np.int64)
+        self.weekend_bounds: Optional[tuple] = None
+        closed_weekdays: set = set()
+
+        if len(ordinals) > 0 and ordinals[-1] - ordinals[0] >= self.MIN_SPAN_DAYS:
+            closed_weekdays = set(range(7)) - set(np.unique(_weekday(ordinals)).tolist())
+            self.weekend_bounds = _weekday_bounds(closed_weekdays)
+            if self.weekend_bounds is None:
+                closed_weekdays = set()
+
+        if len(ordinals) > 0:
+            every_day = np.arange(ordinals[0], ordinals[-1] + 1, dtype=np.int64)
+            missing = np.setdiff1d(every_day, ordinals, assume_unique=True)
+            holidays = missing[~np.isin(_weekday(missing), list(closed_weekdays))]
+        else:
+            holidays = np.empty(0, dtype=np.int64)
+
+        self.holidays = holidays  # 曜日のパターン以外の休場日（エポックからの日数、昇順）
+        self._holiday_labels = np.datetime_as_string(holidays.astype('datetime64[D]'), unit='D')
+
+    @classmethod
+    def from_calendar(cls, calendar: TradingCalendar) -> 'NonTradingDays':
+        """営業日カレンダーから作成する"""
+        return cls(calendar.ordinals)
+
+    def holidays_between(self, first: int, last: int) -> list:
+        """期間 [first, last]（エポックからの日数）の祝日（'YYYY-MM-DD'）"""
+        lo = np.searchsorted(self.holidays, first, side='left')
+        hi = np.searchsorted(self.holidays, last, side='right')
+        return self._holiday_labels[lo:hi].tolist()
+
+    def rangebreaks(self, first: int, last: int) -> list:
+        """
+        表示期間 [first, last]（エポックからの日数）の Plotly の rangebreaks
+
+        Returns:
+            list: [{'bounds': ['sat', 'mon']}, {'values': [祝日, ...]}]（該当がないものは含めない）
+        """
+        breaks = []
+        if self.weekend_bounds is not None:
+            breaks.append(dict(bounds=list(self.weekend_bounds)))
+        holidays = self.holidays_between(first, last)
+        if holidays:
+            breaks.append(dict(values=holidays))
+        return breaks
+
+
+def _weekday_bounds(closed_weekdays: set) -> Optional[tuple]:
+    """
+    休みの曜日が連続している場合に rangebreaks の bounds（休みの初日, 再開日）を返す
+
+    例: {5, 6}（土日）→ ('sat', 'mon')。休みの曜日がない・連続していない場合はNone
+    """
+    if not closed_weekdays or len(closed_weekdays) >= 7:
+        return None
+    for first in closed_weekdays:
+        if (first - 1) % 7 in closed_weekdays:
+            continue
+        length = 0
+        while (first + length) % 7 in closed_weekdays:
+            length += 1
+        if length == len(closed_weekdays):
+            return _WEEKDAY_NAMES[first], _WEEKDAY_NAMES[(first + length) % 7]
+        return None
+    return None
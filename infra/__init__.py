@@ -3,9 +3,24 @@
 """
 
 from .db import DatabaseRepository
+from .exp_buffer import BufferedExpRepository
 from .data_fetcher import StockDataFetcher
+from .price_cache import PriceCache
+from .dataset_registry import DatasetRegistry
+from .columnar_store import ColumnarStore
+from .scenario_pack import ScenarioPack, ScenarioPackWriter
+from .synthetic import SyntheticSource, generate_ohlcv, synthetic_fetcher
 
 __all__ = [
     'DatabaseRepository',
+    'BufferedExpRepository',
     'StockDataFetcher',
+    'PriceCache',
+    'DatasetRegistry',
+    'ColumnarStore',
+    'ScenarioPack',
+    'ScenarioPackWriter',
+    'SyntheticSource',
+    'generate_ohlcv',
+    'synthetic_fetcher',
 ]
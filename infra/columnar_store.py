@@ -0,0 +1,153 @@
+"""
+列指向の株価データストア（メモリマップ用のNumPyファイル）
+"""
+import json
+import os
+import re
+import tempfile
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from domain.columnar import META_SUFFIX, OHLCV_COLUMNS, ColumnarPrices, open_columnar
+from domain.compact import CompactOHLCV
+from domain.trading_calendar import to_day_ordinal
+
+
+class ColumnarStore:
+    """
+    データセット（銘柄・年）ごとのOHLCVを非圧縮のNumPyファイルで保存するストア
+
+    圧縮しないのでファイルをそのままメモリマップでき、同じマシン上の複数のサーバープロセスが
+    ページキャッシュを共有する。書き込みは新しい名前の配列ファイルを作ってからメタデータを
+    置き換えるので、読み込み中のプロセスが途中まで書かれたファイルを見ることはない。
+    compact=True の場合はコンパクトな型（CompactOHLCV）で保存し、ファイルサイズをおよそ半分にする
+    （その代わり開くときに float64 に戻すコピーが発生する）。
+    """
+
+    def __init__(self, store_dir: str = ".cache/columnar", compact: bool = False):
+        """
+        Args:
+            store_dir: 保存先ディレクトリ
+            compact: Trueの場合はコンパクトな型で保存する
+        """
+        self.store_dir = Path(store_dir)
+        self.compact = compact
+
+    def path_for(self, ticker: str, year: int, days_before_start: int) -> Path:
+        """データセットのパス（拡張子を除いた部分）"""
+        safe_ticker = re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+        return self.store_dir / f"{safe_ticker}_{year}_{days_before_start}"
+
+    def open(self, ticker: str, year: int, days_before_start: int) -> Optional[ColumnarPrices]:
+        """
+        保存済みのデータセットをメモリマップで開く
+
+        Returns:
+            Optional[ColumnarPrices]: データ（保存されていない場合や読み込めない場合はNone）
+        """
+        try:
+            return open_columnar(self.path_for(ticker, year, days_before_start))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"列指向データの読み込みエラー（再取得します）: {e}")
+            return None
+
+    def is_fresh(self, ticker: str, year: int, days_before_start: int) -> bool:
+        """
+        保存済みのデータセットが最新かどうか
+
+        過去の年のデータは確定しているので常に最新とみなす。
+        今年以降のデータは今日書き込んだものだけを最新とみなす。
+        """
+        path = self.path_for(ticker, year, days_before_start)
+        meta_path = path.with_name(path.name + META_SUFFIX)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return False
+        today = date.today()
+        return year < today.year or meta.get('written') == to_day_ordinal(today)
+
+    def write(
+        self,
+        ticker: str,
+        year: int,
+        days_before_start: int,
+        data: pd.DataFrame,
+        start_date: date,
+        end_date: date
+    ):
+        """
+        データセットを書き込む
+
+        Args:
+            ticker: ティッカーシンボル
+            year: 年
+            days_before_start: 開始日の何日前から取得したか
+            data: OHLCVのDataFrame（DatetimeIndex）
+            start_date: ゲームの開始日
+            end_date: ゲームの終了日
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        path = self.path_for(ticker, year, days_before_start)
+
+        index = data.index.tz_localize(None) if data.index.tz is not None else data.index
+        days = index.to_numpy(dtype='datetime64[D]').astype(np.int64)
+        values = np.ascontiguousarray(
+            np.vstack([data[column].to_numpy(dtype=np.float64) for column in OHLCV_COLUMNS])
+        )
+
+        previous = self._array_files(path)
+        meta = {
+            'start': to_day_ordinal(start_date),
+            'end': to_day_ordinal(end_date),
+            'written': to_day_ordinal(date.today()),
+        }
+        if self.compact:
+            compact = CompactOHLCV.encode(days, values)
+            meta['prices'] = self._save_array(path, ".prices.npy", compact.prices)
+            meta['volume'] = self._save_array(path, ".volume.npy", compact.volume)
+            meta['days'] = self._save_array(path, ".days.npy", compact.ordinals)
+            meta['price_scale'] = compact.price_scale
+        else:
+            meta['values'] = self._save_array(path, ".ohlcv.npy", values)
+            meta['days'] = self._save_array(path, ".days.npy", days)
+        self._replace_meta(path, meta)
+
+        # 古い配列ファイルを削除する（開いているプロセスはメモリマップを使い続けられる）
+        for name in previous:
+            try:
+                (self.store_dir / name).unlink()
+            except OSError:
+                pass
+
+    def _array_files(self, path: Path):
+        """現在のメタデータが指している配列ファイル名"""
+        meta_path = path.with_name(path.name + META_SUFFIX)
+        try:
+            meta = json.loads(meta_path.read_text())
+        except (OSError, ValueError):
+            return []
+        return [meta[key] for key in ('values', 'prices', 'volume', 'days') if key in meta]
+
+    def _save_array(self, path: Path, suffix: str, array: np.ndarray) -> str:
+        """重複しない名前で配列ファイルを書き込み、ファイル名を返す"""
+        fd, tmp_path = tempfile.mkstemp(prefix=path.name + ".", suffix=suffix, dir=self.store_dir)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, array)
+        return Path(tmp_path).name
+
+    def _replace_meta(self, path: Path, meta: dict):
+        """メタデータをアトミックに置き換える"""
+        fd, tmp_path = tempfile.mkstemp(prefix=path.name + ".", suffix=".json.tmp", dir=self.store_dir)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(meta, f)
+            os.replace(tmp_path, path.with_name(path.name + META_SUFFIX))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
@@ -0,0 +1,155 @@
+"""
+SQLite接続の管理（接続プール・WALモード）
+"""
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Hashable, Iterator, List
+
+
+class PooledConnection(sqlite3.Connection):
+    """プールで管理する接続（適用済みの初期化処理の数を覚えておく）"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.initialized = 0
+
+
+class SQLiteConnectionManager:
+    """
+    スレッドセーフなSQLite接続プール
+
+    接続は使い回し、1つの接続を同時に使うのは1スレッドだけにする。
+    接続ごとに sqlite3 がコンパイル済みステートメントをキャッシュするので、
+    同じSQL文字列を使う限り毎回のパース・接続・fsyncのコストがかからない。
+    """
+
+    # 接続ごとに設定するプラグマ（WAL + 同期はNORMALで、書き込みごとのfsyncを避ける）
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA busy_timeout=5000",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA cache_size=-8000",
+    )
+
+    def __init__(self, db_path: str, max_idle: int = 8, cached_statements: int = 64):
+        """
+        Args:
+            db_path: データベースファイルパス
+            max_idle: プールに保持しておく未使用接続の最大数
+            cached_statements: 接続ごとにキャッシュするコンパイル済みステートメント数
+        """
+        self.db_path = db_path
+        self.cached_statements = cached_statements
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_idle)
+        self._initializers: List[Callable[[sqlite3.Connection], None]] = []
+        self._initializer_keys = set()
+        self._initializers_lock = threading.Lock()
+
+    def add_initializer(self, key: Hashable, initializer: Callable[[sqlite3.Connection], None]):
+        """
+        全ての接続に適用する初期化処理（SQL関数の登録など）を追加する
+
+        同じキーの初期化処理は一度だけ登録する。既存の接続には、次に貸し出すときに適用する。
+        """
+        with self._initializers_lock:
+            if key in self._initializer_keys:
+                return
+            self._initializer_keys.add(key)
+            self._initializers.append(initializer)
+
+    def _connect(self) -> sqlite3.Connection:
+        """新しい接続を作成し、プラグマを設定する"""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            timeout=5.0,
+            factory=PooledConnection
+        )
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """
+        プールから接続を借りる（with文を抜けるとプールに戻す）
+
+        Yields:
+            sqlite3.Connection: このスレッドだけが使う接続
+        """
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        # 接続後に追加された初期化処理を適用する
+        if conn.initialized < len(self._initializers):
+            for initializer in self._initializers[conn.initialized:]:
+                initializer(conn)
+            conn.initialized = len(self._initializers)
+
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        プールから借りた接続で1つのトランザクションを実行する（正常終了時にコミット）
+
+        Yields:
+            sqlite3.Connection: トランザクション中の接続
+        """
+        with self.connection() as conn:
+            with conn:
+                yield conn
+
+    @contextmanager
+    def immediate_transaction(self) -> Iterator[sqlite3.Connection]:
+        """
+        書き込みロックを最初に取るトランザクション（BEGIN IMMEDIATE）を実行する（正常終了時にコミット）
+
+        sqlite3 の既定の動作では ALTER TABLE などのDDLの前にトランザクションを開始しないので、
+        スキーマの変更とデータの書き換えを1つのトランザクションにまとめる場合はこちらを使う。
+        他のプロセスはコミットまで書き込みを待つので、途中の状態を見ることはない。
+
+        Yields:
+            sqlite3.Connection: トランザクション中の接続
+        """
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+            conn.commit()
+
+    def close_all(self):
+        """プール内の未使用接続を全て閉じる"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+_managers: Dict[str, SQLiteConnectionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path: str) -> SQLiteConnectionManager:
+    """データベースファイルごとに共有される接続マネージャを返す"""
+    with _managers_lock:
+        manager = _managers.get(db_path)
+        if manager is None:
+            manager = SQLiteConnectionManager(db_path)
+            _managers[db_path] = manager
+        return manager
@@ -1,17 +1,168 @@
 """
 外部データ取得（yfinance）
 """
+import threading
+import time
 import yfinance as yf
 import pandas as pd
-from datetime import datetime, timedelta
-from typing import Tuple, Optional
+from datetime import datetime, date, timedelta
+from typing import Callable, Dict, Iterable, List, Tuple, Optional
+
+from domain.columnar import ColumnarPrices
+from .price_cache import PriceCache
+from .columnar_store import ColumnarStore
+from .fetch_control import RetryPolicy, SingleFlight
+
+
+class DownloadError(Exception):
+    """ダウンロードでデータを取得できなかった（RetryPolicy のリトライ対象）"""
+
+
+def _yfinance_errors(tickers: Iterable[str]) -> Dict[str, str]:
+    """直前の yf.download() で yfinance が記録した銘柄ごとのエラー"""
+    errors = getattr(getattr(yf, 'shared', None), '_ERRORS', None) or {}
+    return {ticker: errors[ticker.upper()] for ticker in tickers if ticker.upper() in errors}
+
+
+# yfinance は yf.download() の結果とエラーをモジュールのグローバル変数（shared._DFS / _ERRORS）に
+# 溜めるので、同時に呼び出すと互いの結果が混ざる。プロセス内の呼び出しはこのロックで1つずつにする
+_yfinance_lock = threading.Lock()
+
+
+class YFinanceSource:
+    """
+    yfinanceによる株価データの取得元
+
+    yf.download() は失敗しても例外を送出せずに空のDataFrameを返すので、空の結果や
+    yfinance が記録したエラーは DownloadError にして、呼び出し側のリトライに任せる。
+    呼び出しはプロセス内で1つずつ行う（複数銘柄の並列ダウンロードは yfinance の threads=True に任せる）。
+    """
+
+    def download(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        """期間 [start, end) のデータをダウンロードする"""
+        with _yfinance_lock:
+            data = yf.download(ticker, start=start, end=end)
+            errors = _yfinance_errors([ticker])
+        if errors:
+            raise DownloadError(f"{ticker}: {errors[ticker]}")
+        if data.empty:
+            raise DownloadError(f"{ticker}: データがありません（{start} - {end}）")
+
+        # MultiIndexの場合は最初の銘柄を取得
+        if isinstance(data.columns, pd.MultiIndex):
+            data = data.xs(ticker, axis=1, level=1)
+
+        return data
+
+    def download_many(self, tickers: List[str], start: date, end: date) -> Dict[str, pd.DataFrame]:
+        """
+        複数銘柄の期間 [start, end) のデータを1回のリクエストでダウンロードする
+
+        全銘柄が取得できなかった場合は DownloadError を送出する。一部の銘柄だけが失敗した
+        場合はその銘柄を結果に含めない（銘柄ごとの取得で改めてダウンロードする）。
+
+        Returns:
+            Dict[str, DataFrame]: 銘柄ごとのデータ（データがなかった銘柄は含まない）
+        """
+        with _yfinance_lock:
+            data = yf.download(
+                list(tickers), start=start, end=end, group_by='column', progress=False, threads=True
+            )
+            errors = _yfinance_errors(tickers)
+        if data.empty or len(errors) == len(tickers):
+            detail = '; '.join(f"{ticker}: {error}" for ticker, error in errors.items())
+            raise DownloadError(detail or f"データがありません（{start} - {end}）")
+
+        if not isinstance(data.columns, pd.MultiIndex):
+            return {tickers[0]: data} if len(tickers) == 1 else {}
+
+        available = set(data.columns.get_level_values(1))
+        return {
+            ticker: data.xs(ticker, axis=1, level=1).dropna(how='all')
+            for ticker in tickers
+            if ticker in available and ticker not in errors
+        }
 
 
 class StockDataFetcher:
-    """株価データ取得クラス"""
+    """
+    株価データ取得クラス
+
+    同じ銘柄・年の同時取得は1回のダウンロードにまとめ（single-flight）、
+    ダウンロードの同時実行数を制限し、失敗時は指数バックオフでリトライする。
+    同時実行数の制限が効くのは独自の取得元（source）だけで、デフォルトの YFinanceSource は
+    yfinance のグローバル状態を守るためにプロセス内で1つずつダウンロードする。
+    """
+
+    def __init__(
+        self,
+        cache: Optional[PriceCache] = None,
+        offline: bool = False,
+        columnar: Optional[ColumnarStore] = None,
+        source=None,
+        max_concurrent_downloads: int = 4,
+        retry: Optional[RetryPolicy] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        compact: bool = False
+    ):
+        """
+        Args:
+            cache: 永続キャッシュ（Noneの場合はデフォルトの保存先を使用）
+            offline: Trueの場合はネットワークに接続せず、キャッシュのみから応答する
+            columnar: メモリマップ用の列指向ストア（Noneの場合はデフォルトの保存先を使用）
+            source: 株価データの取得元（download(ticker, start, end) を持つ。Noneの場合はyfinance）
+            max_concurrent_downloads: ダウンロードの最大同時実行数（独自の取得元のみ。
+                YFinanceSource はこの値に関係なく1つずつダウンロードする）
+            retry: ダウンロード失敗時のリトライ設定（Noneの場合はデフォルト設定）
+            sleep: リトライの待機に使う関数
+            compact: Trueの場合、デフォルトのキャッシュとストアをコンパクトな型で保存する
+        """
+        self.cache = cache if cache is not None else PriceCache(compact=compact)
+        self.offline = offline
+        self.columnar = columnar if columnar is not None else ColumnarStore(compact=compact)
+        self.source = source if source is not None else YFinanceSource()
+        self.retry = retry if retry is not None else RetryPolicy()
+        self._sleep = sleep
+        self.max_concurrent_downloads = max_concurrent_downloads
+        self._flights = SingleFlight()
+        # 取得元が並列に呼び出せる場合の同時実行数の上限（YFinanceSource は _yfinance_lock で常に1つ）
+        self._download_slots = threading.BoundedSemaphore(max_concurrent_downloads)
+        # 同じ銘柄のキャッシュ更新を直列化する（別の年の取得が互いの追記を上書きしないように）
+        self._ticker_locks: Dict[str, threading.Lock] = {}
+        self._ticker_locks_lock = threading.Lock()
+
+    def fetch_columnar(
+        self,
+        ticker: str,
+        year: int,
+        days_before_start: int = 220
+    ) -> Optional[ColumnarPrices]:
+        """
+        株価データを列指向ストアから取得する（メモリマップ、パースなし）
+
+        ストアにない場合や今年のデータが古い場合は fetch_data() で取得して書き込む。
+        再取得に失敗した場合は古いデータを返す。
+
+        Returns:
+            Optional[ColumnarPrices]: 読み取り専用のデータ（取得できない場合はNone）
+        """
+        prices = self.columnar.open(ticker, year, days_before_start)
+        if prices is not None and (self.offline or self.columnar.is_fresh(ticker, year, days_before_start)):
+            return prices
+
+        data, start_date, end_date = self.fetch_data(ticker, year, days_before_start=days_before_start)
+        if data is None:
+            return prices
+
+        try:
+            self.columnar.write(ticker, year, days_before_start, data, start_date, end_date)
+        except OSError as e:
+            print(f"列指向データの書き込みエラー: {e}")
+            return prices
+        return self.columnar.open(ticker, year, days_before_start)
 
-    @staticmethod
     def fetch_data(
+        self,
         ticker: str,
         year: int,
         days_before_start: int = 220
@@ -27,19 +178,116 @@ class StockDataFetcher:
         Returns:
             Tuple[DataFrame, start_date, end_date]: (データ, 開始日, 終了日)
         """
+        return self._flights.do(
+            (ticker, year, days_before_start),
+            lambda: self._fetch_data(ticker, year, days_before_start)
+        )
+
+    def fetch_many(
+        self,
+        tickers: Iterable[str],
+        years: Iterable[int],
+        days_before_start: int = 220,
+        batch_size: int = 50
+    ) -> Dict[Tuple[str, int], Tuple[Optional[pd.DataFrame], Optional[datetime.date], Optional[datetime.date]]]:
+        """
+        複数銘柄・複数年の株価データをまとめて取得する
+
+        まず全銘柄について全年分の期間をキャッシュに揃え（不足している銘柄だけを
+        batch_size 銘柄ずつまとめて順にダウンロード）、その後はキャッシュから銘柄・年ごとに切り出す。
+
+        Args:
+            tickers: ティッカーシンボルの一覧
+            years: 取得する年の一覧
+            days_before_start: 開始日の何日前から取得するか
+            batch_size: 1回のダウンロードにまとめる銘柄数
+
+        Returns:
+            Dict[(ticker, year), Tuple[DataFrame, start_date, end_date]]: fetch_data() と同じ形式の結果
+            （取得できなかった組み合わせは (None, None, None)）
+        """
+        tickers = list(dict.fromkeys(tickers))
+        years = sorted(set(years))
+        if tickers and years and not self.offline:
+            start = (datetime(years[0], 1, 1) - timedelta(days=days_before_start)).date()
+            end = date(years[-1], 12, 31)
+            self.prefetch(tickers, start, end, batch_size=batch_size)
+
+        return {
+            (ticker, year): self.fetch_data(ticker, year, days_before_start=days_before_start)
+            for ticker in tickers
+            for year in years
+        }
+
+    def prefetch(
+        self,
+        tickers: List[str],
+        start: date,
+        end: date,
+        batch_size: int = 50
+    ) -> int:
+        """
+        期間 [start, end) の各銘柄のデータをキャッシュに揃える
+
+        不足期間が同じ銘柄をまとめてダウンロードし、銘柄ごとに分けてキャッシュに追記する。
+        バッチは順に1つずつダウンロードする（バッチ内の銘柄は取得元が並列に取得する）。
+
+        Returns:
+            int: 実行したダウンロードの回数
+        """
+        covered_end = min(end, date.today())
+
+        # 不足期間ごとに銘柄をまとめる
+        groups: Dict[Tuple[date, date], List[str]] = {}
+        for ticker in tickers:
+            entry = self.cache.load(ticker)
+            if entry is not None and entry.covers(start, end):
+                continue
+            fetch_range = (start, end) if entry is None else entry.missing_range(start, end)
+            groups.setdefault(fetch_range, []).append(ticker)
+
+        batches = [
+            (names[i:i + batch_size], fetch_start, fetch_end)
+            for (fetch_start, fetch_end), names in groups.items()
+            for i in range(0, len(names), batch_size)
+        ]
+        if not batches:
+            return 0
+
+        for names, fetch_start, fetch_end in batches:
+            try:
+                self._prefetch_batch(names, fetch_start, fetch_end, covered_end)
+            except Exception as e:
+                print(f"一括データ取得エラー: {e}")
+        return len(batches)
+
+    def _prefetch_batch(self, tickers: List[str], fetch_start: date, fetch_end: date, covered_end: date):
+        """1バッチ分をダウンロードし、銘柄ごとにキャッシュへ追記する"""
+        frames = self._download_many(tickers, fetch_start, fetch_end)
+        for ticker in tickers:
+            new_data = frames.get(ticker)
+            if new_data is None or new_data.empty:
+                continue
+            with self._ticker_lock(ticker):
+                entry = self.cache.load(ticker)
+                self.cache.merge(ticker, entry, new_data, fetch_start, min(fetch_end, covered_end))
+
+    def _fetch_data(
+        self,
+        ticker: str,
+        year: int,
+        days_before_start: int
+    ) -> Tuple[Optional[pd.DataFrame], Optional[datetime.date], Optional[datetime.date]]:
+        """fetch_data() の本体（同じ引数の同時呼び出しはまとめられる）"""
         try:
             # 開始日の指定日数前からデータを取得
             game_start = datetime(year, 1, 1)
             data_start = game_start - timedelta(days=days_before_start)
             end = datetime(year, 12, 31)
 
-            data = yf.download(ticker, start=data_start, end=end)
-
-            # MultiIndexの場合は最初の銘柄を取得
-            if isinstance(data.columns, pd.MultiIndex):
-                data = data.xs(ticker, axis=1, level=1)
+            data = self._load_prices(ticker, data_start.date(), end.date())
 
-            if data.empty:
+            if data is None or data.empty:
                 return None, None, None
 
             # ゲームの開始日を決定
@@ -63,3 +311,65 @@ class StockDataFetcher:
         except Exception as e:
             print(f"データ取得エラー: {e}")
             return None, None, None
+
+    def _load_prices(self, ticker: str, start: date, end: date) -> Optional[pd.DataFrame]:
+        """
+        期間 [start, end) のOHLCVデータをキャッシュ優先で取得する
+
+        キャッシュで足りない期間だけをダウンロードして追記する。
+        オフラインモードやダウンロード失敗時は、キャッシュにあるデータだけを返す。
+        """
+        with self._ticker_lock(ticker):
+            return self._load_prices_locked(ticker, start, end)
+
+    def _ticker_lock(self, ticker: str) -> threading.Lock:
+        with self._ticker_locks_lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _load_prices_locked(self, ticker: str, start: date, end: date) -> Optional[pd.DataFrame]:
+        entry = self.cache.load(ticker)
+
+        if entry is not None and entry.covers(start, end):
+            return entry.slice(start, end)
+
+        if self.offline:
+            return entry.slice(start, end) if entry is not None else None
+
+        # 未来の日付はまだ確定していないので、取得済み期間は今日までとする
+        covered_end = min(end, date.today())
+
+        if entry is None:
+            fetch_start, fetch_end = start, end
+        else:
+            fetch_start, fetch_end = entry.missing_range(start, end)
+
+        try:
+            new_data = self._download(ticker, fetch_start, fetch_end)
+        except Exception as e:
+            if entry is None:
+                raise
+            print(f"データ取得エラー（キャッシュを使用）: {e}")
+            return entry.slice(start, end)
+
+        if new_data.empty:
+            return entry.slice(start, end) if entry is not None else new_data
+
+        entry = self.cache.merge(ticker, entry, new_data, fetch_start, min(fetch_end, covered_end))
+        return entry.slice(start, end)
+
+    def _download_many(self, tickers: List[str], start: date, end: date) -> Dict[str, pd.DataFrame]:
+        """
+        取得元から複数銘柄をまとめてダウンロードする
+
+        取得元が download_many() を持たない場合は1銘柄ずつダウンロードする。
+        """
+        download_many = getattr(self.source, 'download_many', None)
+        if download_many is None:
+            return {ticker: self._download(ticker, start, end) for ticker in tickers}
+        with self._download_slots:
+            return self.retry.call(lambda: download_many(tickers, start, end), sleep=self._sleep)
+
+    def _download(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        """取得元から期間 [start, end) のデータをダウンロードする（同時実行数の制限・リトライ付き）"""
+        with self._download_slots:
+            return self.retry.call(lambda: self.source.download(ticker, start, end), sleep=self._sleep)
@@ -0,0 +1,217 @@
+"""
+プロセス全体で共有する株価データセットのレジストリ
+"""
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from domain.columnar import ColumnarPrices
+from domain.chart_session import ChartArrays
+from domain.metrics import MetricsTable
+from domain.pyramid import OHLCPyramid
+from domain.price_series import PriceSeries
+from domain.trading_calendar import NonTradingDays, TradingCalendar
+from domain.moving_average import MovingAverageEngine
+from domain.indicators import IndicatorLibrary
+from .data_fetcher import StockDataFetcher
+from .scenario_pack import ScenarioPack
+
+
+@dataclass(frozen=True)
+class DatasetKey:
+    """データセットのハンドル（セッションはこのキーと現在日付だけを持つ）"""
+    ticker: str
+    year: int
+    days_before_start: int = 220
+
+
+@dataclass(frozen=True)
+class SharedDataset:
+    """
+    全セッションで共有する読み取り専用のデータセット
+
+    株価データと、そこから一度だけ作る営業日カレンダー・SMA・テクニカル指標をまとめて持つ。
+    SMAと指標は作成時に全期間を計算済みにするので、共有しても書き込みは発生しない。
+    ドメイン処理は series（NumPy配列）を使い、data（DataFrame）はチャートや表の描画にだけ使う。
+    前日比・窓・期間高安値などの1本ごとの派生指標も metrics に計算済みで持つ。
+    チャートの rangebreaks に使う休場日（non_trading_days）と、長い表示期間を週足・月足で
+    描画するための多解像度OHLC（pyramid）、チャートに渡す日付のラベルと丸めた価格
+    （chart_arrays）も一度だけ作っておき、セッションは切り出すだけにする。
+    """
+    key: DatasetKey
+    data: pd.DataFrame
+    series: PriceSeries
+    start_date: date
+    end_date: date
+    calendar: TradingCalendar
+    close: np.ndarray
+    sma_engine: MovingAverageEngine
+    indicator_library: IndicatorLibrary
+    metrics: MetricsTable
+    non_trading_days: NonTradingDays
+    pyramid: OHLCPyramid
+    chart_arrays: ChartArrays
+
+    @classmethod
+    def build(
+        cls,
+        key: DatasetKey,
+        data: pd.DataFrame,
+        start_date: date,
+        end_date: date,
+        calendar: Optional[TradingCalendar] = None,
+        series: Optional[PriceSeries] = None
+    ) -> 'SharedDataset':
+        """株価データから共有データセットを作成する"""
+        if series is None:
+            series = PriceSeries.from_frame(data)
+        close = series.close
+
+        sma_engine = MovingAverageEngine(close)
+        sma_engine.ensure(len(sma_engine))
+        indicator_library = IndicatorLibrary.from_data(data)
+        indicator_library.compute_all()
+        metrics = MetricsTable(series)
+        if calendar is None:
+            calendar = TradingCalendar.from_index(data.index)
+
+        return cls(
+            key=key,
+            data=data,
+            series=series,
+            start_date=start_date,
+            end_date=end_date,
+            calendar=calendar,
+            close=close,
+            sma_engine=sma_engine,
+            indicator_library=indicator_library,
+            metrics=metrics,
+            non_trading_days=NonTradingDays.from_calendar(calendar),
+            pyramid=OHLCPyramid.daily(series),
+            chart_arrays=ChartArrays.from_series(series)
+        )
+
+    @classmethod
+    def from_columnar(cls, key: DatasetKey, prices: ColumnarPrices) -> 'SharedDataset':
+        """メモリマップした列指向データから共有データセットを作成する（価格の配列はコピーしない）"""
+        return cls.build(
+            key,
+            prices.to_frame(),
+            prices.start_date,
+            prices.end_date,
+            calendar=prices.calendar(),
+            series=prices.to_series()
+        )
+
+
+class DatasetRegistry:
+    """
+    銘柄・年ごとに1つだけデータセットを保持するレジストリ（st.cache_resource と同じ考え方）
+
+    データは StockDataFetcher の列指向ストアからメモリマップで開くので、同じマシン上の
+    複数のサーバープロセスも価格データのメモリを共有する。シナリオパックを渡した場合は
+    パックに収録されているデータセットをネットワークに接続せずにパックから読み込む。
+    同じキーを同時に要求された場合も取得は1回だけ行う。取得に失敗した場合は
+    記録しないので、次の要求で再取得する。Streamlitに依存しないのでCLIやテストからも使える。
+    プロセス全体で共有する場合は、呼び出し側で1つだけ作って使い回す（app.py では st.cache_resource）。
+
+    保持するデータセットは最近使った max_datasets 件まで（LRU）。外したデータセットは
+    次に要求されたときに列指向ストアまたはシナリオパックから開き直す（メモリマップなので再ダウンロードはしない）。
+    """
+
+    def __init__(
+        self,
+        fetcher: Optional[StockDataFetcher] = None,
+        packs: Sequence[ScenarioPack] = (),
+        max_datasets: int = 8
+    ):
+        """
+        Args:
+            fetcher: 株価データの取得に使うフェッチャー（省略時はデフォルト設定）
+            packs: 先に探すシナリオパック
+            max_datasets: 保持するデータセットの最大数
+        """
+        self.fetcher = fetcher or StockDataFetcher()
+        self.packs = list(packs)
+        self.max_datasets = max(1, max_datasets)
+        self._datasets: 'OrderedDict[DatasetKey, SharedDataset]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._key_locks: Dict[DatasetKey, threading.Lock] = {}
+
+    def __contains__(self, key: DatasetKey) -> bool:
+        return key in self._datasets
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    def peek(self, key: DatasetKey) -> Optional[SharedDataset]:
+        """取得済みのデータセットを返す（未取得の場合は取得せずにNone）"""
+        return self._datasets.get(key)
+
+    def get(self, key: DatasetKey) -> Optional[SharedDataset]:
+        """
+        データセットを返す（未取得の場合は取得して登録する）
+
+        Args:
+            key: データセットのハンドル
+
+        Returns:
+            Optional[SharedDataset]: 共有データセット（取得に失敗した場合はNone）
+        """
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is not None:
+                self._datasets.move_to_end(key)
+                return dataset
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            # 待っている間に他のスレッドが取得済みの場合
+            dataset = self._datasets.get(key)
+            if dataset is not None:
+                return dataset
+
+            prices = self._load_from_packs(key)
+            if prices is None:
+                prices = self.fetcher.fetch_columnar(
+                    key.ticker, key.year, days_before_start=key.days_before_start
+                )
+            if prices is None:
+                return None
+
+            dataset = SharedDataset.from_columnar(key, prices)
+            with self._lock:
+                self._datasets[key] = dataset
+                while len(self._datasets) > self.max_datasets:
+                    oldest, _ = self._datasets.popitem(last=False)
+                    self._key_locks.pop(oldest, None)
+            return dataset
+
+    def _load_from_packs(self, key: DatasetKey) -> Optional[ColumnarPrices]:
+        for pack in self.packs:
+            prices = pack.load(key.ticker, key.year, key.days_before_start)
+            if prices is not None:
+                return prices
+        return None
+
+    def scenario_keys(self) -> list:
+        """シナリオパックに収録されているデータセットの一覧"""
+        return [DatasetKey(*key) for pack in self.packs for key in pack.keys()]
+
+    def evict(self, key: DatasetKey):
+        """データセットを登録から外す（使用中のセッションは参照を持ち続ける）"""
+        with self._lock:
+            self._datasets.pop(key, None)
+            self._key_locks.pop(key, None)
+
+    def clear(self):
+        """全てのデータセットを登録から外す"""
+        with self._lock:
+            self._datasets.clear()
+            self._key_locks.clear()
+
@@ -2,108 +2,242 @@
 データベース操作（SQLite）
 """
 import sqlite3
-from typing import Optional, Dict
-from domain.exp import check_level_up
+import threading
+from typing import Optional, Dict, Tuple
+from domain.exp import DEFAULT_LEVEL_CURVE, LevelCurve
+from .connection_manager import get_connection_manager
+
+
+# プレイヤーIDを指定しない場合のプレイヤー（player_id列を追加する前のデータもこのプレイヤーになる）
+DEFAULT_PLAYER_ID = "default"
+
+# よく使うSQL（文字列を固定して、接続ごとのコンパイル済みステートメントを再利用する）
+_SELECT_PLAYER_STATS_SQL = 'SELECT level, exp FROM player_stats WHERE player_id = ?'
+_INSERT_PLAYER_SQL = '''
+    INSERT INTO player_stats (player_id, level, exp, total_exp) VALUES (?, 1, 0, 0)
+    ON CONFLICT(player_id) DO NOTHING
+'''
+_UPDATE_STATS_SQL = '''
+    UPDATE player_stats
+    SET level = ?, exp = ?, total_exp = ?, updated_at = CURRENT_TIMESTAMP
+    WHERE player_id = ?
+'''
+_RESET_PLAYER_SQL = '''
+    UPDATE player_stats
+    SET level = 1, exp = 0, total_exp = 0, updated_at = CURRENT_TIMESTAMP
+    WHERE player_id = ?
+'''
+
+
+def _level_function_names(curve: LevelCurve) -> Tuple[str, str]:
+    """レベル曲線ごとのSQL関数名（レベル, レベル内の経験値）"""
+    suffix = format(id(curve), 'x')
+    return f"curve_level_{suffix}", f"curve_exp_{suffix}"
+
+
+def register_level_functions(conn: sqlite3.Connection, curve: LevelCurve = DEFAULT_LEVEL_CURVE):
+    """総経験値からレベルを求めるSQL関数を接続に登録する"""
+    level_function, exp_function = _level_function_names(curve)
+    conn.create_function(level_function, 1, curve.level_for_total, deterministic=True)
+    conn.create_function(exp_function, 1, lambda total_exp: curve.resolve(total_exp)[1], deterministic=True)
+
+
+def _grant_exp_sql(curve: LevelCurve) -> str:
+    """
+    経験値を加算する1文のUPDATE（読み取りと書き込みを分けないので同時実行でも加算が失われない）
+
+    レベルと経験値は加算後の総経験値からSQL関数で求め、RETURNINGで結果を受け取る。
+    """
+    level_function, exp_function = _level_function_names(curve)
+    return f'''
+        UPDATE player_stats
+        SET total_exp = total_exp + :exp_to_add,
+            level = {level_function}(total_exp + :exp_to_add),
+            exp = {exp_function}(total_exp + :exp_to_add),
+            updated_at = CURRENT_TIMESTAMP
+        WHERE player_id = :player_id
+        RETURNING level, exp, total_exp
+    '''
+
+
+def _grant_result(curve: LevelCurve, row: Tuple[int, int, int], exp_to_add: int) -> Dict:
+    """RETURNINGの結果を check_level_up() と同じ形式の辞書にする"""
+    level, exp, total_exp = row
+    old_level = curve.level_for_total(total_exp - exp_to_add)
+    return {
+        'level': level,
+        'exp': exp,
+        'level_up': level > old_level,
+        'old_level': old_level
+    }
 
 
 class DatabaseRepository:
-    """データベースリポジトリ（SQLite操作を抽象化）"""
+    """
+    データベースリポジトリ（SQLite操作を抽象化）
 
-    def __init__(self, db_path: str = "trading_game.db"):
+    プレイヤーごとのステータスを player_id で管理する。読み取ったステータスはプロセス内に
+    キャッシュし、このリポジトリを通した書き込みで更新するので、再描画のたびにDBを読まない。
+    （同じDBに別のプロセスから書き込む場合、そのプロセスの書き込みはキャッシュに反映されない）
+    """
+
+    def __init__(self, db_path: str = "trading_game.db", curve: LevelCurve = DEFAULT_LEVEL_CURVE):
         self.db_path = db_path
+        self.curve = curve  # レベル曲線
+        # 同じファイルを使うリポジトリ同士で接続プールを共有する
+        self.connections = get_connection_manager(db_path)
+        self.connections.add_initializer(
+            _level_function_names(curve),
+            lambda conn: register_level_functions(conn, curve)
+        )
+        self._grant_exp_sql = _grant_exp_sql(curve)
+        # プレイヤーごとのステータスのキャッシュ（読み取りで埋め、書き込みで更新する）
+        self._stats_cache: Dict[str, Dict[str, int]] = {}
+        self._stats_cache_lock = threading.Lock()
         self._init_db()
 
     def _init_db(self):
-        """データベースとテーブルを初期化"""
-        conn = sqlite3.connect(self.db_path, check_same_thread=False)
-        c = conn.cursor()
+        """
+        データベースとテーブルを初期化
 
-        # 経験値とレベルのテーブルを作成
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS player_stats (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                level INTEGER DEFAULT 1,
-                exp INTEGER DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        列の追加と既存の行の書き換えを1つのトランザクションで行う（途中で落ちても列だけが
+        追加された状態は残らず、次の起動でマイグレーションをやり直す）。
+        """
+        with self.connections.immediate_transaction() as conn:
+            c = conn.cursor()
+
+            # 経験値とレベルのテーブルを作成（1プレイヤー1行）
+            c.execute('''
+                CREATE TABLE IF NOT EXISTS player_stats (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    player_id TEXT,
+                    level INTEGER DEFAULT 1,
+                    exp INTEGER DEFAULT 0,
+                    total_exp INTEGER DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            self._migrate_total_exp(c)
+            self._migrate_player_id(c)
+            c.execute(
+                'CREATE UNIQUE INDEX IF NOT EXISTS idx_player_stats_player_id ON player_stats (player_id)'
             )
-        ''')
 
-        # 初期データが存在しない場合は作成
-        c.execute('SELECT COUNT(*) FROM player_stats')
-        if c.fetchone()[0] == 0:
-            c.execute('INSERT INTO player_stats (level, exp) VALUES (1, 0)')
+            # デフォルトプレイヤーが存在しない場合は作成
+            c.execute(_INSERT_PLAYER_SQL, (DEFAULT_PLAYER_ID,))
+
+    def _migrate_total_exp(self, c: sqlite3.Cursor):
+        """total_exp列がない古いデータベースに列を追加し、レベルと経験値から値を埋める"""
+        columns = [row[1] for row in c.execute('PRAGMA table_info(player_stats)')]
+        if 'total_exp' in columns:
+            return
+        c.execute('ALTER TABLE player_stats ADD COLUMN total_exp INTEGER DEFAULT 0')
+        rows = c.execute('SELECT id, level, exp FROM player_stats').fetchall()
+        c.executemany(
+            'UPDATE player_stats SET total_exp = ? WHERE id = ?',
+            [(self.curve.total_exp(level, exp), row_id) for row_id, level, exp in rows]
+        )
+
+    def _migrate_player_id(self, c: sqlite3.Cursor):
+        """
+        player_id列がない古いデータベースに列を追加する
 
-        conn.commit()
-        conn.close()
+        これまで使われていた最新の行をデフォルトプレイヤーにし、それ以前の行には重複しないIDを振る。
+        """
+        columns = [row[1] for row in c.execute('PRAGMA table_info(player_stats)')]
+        if 'player_id' in columns:
+            return
+        c.execute('ALTER TABLE player_stats ADD COLUMN player_id TEXT')
+        c.execute('''
+            UPDATE player_stats
+            SET player_id = CASE
+                WHEN id = (SELECT MAX(id) FROM player_stats) THEN ?
+                ELSE 'legacy-' || id
+            END
+        ''', (DEFAULT_PLAYER_ID,))
 
     def get_connection(self) -> sqlite3.Connection:
-        """データベース接続を取得"""
-        return sqlite3.connect(self.db_path, check_same_thread=False)
+        """データベース接続を取得（呼び出し側で閉じる専用の接続）"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        register_level_functions(conn, self.curve)
+        return conn
+
+    def _cache_stats(self, player_id: str, level: int, exp: int) -> Dict[str, int]:
+        stats = {'level': level, 'exp': exp}
+        with self._stats_cache_lock:
+            self._stats_cache[player_id] = stats
+        return dict(stats)
+
+    def invalidate_cache(self, player_id: Optional[str] = None):
+        """キャッシュしたステータスを捨てる（player_idを省略した場合は全プレイヤー）"""
+        with self._stats_cache_lock:
+            if player_id is None:
+                self._stats_cache.clear()
+            else:
+                self._stats_cache.pop(player_id, None)
+
+    def get_player_stats(self, player_id: str = DEFAULT_PLAYER_ID) -> Dict[str, int]:
+        """
+        プレイヤーの経験値とレベルを取得（キャッシュにない場合だけDBを読む）
+
+        Args:
+            player_id: プレイヤーID
 
-    def get_player_stats(self) -> Dict[str, int]:
-        """プレイヤーの経験値とレベルを取得"""
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('SELECT level, exp FROM player_stats ORDER BY id DESC LIMIT 1')
-        result = c.fetchone()
-        conn.close()
+        Returns:
+            dict: {'level': int, 'exp': int}
+        """
+        with self._stats_cache_lock:
+            cached = self._stats_cache.get(player_id)
+        if cached is not None:
+            return dict(cached)
+
+        with self.connections.connection() as conn:
+            result = conn.execute(_SELECT_PLAYER_STATS_SQL, (player_id,)).fetchone()
 
         if result:
-            return {'level': result[0], 'exp': result[1]}
+            return self._cache_stats(player_id, result[0], result[1])
         return {'level': 1, 'exp': 0}
 
-    def update_exp(self, exp_to_add: int) -> Optional[Dict]:
+    def update_exp(self, exp_to_add: int, player_id: str = DEFAULT_PLAYER_ID) -> Optional[Dict]:
         """
         経験値を追加し、レベルアップ判定を行う
 
+        1文のUPDATE ... RETURNINGで加算するので、複数のセッションが同時に
+        経験値を追加しても互いの加算を上書きしない。
+
         Args:
             exp_to_add: 追加する経験値
+            player_id: プレイヤーID（初めてのプレイヤーの場合は行を作成する）
 
         Returns:
-            dict: check_level_up()の戻り値、またはNone
+            dict: check_level_up()と同じ形式の結果、またはNone
         """
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('SELECT level, exp FROM player_stats ORDER BY id DESC LIMIT 1')
-        result = c.fetchone()
-
-        if result:
-            current_level = result[0]
-            current_exp = result[1]
-
-            # 純粋関数でレベルアップ判定
-            level_up_result = check_level_up(current_level, current_exp, exp_to_add)
-
-            # データベースを更新
-            self._update_exp_in_db(conn, level_up_result['level'], level_up_result['exp'])
-
-            conn.close()
-            return level_up_result
-        conn.close()
-        return None
-
-    def _update_exp_in_db(self, conn: sqlite3.Connection, level: int, exp: int):
-        """データベースにレベルと経験値を更新する"""
-        c = conn.cursor()
-        c.execute('''
-            UPDATE player_stats
-            SET level = ?, exp = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = (SELECT id FROM player_stats ORDER BY id DESC LIMIT 1)
-        ''', (level, exp))
-        conn.commit()
-
-    def reset_player_stats(self):
+        params = {'exp_to_add': exp_to_add, 'player_id': player_id}
+        with self.connections.transaction() as conn:
+            row = conn.execute(self._grant_exp_sql, params).fetchone()
+            if row is None:
+                conn.execute(_INSERT_PLAYER_SQL, (player_id,))
+                row = conn.execute(self._grant_exp_sql, params).fetchone()
+
+        if row is None:
+            self.invalidate_cache(player_id)
+            return None
+        result = _grant_result(self.curve, row, exp_to_add)
+        self._cache_stats(player_id, result['level'], result['exp'])
+        return result
+
+    def _update_exp_in_db(self, conn: sqlite3.Connection, level: int, exp: int, player_id: str = DEFAULT_PLAYER_ID):
+        """データベースにレベルと経験値を更新する（コミットは呼び出し側のトランザクションで行う）"""
+        conn.execute(_UPDATE_STATS_SQL, (level, exp, self.curve.total_exp(level, exp), player_id))
+        self.invalidate_cache(player_id)
+
+    def reset_player_stats(self, player_id: str = DEFAULT_PLAYER_ID):
         """プレイヤーステータスをリセット"""
-        conn = self.get_connection()
-        c = conn.cursor()
-        c.execute('''
-            UPDATE player_stats
-            SET level = 1, exp = 0, updated_at = CURRENT_TIMESTAMP
-            WHERE id = (SELECT id FROM player_stats ORDER BY id DESC LIMIT 1)
-        ''')
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as conn:
+            conn.execute(_INSERT_PLAYER_SQL, (player_id,))
+            conn.execute(_RESET_PLAYER_SQL, (player_id,))
+        self._cache_stats(player_id, 1, 0)
 
 
 # ============================================================================
@@ -135,7 +269,7 @@ def get_player_stats(conn: sqlite3.Connection) -> Dict[str, int]:
         dict: {'level': int, 'exp': int}
     """
     c = conn.cursor()
-    c.execute('SELECT level, exp FROM player_stats ORDER BY id DESC LIMIT 1')
+    c.execute(_SELECT_PLAYER_STATS_SQL, (DEFAULT_PLAYER_ID,))
     result = c.fetchone()
     if result:
         return {'level': result[0], 'exp': result[1]}
@@ -152,11 +286,7 @@ def update_exp_in_db(conn: sqlite3.Connection, level: int, exp: int):
         exp: 更新する経験値
     """
     c = conn.cursor()
-    c.execute('''
-        UPDATE player_stats
-        SET level = ?, exp = ?, updated_at = CURRENT_TIMESTAMP
-        WHERE id = (SELECT id FROM player_stats ORDER BY id DESC LIMIT 1)
-    ''', (level, exp))
+    c.execute(_UPDATE_STATS_SQL, (level, exp, DEFAULT_LEVEL_CURVE.total_exp(level, exp), DEFAULT_PLAYER_ID))
     conn.commit()
 
 
@@ -171,21 +301,11 @@ def update_exp(conn: sqlite3.Connection, exp_to_add: int) -> Optional[Dict]:
     Returns:
         dict: check_level_up()の戻り値、またはNone
     """
-    from domain.exp import check_level_up
-
+    # 読み取りと書き込みを1文で行い、同時実行でも加算を失わない
+    register_level_functions(conn, DEFAULT_LEVEL_CURVE)
     c = conn.cursor()
-    c.execute('SELECT level, exp FROM player_stats ORDER BY id DESC LIMIT 1')
+    c.execute(_grant_exp_sql(DEFAULT_LEVEL_CURVE), {'exp_to_add': exp_to_add, 'player_id': DEFAULT_PLAYER_ID})
     result = c.fetchone()
+    conn.commit()
 
-    if result:
-        current_level = result[0]
-        current_exp = result[1]
-
-        # 純粋関数でレベルアップ判定
-        level_up_result = check_level_up(current_level, current_exp, exp_to_add)
-
-        # データベースを更新
-        update_exp_in_db(conn, level_up_result['level'], level_up_result['exp'])
-
-        return level_up_result
-    return None
+    return _grant_result(DEFAULT_LEVEL_CURVE, result, exp_to_add) if result else None
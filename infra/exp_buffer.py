@@ -0,0 +1,171 @@
+"""
+経験値の書き込みバッファ（write-behind）
+"""
+import atexit
+import threading
+import time
+from typing import Dict, Optional
+
+from domain.exp import DEFAULT_LEVEL_CURVE, check_level_up
+from .db import DEFAULT_PLAYER_ID
+
+
+class BufferedExpRepository:
+    """
+    経験値の加算をメモリに溜めてまとめてSQLiteに書き込むリポジトリ
+
+    1人のプレイヤーを担当し、DatabaseRepositoryと同じインターフェースを持つ。加算ごとのレベルアップ判定は
+    check_level_up() でメモリ上で行い、次のいずれかで溜めた経験値を1回の更新で書き込む:
+
+    - レベルアップしたとき（装備の解放がDBのレベルとずれないように）
+    - 溜めた加算の件数が max_pending に達したとき
+    - 最初の加算から max_age 秒経ったとき（タイマー）
+    - flush() / close() を呼んだとき（セッション終了・プロセス終了時）
+
+    加算ごとのDBへの書き込みをなくすため、溜めた加算はメモリにだけ持つ（クラッシュセーフではない）。
+    保証するのは次の2点:
+
+    - 書き込みは1つのトランザクションで行うので、DBに途中までの加算が残ることはない
+    - 通常の終了（atexit）・タイマー・レベルアップでは溜めた加算を書き込む。プロセスが異常終了した
+      場合に失われるのは、最後の書き込み以降の加算（最大 max_pending 件・max_age 秒分）だけ
+    """
+
+    def __init__(
+        self,
+        repository,
+        player_id: str = DEFAULT_PLAYER_ID,
+        max_pending: int = 20,
+        max_age: float = 5.0
+    ):
+        """
+        Args:
+            repository: 書き込み先のリポジトリ（update_exp / get_player_stats / reset_player_stats を持つ）
+            player_id: プレイヤーID
+            max_pending: まとめて書き込むまでに溜める加算の最大件数
+            max_age: 最初の加算から書き込みまでの最大秒数
+        """
+        self.repository = repository
+        self.player_id = player_id
+        self.curve = getattr(repository, 'curve', DEFAULT_LEVEL_CURVE)
+        self.max_pending = max_pending
+        self.max_age = max_age
+
+        self._lock = threading.RLock()
+        self._pending_exp = 0
+        self._pending_count = 0
+        self._pending_since: Optional[float] = None
+        self._timer: Optional[threading.Timer] = None
+
+        stats = repository.get_player_stats(player_id)
+        self._level = stats['level']
+        self._exp = stats['exp']
+
+        # プロセス終了時に溜めた経験値を書き込む
+        atexit.register(self.close)
+
+    @property
+    def pending_exp(self) -> int:
+        """まだ書き込んでいない経験値"""
+        return self._pending_exp
+
+    def get_player_stats(self) -> Dict[str, int]:
+        """プレイヤーの経験値とレベルを取得（書き込み前の加算を含む、DBには問い合わせない）"""
+        with self._lock:
+            return {'level': self._level, 'exp': self._exp}
+
+    def update_exp(self, exp_to_add: int) -> Optional[Dict]:
+        """
+        経験値を追加し、レベルアップ判定を行う
+
+        Args:
+            exp_to_add: 追加する経験値
+
+        Returns:
+            dict: check_level_up()と同じ形式の結果（書き込んだ場合はDBの結果）
+        """
+        with self._lock:
+            result = check_level_up(self._level, self._exp, exp_to_add, self.curve)
+            self._level = result['level']
+            self._exp = result['exp']
+            self._pending_exp += exp_to_add
+            self._pending_count += 1
+            if self._pending_since is None:
+                self._pending_since = time.monotonic()
+                self._schedule_flush()
+
+            if (result['level_up']
+                    or self._pending_count >= self.max_pending
+                    or time.monotonic() - self._pending_since >= self.max_age):
+                flushed = self.flush()
+                if flushed is not None:
+                    # 他の書き込みで先にレベルアップしていた場合も加算前のレベルを基準にする
+                    flushed['old_level'] = min(flushed['old_level'], result['old_level'])
+                    flushed['level_up'] = flushed['level'] > flushed['old_level']
+                    return flushed
+            return result
+
+    def flush(self) -> Optional[Dict]:
+        """
+        溜めた経験値を1回の更新で書き込む
+
+        書き込みに失敗した場合は溜めた経験値を残したまま例外を送出する（次の書き込みで再試行）。
+
+        Returns:
+            dict: DBのupdate_exp()の結果（書き込むものがない場合はNone）
+        """
+        with self._lock:
+            self._cancel_timer()
+            if self._pending_count == 0:
+                return None
+
+            exp_to_write = self._pending_exp
+            result = self.repository.update_exp(exp_to_write, self.player_id)
+
+            self._pending_exp = 0
+            self._pending_count = 0
+            self._pending_since = None
+            if result is not None:
+                # 他のセッションの加算も含めたDBの値に合わせる
+                self._level = result['level']
+                self._exp = result['exp']
+            return result
+
+    def reset_player_stats(self):
+        """プレイヤーステータスをリセット（書き込み前の加算は捨てる）"""
+        with self._lock:
+            self._cancel_timer()
+            self._pending_exp = 0
+            self._pending_count = 0
+            self._pending_since = None
+            self.repository.reset_player_stats(self.player_id)
+            self._level = 1
+            self._exp = 0
+
+    def close(self):
+        """溜めた経験値を書き込み、タイマーを止める"""
+        try:
+            self.flush()
+        finally:
+            atexit.unregister(self.close)
+
+    def _schedule_flush(self):
+        """max_age 秒後に書き込むタイマーを設定する"""
+        self._timer = threading.Timer(self.max_age, self._flush_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # 溜めた経験値は残っているので、タイマーを設定し直して再試行する
+            print(f"経験値の書き込みに失敗しました: {e}")
+            with self._lock:
+                if self._pending_count > 0 and self._timer is None:
+                    self._schedule_flush()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
@@ -0,0 +1,114 @@
+"""
+データ取得の流量制御（同一リクエストの集約・同時実行数の制限・リトライ）
+"""
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Hashable, Iterator, Optional, Tuple, Type, TypeVar
+
+
+T = TypeVar('T')
+
+
+class _Flight:
+    """実行中の1回分の呼び出し"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    同じキーの同時呼び出しを1回の実行にまとめる
+
+    実行中のキーを別のスレッドが呼び出した場合は、新たに実行せずに
+    最初の呼び出しの完了を待ち、同じ結果（または例外）を受け取る。
+    完了後の呼び出しは新たに実行する（結果のキャッシュは呼び出し側の責任）。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[Hashable, _Flight] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """
+        キーに対して fn を実行する（同じキーが実行中の場合はその結果を待つ）
+
+        Args:
+            key: 呼び出しを識別するキー
+            fn: 実行する関数
+
+        Returns:
+            fn の戻り値
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result
+
+    def in_flight(self) -> int:
+        """実行中のキーの数"""
+        with self._lock:
+            return len(self._flights)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """
+    指数バックオフ（ジッター付き）によるリトライの設定
+
+    attempts回まで実行し、n回目の失敗後は base_delay * 2**(n-1) 秒（最大 max_delay 秒）を
+    上限とするランダムな時間だけ待ってから再実行する。
+    """
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 8.0
+    retry_on: Tuple[Type[BaseException], ...] = (Exception,)
+
+    def delays(self) -> Iterator[float]:
+        """各リトライの前に待つ秒数"""
+        for failure in range(1, self.attempts):
+            yield random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (failure - 1)))
+
+    def call(self, fn: Callable[[], T], sleep: Callable[[float], None] = time.sleep) -> T:
+        """
+        fn をリトライ付きで実行する
+
+        Args:
+            fn: 実行する関数
+            sleep: 待機に使う関数（テストでは待たない関数に差し替える）
+
+        Returns:
+            fn の戻り値（全て失敗した場合は最後の例外を送出する）
+        """
+        delays = self.delays()
+        while True:
+            try:
+                return fn()
+            except self.retry_on:
+                delay = next(delays, None)
+                if delay is None:
+                    raise
+                sleep(delay)
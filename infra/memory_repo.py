@@ -0,0 +1,40 @@
+"""
+メモリ上のプレイヤーステータス保存（SQLite非依存、シミュレーション用）
+"""
+from typing import Optional, Dict
+from domain.exp import LevelCurve, check_level_up
+
+
+class InMemoryRepository:
+    """DatabaseRepositoryと同じインターフェースを持つメモリ上のリポジトリ"""
+
+    def __init__(self, level: int = 1, exp: int = 0, curve: Optional[LevelCurve] = None):
+        self.level = level
+        self.exp = exp
+        self.curve = curve
+        self.total_exp_gained = 0  # これまでに追加された経験値の合計
+
+    def get_player_stats(self, player_id: Optional[str] = None) -> Dict[str, int]:
+        """プレイヤーの経験値とレベルを取得（プレイヤーは1人なのでplayer_idは使わない）"""
+        return {'level': self.level, 'exp': self.exp}
+
+    def update_exp(self, exp_to_add: int, player_id: Optional[str] = None) -> Optional[Dict]:
+        """
+        経験値を追加し、レベルアップ判定を行う
+
+        Args:
+            exp_to_add: 追加する経験値
+
+        Returns:
+            dict: check_level_up()の戻り値
+        """
+        level_up_result = check_level_up(self.level, self.exp, exp_to_add, self.curve)
+        self.total_exp_gained += exp_to_add
+        self.level = level_up_result['level']
+        self.exp = level_up_result['exp']
+        return level_up_result
+
+    def reset_player_stats(self, player_id: Optional[str] = None):
+        """プレイヤーステータスをリセット"""
+        self.level = 1
+        self.exp = 0
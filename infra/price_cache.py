@@ -0,0 +1,211 @@
+"""
+株価データの永続キャッシュ（圧縮NumPy形式）
+"""
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from domain.columnar import OHLCV_COLUMNS
+from domain.compact import CompactOHLCV
+from domain.trading_calendar import from_day_ordinal, to_day_ordinal
+
+
+@dataclass
+class CacheEntry:
+    """キャッシュされた1銘柄分のデータ"""
+    data: pd.DataFrame
+    covered_start: date  # 取得済み期間の開始日（含む）
+    covered_end: date  # 取得済み期間の終了日（含まない）
+
+    def covers(self, start: date, end: date) -> bool:
+        """指定期間 [start, end) を全て取得済みかどうか"""
+        return self.covered_start <= start and end <= self.covered_end
+
+    def missing_range(self, start: date, end: date) -> Tuple[date, date]:
+        """
+        期間 [start, end) を満たすために追加取得すべき期間を返す
+
+        取得後もキャッシュの期間が連続するように、不足分の末尾（または先頭）だけでなく
+        キャッシュとの間の空白も含めた期間を返す。
+
+        Returns:
+            Tuple[date, date]: 追加取得する期間 [開始日, 終了日)
+        """
+        fetch_start = start if start < self.covered_start else self.covered_end
+        fetch_end = end if end > self.covered_end else self.covered_start
+        return fetch_start, fetch_end
+
+    def slice(self, start: date, end: date) -> pd.DataFrame:
+        """指定期間 [start, end) のデータを切り出す"""
+        index = self.data.index
+        lo = index.searchsorted(pd.Timestamp(start), side='left')
+        hi = index.searchsorted(pd.Timestamp(end), side='left')
+        return self.data.iloc[lo:hi]
+
+
+class PriceCache:
+    """
+    ティッカーごとのOHLCVデータをディスクに保存するキャッシュ
+
+    1銘柄につき1ファイル（.npz）で、取得済みの期間を一緒に記録する。
+    期間 [start, end) がキャッシュに含まれていればネットワークなしで応答できる。
+    compact=True の場合は日付を int32、価格・出来高をコンパクトな型（CompactOHLCV）で保存する。
+    読み込みはどちらの形式のファイルにも対応する。
+    """
+
+    def __init__(self, cache_dir: str = ".cache/prices", compact: bool = False):
+        """
+        Args:
+            cache_dir: 保存先ディレクトリ
+            compact: Trueの場合はコンパクトな型で保存する
+        """
+        self.cache_dir = Path(cache_dir)
+        self.compact = compact
+
+    def _path(self, ticker: str) -> Path:
+        """ティッカーに対応するキャッシュファイルのパス"""
+        safe_name = re.sub(r'[^A-Za-z0-9._-]', '_', ticker)
+        return self.cache_dir / f"{safe_name}.npz"
+
+    def load(self, ticker: str) -> Optional[CacheEntry]:
+        """
+        キャッシュを読み込む
+
+        Args:
+            ticker: ティッカーシンボル
+
+        Returns:
+            Optional[CacheEntry]: キャッシュ（存在しない・壊れている場合はNone）
+        """
+        path = self._path(ticker)
+        if not path.exists():
+            return None
+
+        try:
+            with np.load(path) as npz:
+                if 'prices' in npz:
+                    days, values = CompactOHLCV(
+                        ordinals=npz['days'],
+                        prices=npz['prices'],
+                        volume=npz['volume'],
+                        price_scale=int(npz['price_scale'])
+                    ).decode()
+                    index = pd.DatetimeIndex(days.astype('datetime64[D]').astype('datetime64[ns]'), name='Date')
+                    data = pd.DataFrame(values.T, index=index, columns=list(OHLCV_COLUMNS))
+                else:
+                    index = pd.DatetimeIndex(npz['dates'].astype('datetime64[ns]'), name='Date')
+                    data = pd.DataFrame(
+                        {column: npz[column] for column in OHLCV_COLUMNS},
+                        index=index
+                    )
+                covered_start, covered_end = npz['covered']
+        except Exception as e:
+            print(f"キャッシュ読み込みエラー ({ticker}): {e}")
+            return None
+
+        return CacheEntry(
+            data=data,
+            covered_start=from_day_ordinal(covered_start),
+            covered_end=from_day_ordinal(covered_end)
+        )
+
+    def get(self, ticker: str, start: date, end: date) -> Optional[pd.DataFrame]:
+        """
+        期間 [start, end) が取得済みの場合のみデータを返す
+
+        Args:
+            ticker: ティッカーシンボル
+            start: 開始日（含む）
+            end: 終了日（含まない）
+
+        Returns:
+            Optional[pd.DataFrame]: キャッシュヒット時はデータ、ミス時はNone
+        """
+        entry = self.load(ticker)
+        if entry is None or not entry.covers(start, end):
+            return None
+        return entry.slice(start, end)
+
+    def store(self, ticker: str, data: pd.DataFrame, covered_start: date, covered_end: date):
+        """
+        データと取得済み期間を保存する（一時ファイル経由でアトミックに置き換え）
+
+        Args:
+            ticker: ティッカーシンボル
+            data: OHLCVデータ
+            covered_start: 取得済み期間の開始日（含む）
+            covered_end: 取得済み期間の終了日（含まない）
+        """
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(ticker)
+
+        if self.compact:
+            index = data.index.tz_localize(None) if data.index.tz is not None else data.index
+            compact = CompactOHLCV.encode(
+                index.to_numpy(dtype='datetime64[D]').astype(np.int64),
+                np.vstack([data[column].to_numpy(dtype=np.float64) for column in OHLCV_COLUMNS])
+            )
+            arrays = {
+                'days': compact.ordinals,
+                'prices': compact.prices,
+                'volume': compact.volume,
+                'price_scale': np.array(compact.price_scale),
+            }
+        else:
+            arrays = {column: data[column].to_numpy() for column in OHLCV_COLUMNS}
+            arrays['dates'] = data.index.to_numpy(dtype='datetime64[ns]')
+        arrays['covered'] = np.array([to_day_ordinal(covered_start), to_day_ordinal(covered_end)], dtype=np.int64)
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, **arrays)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def merge(
+        self,
+        ticker: str,
+        entry: Optional[CacheEntry],
+        new_data: pd.DataFrame,
+        new_start: date,
+        new_end: date
+    ) -> CacheEntry:
+        """
+        新しく取得したデータを既存のキャッシュに統合して保存する
+
+        Args:
+            ticker: ティッカーシンボル
+            entry: 既存のキャッシュ（なければNone）
+            new_data: 新しく取得したデータ
+            new_start: 新しく取得した期間の開始日（含む）
+            new_end: 新しく取得した期間の終了日（含まない）
+
+        Returns:
+            CacheEntry: 統合後のキャッシュ
+        """
+        new_data = new_data.loc[:, list(OHLCV_COLUMNS)]
+
+        if entry is None:
+            merged = CacheEntry(new_data.sort_index(), new_start, new_end)
+        else:
+            combined = pd.concat([entry.data, new_data])
+            combined = combined[~combined.index.duplicated(keep='last')].sort_index()
+            merged = CacheEntry(
+                data=combined,
+                covered_start=min(entry.covered_start, new_start),
+                covered_end=max(entry.covered_end, new_end)
+            )
+
+        self.store(ticker, merged.data, merged.covered_start, merged.covered_end)
+        return merged
@@ -0,0 +1,198 @@
+"""
+シナリオパック: 多数の銘柄・年のOHLCVを1ファイルにまとめた配布用フォーマット
+"""
+import json
+import os
+import random
+import struct
+import tempfile
+import threading
+import zlib
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from domain.columnar import OHLCV_COLUMNS, ColumnarPrices
+from domain.compact import CompactOHLCV
+from domain.trading_calendar import from_day_ordinal, to_day_ordinal
+
+
+# ファイル構成:
+#   ヘッダー（16バイト）: マジック 8バイト + インデックスの位置 8バイト（リトルエンディアン）
+#   ブロック: 銘柄・年ごとに zlib 圧縮した [日付(int64, n) + OHLCV(float64, 5×n)]
+#             コンパクト形式の場合は [日付(int32, n) + 価格(4×n) + 出来高(n)]（型はインデックスに記録）
+#   インデックス: zlib 圧縮したJSON（ブロックの位置・長さ・行数・開始日・終了日・コンパクト形式の型）
+PACK_MAGIC = b"TLPACK01"
+_HEADER = struct.Struct("<8sQ")
+
+ScenarioKey = Tuple[str, int, int]  # (ticker, year, days_before_start)
+
+
+def _encode_block(data: pd.DataFrame, compact: bool) -> Tuple[bytes, int, Optional[Dict]]:
+    """
+    OHLCVのDataFrameを圧縮したブロックにする
+
+    Returns:
+        Tuple[bytes, int, Optional[Dict]]: (ブロック, 行数, コンパクト形式の型。float64のままの場合はNone)
+    """
+    index = data.index.tz_localize(None) if data.index.tz is not None else data.index
+    days = index.to_numpy(dtype='datetime64[D]').astype('<i8')
+    values = np.vstack([data[column].to_numpy(dtype='<f8') for column in OHLCV_COLUMNS])
+    if not compact:
+        return zlib.compress(days.tobytes() + values.tobytes(), 6), len(days), None
+
+    packed = CompactOHLCV.encode(days, values)
+    raw = packed.ordinals.tobytes() + packed.prices.tobytes() + packed.volume.tobytes()
+    return zlib.compress(raw, 6), len(days), packed.describe()
+
+
+def _decode_compact_block(raw: bytes, rows: int, encoding: Dict) -> Tuple[np.ndarray, np.ndarray]:
+    """コンパクト形式のブロックを (日付 int64, OHLCV float64) に戻す"""
+    days_dtype = np.dtype(encoding['days'])
+    prices_dtype = np.dtype(encoding['prices'])
+    prices_offset = rows * days_dtype.itemsize
+    volume_offset = prices_offset + 4 * rows * prices_dtype.itemsize
+    packed = CompactOHLCV(
+        ordinals=np.frombuffer(raw, dtype=days_dtype, count=rows),
+        prices=np.frombuffer(raw, dtype=prices_dtype, count=4 * rows, offset=prices_offset).reshape(4, rows),
+        volume=np.frombuffer(raw, dtype=np.dtype(encoding['volume']), count=rows, offset=volume_offset),
+        price_scale=encoding['price_scale']
+    )
+    return packed.decode()
+
+
+class ScenarioPackWriter:
+    """シナリオパックを書き出す（close() でインデックスを書き込んでファイルを確定する）"""
+
+    def __init__(self, path: str, compact: bool = True):
+        """
+        Args:
+            path: 出力先のパス
+            compact: Trueの場合は表示する値が変わらない範囲で小さい型に詰める（CompactOHLCV）
+        """
+        self.path = Path(path)
+        self.compact = compact
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(prefix=self.path.name + ".", suffix=".tmp", dir=self.path.parent)
+        self._file = os.fdopen(fd, 'wb')
+        self._file.write(_HEADER.pack(PACK_MAGIC, 0))
+        self._entries: List[Dict] = []
+
+    def add(self, ticker: str, year: int, days_before_start: int, data: pd.DataFrame, start_date: date, end_date: date):
+        """銘柄・年のデータを1ブロックとして追加する"""
+        block, rows, encoding = _encode_block(data, self.compact)
+        entry = {
+            'ticker': ticker,
+            'year': year,
+            'days_before_start': days_before_start,
+            'offset': self._file.tell(),
+            'length': len(block),
+            'rows': rows,
+            'start': to_day_ordinal(start_date),
+            'end': to_day_ordinal(end_date),
+        }
+        if encoding is not None:
+            entry['encoding'] = encoding
+        self._entries.append(entry)
+        self._file.write(block)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self):
+        """インデックスを書き込み、ファイルをアトミックに配置する"""
+        index_offset = self._file.tell()
+        self._file.write(zlib.compress(json.dumps(self._entries).encode('utf-8')))
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(PACK_MAGIC, index_offset))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """書きかけのファイルを捨てる"""
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self) -> 'ScenarioPackWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ScenarioPack:
+    """
+    シナリオパックを読み込む
+
+    開くときにインデックスだけを読み、各銘柄・年は1回のシークと読み込みで取り出す。
+    ネットワークには一切接続しない。
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        with open(self.path, 'rb') as f:
+            magic, index_offset = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != PACK_MAGIC:
+                raise ValueError(f"シナリオパックではありません: {path}")
+            f.seek(index_offset)
+            entries = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+        self._entries: Dict[ScenarioKey, Dict] = {
+            (entry['ticker'], entry['year'], entry['days_before_start']): entry for entry in entries
+        }
+        self._file = open(self.path, 'rb')
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: ScenarioKey) -> bool:
+        return key in self._entries
+
+    def keys(self) -> List[ScenarioKey]:
+        """収録されている (ticker, year, days_before_start) の一覧"""
+        return list(self._entries)
+
+    def random_key(self, rng: Optional[random.Random] = None) -> ScenarioKey:
+        """収録されているシナリオをランダムに1つ選ぶ"""
+        return (rng or random).choice(self.keys())
+
+    def load(self, ticker: str, year: int, days_before_start: int = 220) -> Optional[ColumnarPrices]:
+        """
+        銘柄・年のデータを読み込む
+
+        Returns:
+            Optional[ColumnarPrices]: 読み取り専用のデータ（収録されていない場合はNone）
+        """
+        entry = self._entries.get((ticker, year, days_before_start))
+        if entry is None:
+            return None
+
+        with self._lock:
+            self._file.seek(entry['offset'])
+            block = self._file.read(entry['length'])
+
+        raw = zlib.decompress(block)
+        rows = entry['rows']
+        if 'encoding' in entry:
+            ordinals, values = _decode_compact_block(raw, rows, entry['encoding'])
+            ordinals.setflags(write=False)
+            values.setflags(write=False)
+        else:
+            ordinals = np.frombuffer(raw, dtype='<i8', count=rows)
+            values = np.frombuffer(raw, dtype='<f8', offset=rows * 8).reshape(len(OHLCV_COLUMNS), rows)
+        return ColumnarPrices(
+            ordinals=ordinals,
+            values=values,
+            start_date=from_day_ordinal(entry['start']),
+            end_date=from_day_ordinal(entry['end'])
+        )
+
+    def close(self):
+        self._file.close()
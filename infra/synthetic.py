@@ -0,0 +1,184 @@
+"""
+合成株価データの生成（ネットワーク不要・シード固定で再現可能）
+"""
+import zlib
+from dataclasses import dataclass
+from datetime import date
+from functools import lru_cache
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from domain.trading_calendar import to_day_ordinal
+from .price_cache import PriceCache
+from .columnar_store import ColumnarStore
+from .data_fetcher import StockDataFetcher
+
+
+@dataclass(frozen=True)
+class Regime:
+    """相場の局面（年率のドリフトとボラティリティ）"""
+    name: str
+    drift: float
+    volatility: float
+    weight: float  # 局面が切り替わるときに選ばれる重み
+
+
+DEFAULT_REGIMES = (
+    Regime("calm", 0.05, 0.12, 0.4),
+    Regime("bull", 0.25, 0.20, 0.3),
+    Regime("bear", -0.30, 0.32, 0.2),
+    Regime("crisis", -0.80, 0.70, 0.1),
+)
+
+TRADING_DAYS_PER_YEAR = 252
+
+# 系列全体のトレンドの上限（対数。長い系列でも価格が0や無限大に発散しないように）
+_MAX_LOG_TREND = float(np.log(1e6))
+
+
+def business_day_ordinals(start: date, rows: int) -> np.ndarray:
+    """
+    開始日以降の平日を rows 日分、エポックからの日数で返す（祝日は考慮しない）
+
+    Returns:
+        np.ndarray: 営業日（int64）
+    """
+    first = to_day_ordinal(start)
+    weekday = (first + 3) % 7  # 1970-01-01 は木曜日（月曜日=0）
+    if weekday >= 5:
+        first += 7 - weekday
+        weekday = 0
+    k = np.arange(rows, dtype=np.int64) + weekday
+    return first - weekday + (k // 5) * 7 + k % 5
+
+
+def generate_ohlcv(
+    rows: int,
+    seed: int = 0,
+    start: date = date(2000, 1, 3),
+    initial_price: float = 1000.0,
+    regimes: Tuple[Regime, ...] = DEFAULT_REGIMES,
+    mean_regime_days: float = 60.0,
+    gap_probability: float = 0.02,
+    gap_scale: float = 0.05,
+    long_run_drift: float = 0.05,
+    base_volume: float = 1_000_000.0
+) -> pd.DataFrame:
+    """
+    局面の切り替わりと窓開けを含む幾何ブラウン運動で日足のOHLCVを生成する
+
+    全ての計算をベクトル演算で行うので、1000万本でも数秒で生成できる。
+    同じ引数からは常に同じデータを生成する。
+
+    Args:
+        rows: 生成する本数
+        seed: 乱数のシード
+        start: 最初の営業日（土日の場合は次の月曜日）
+        initial_price: 初日の始値
+        regimes: 相場の局面
+        mean_regime_days: 局面の平均継続日数
+        gap_probability: 大きな窓開け（ニュースなど）が起きる確率
+        gap_scale: 大きな窓開けの標準偏差（対数リターン）
+        long_run_drift: 系列全体のトレンド（年率の対数リターン。全体で100万倍を超えないように抑える）
+        base_volume: 平常時の出来高
+
+    Returns:
+        pd.DataFrame: StockDataFetcher.fetch_data() と同じ列（Open, High, Low, Close, Volume）
+    """
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / TRADING_DAYS_PER_YEAR
+
+    # 局面: 幾何分布の継続日数で区切り、重みに従って局面を選ぶ
+    runs = max(1, int(rows / mean_regime_days * 2) + 2)
+    lengths = rng.geometric(1.0 / mean_regime_days, size=runs)
+    while lengths.sum() < rows:
+        lengths = np.concatenate([lengths, rng.geometric(1.0 / mean_regime_days, size=runs)])
+    weights = np.array([regime.weight for regime in regimes])
+    chosen = rng.choice(len(regimes), size=len(lengths), p=weights / weights.sum())
+    regime_index = np.repeat(chosen, lengths)[:rows]
+    drift = np.array([regime.drift for regime in regimes])[regime_index]
+    volatility = np.array([regime.volatility for regime in regimes])[regime_index]
+
+    # 日中のリターン（始値→終値）と夜間のリターン（前日終値→始値）
+    sigma = volatility * np.sqrt(dt)
+    shocks = rng.standard_normal((3, rows))
+    intraday = (drift - 0.5 * volatility ** 2) * dt * 0.7 + sigma * 0.8 * shocks[0]
+    overnight = (drift - 0.5 * volatility ** 2) * dt * 0.3 + sigma * 0.6 * shocks[1]
+    overnight += (rng.random(rows) < gap_probability) * rng.normal(0.0, gap_scale, rows)
+    overnight[0] = 0.0
+    if rows > 1:
+        trend = np.clip(long_run_drift * dt * rows, -_MAX_LOG_TREND, _MAX_LOG_TREND)
+        excess = overnight.sum() + intraday.sum() - trend
+        overnight[1:] -= excess / (rows - 1)
+
+    log_open = np.log(initial_price) + np.cumsum(overnight) + np.concatenate(([0.0], np.cumsum(intraday)[:-1]))
+    log_close = log_open + intraday
+    open_ = np.exp(log_open)
+    close = np.exp(log_close)
+
+    # 高値・安値: 始値と終値の外側にボラティリティに比例したヒゲを付ける
+    wick = np.abs(shocks[2]) * sigma * 0.5
+    high = np.maximum(open_, close) * np.exp(wick * rng.random(rows))
+    low = np.minimum(open_, close) * np.exp(-wick * rng.random(rows))
+
+    # 出来高: 値動きが大きい日ほど多い（対数正規分布）
+    activity = 1.0 + 8.0 * np.abs(intraday + overnight) / np.maximum(sigma, 1e-12) * np.sqrt(dt)
+    volume = (base_volume * activity * rng.lognormal(0.0, 0.3, rows)).astype(np.int64)
+
+    days = business_day_ordinals(start, rows)
+    index = pd.DatetimeIndex(days.astype('datetime64[D]').astype('datetime64[s]'), name='Date')
+    return pd.DataFrame(
+        {'Open': open_, 'High': high, 'Low': low, 'Close': close, 'Volume': volume},
+        index=index
+    )
+
+
+class SyntheticSource:
+    """
+    StockDataFetcher の取得元として使える合成データ
+
+    銘柄ごとに (seed, ティッカー) から決まる系列を ORIGIN から HORIZON まで一度だけ生成し、
+    要求された期間を切り出す。期間を分けて取得しても同じ値になるので、キャッシュの追記とも整合する。
+    """
+
+    ORIGIN = date(1990, 1, 1)
+    HORIZON = date(2040, 1, 1)
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+
+    def download(self, ticker: str, start: date, end: date) -> pd.DataFrame:
+        """期間 [start, end) の合成データを返す"""
+        data = _synthetic_series(self.seed, ticker)
+        lo = data.index.searchsorted(pd.Timestamp(start), side='left')
+        hi = data.index.searchsorted(pd.Timestamp(end), side='left')
+        return data.iloc[lo:hi]
+
+    def download_many(self, tickers, start: date, end: date):
+        """複数銘柄の期間 [start, end) の合成データを返す"""
+        return {ticker: self.download(ticker, start, end) for ticker in tickers}
+
+
+@lru_cache(maxsize=64)
+def _synthetic_series(seed: int, ticker: str) -> pd.DataFrame:
+    rows = int(np.busday_count(SyntheticSource.ORIGIN, SyntheticSource.HORIZON))
+    ticker_seed = zlib.crc32(ticker.encode('utf-8'))
+    # 銘柄ごとに初値も変える（100円〜10000円）
+    initial_price = float(10 ** (2 + 2 * (ticker_seed % 1000) / 1000))
+    return generate_ohlcv(rows, seed=(seed << 32) | ticker_seed, start=SyntheticSource.ORIGIN, initial_price=initial_price)
+
+
+def synthetic_fetcher(seed: int = 0, cache_dir: Optional[str] = None) -> StockDataFetcher:
+    """
+    合成データを取得元とする StockDataFetcher を作る
+
+    キャッシュは実データと混ざらないよう、シードごとの別ディレクトリに保存する。
+    """
+    base = f"{cache_dir or '.cache/synthetic'}/{seed}"
+    return StockDataFetcher(
+        cache=PriceCache(f"{base}/prices"),
+        columnar=ColumnarStore(f"{base}/columnar"),
+        source=SyntheticSource(seed)
+    )
@@ -4,9 +4,12 @@
 import streamlit as st
 import pandas as pd
 from datetime import date
-from typing import List, Optional
+from typing import Dict, List, Optional
 from domain.chart import create_candlestick_chart
+from domain.chart_session import ChartSession
 from domain.calculations import calculate_sma_for_display
+from domain.indicators import IndicatorLibrary, build_indicator_overlays
+from domain.moving_average import MovingAverageEngine
 
 
 def render_chart(
@@ -18,7 +21,12 @@ def render_chart(
     player_level: int,
     current_date: date,
     year: int,
-    ticker: str
+    ticker: str,
+    sma_engine: Optional[MovingAverageEngine] = None,
+    indicator_library: Optional[IndicatorLibrary] = None,
+    indicators_enabled: Optional[Dict[str, bool]] = None,
+    chart_session: Optional[ChartSession] = None,
+    binary: bool = False
 ):
     """
     チャートを描画
@@ -33,27 +41,68 @@ def render_chart(
         current_date: 現在の日付
         year: 年
         ticker: ティッカーシンボル
+        sma_engine: データセットのSMAエンジン（Noneの場合は毎回計算）
+        indicator_library: データセットの指標ライブラリ（Noneの場合は指標を表示しない）
+        indicators_enabled: 指標ごとの有効/無効
+        chart_session: セッションのチャート状態（指定した場合はFigureを作り直さずに変わった配列だけを差し替える）
+        binary: Trueの場合、日付を整数・価格を float32 の型付き配列にして送信量を減らす
     """
     st.markdown(f"#### {ticker} - {current_date.strftime('%Y年%m月%d日')} までのチャート")
 
-    # SMA計算
-    sma_25, sma_75 = calculate_sma_for_display(sma_calc_data, display_data)
-
-    # チャート生成
-    fig = create_candlestick_chart(
-        display_data=display_data,
-        buy_dates=buy_dates,
-        sma_25_enabled=sma_25_enabled,
-        sma_75_enabled=sma_75_enabled,
-        sma_25_data=sma_25 if sma_25_enabled else None,
-        sma_75_data=sma_75 if sma_75_enabled else None,
-        player_level=player_level,
-        current_date=current_date,
-        year=year,
-        ticker=ticker
-    )
-
-    st.plotly_chart(fig, use_container_width=True)
+    # テクニカル指標（表示データはSMA計算用データの末尾なので、位置で切り出す）
+    end = len(sma_calc_data)
+    start = end - len(display_data)
+    indicator_overlays = None
+    if indicator_library is not None and indicators_enabled:
+        indicator_overlays = build_indicator_overlays(
+            indicator_library,
+            indicators_enabled,
+            player_level,
+            start,
+            end
+        )
+
+    if chart_session is not None:
+        # テンプレートのFigureの変わった配列だけを差し替える
+        sma_windows = tuple(
+            window for window, enabled in ((25, sma_25_enabled), (75, sma_75_enabled)) if enabled
+        )
+        chart_session.update(
+            start,
+            end,
+            buy_dates,
+            player_level,
+            current_date,
+            year,
+            ticker,
+            sma_windows=sma_windows,
+            sma_engine=sma_engine,
+            indicator_overlays=indicator_overlays,
+            binary=binary
+        )
+        fig = chart_session.figure
+    else:
+        # SMA計算
+        sma_25, sma_75 = calculate_sma_for_display(sma_calc_data, display_data, engine=sma_engine)
+
+        # チャート生成
+        fig = create_candlestick_chart(
+            display_data=display_data,
+            buy_dates=buy_dates,
+            sma_25_enabled=sma_25_enabled,
+            sma_75_enabled=sma_75_enabled,
+            sma_25_data=sma_25 if sma_25_enabled else None,
+            sma_75_data=sma_75 if sma_75_enabled else None,
+            player_level=player_level,
+            current_date=current_date,
+            year=year,
+            ticker=ticker,
+            indicator_overlays=indicator_overlays,
+            binary=binary
+        )
+
+    # 同じキーで描画して同じチャートの要素を使い回す（送るのは毎回Figure全体）
+    st.plotly_chart(fig, use_container_width=True, key="price_chart")
 
     # データテーブル（オプション）
     with st.expander("表示中のデータを確認", expanded=False):
@@ -5,6 +5,9 @@ import streamlit as st
 from datetime import date
 from typing import Dict
 
+from domain.exp import DEFAULT_LEVEL_CURVE
+from domain.metrics import MetricsRow
+
 
 def render_hud(
     player_stats: Dict[str, int],
@@ -31,7 +34,7 @@ def render_hud(
         display_data_count: 表示データ数
         total_data_count: 全データ数
     """
-    required_exp = player_stats['level'] * 50
+    required_exp = DEFAULT_LEVEL_CURVE.required_exp(player_stats['level'])
     exp_progress = (player_stats['exp'] / required_exp) * 100 if required_exp > 0 else 0
 
     hud_col1, hud_col2, hud_col3, hud_col4 = st.columns(4)
@@ -65,30 +68,24 @@ def render_hud(
         st.caption(f"進捗: {display_data_count}日 / {total_data_count}日")
 
 
-def render_metrics(
-    current_price: float,
-    change: float,
-    change_pct: float,
-    high: float,
-    low: float
-):
+def render_metrics(metrics: MetricsRow):
     """
     メトリクス（終値・前日比・高値・安値）を描画
 
     Args:
-        current_price: 現在の終値
-        change: 前日比（金額）
-        change_pct: 前日比（%）
-        high: 高値
-        low: 安値
+        metrics: 現在日の派生指標（MetricsTable.row() の結果）
     """
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric("終値", f"¥{current_price:,.0f}")
+        st.metric("終値", f"¥{metrics.close:,.0f}")
     with col2:
-        st.metric("前日比", f"¥{change:+,.0f}", f"{change_pct:+.2f}%")
+        st.metric("前日比", f"¥{metrics.change:+,.0f}", f"{metrics.change_pct:+.2f}%")
+        if metrics.gap_direction:
+            gap_label = "窓開け（上）" if metrics.gap_direction > 0 else "窓開け（下）"
+            st.caption(f"{gap_label}: {metrics.gap_pct:+.2f}%")
     with col3:
-        st.metric("高値", f"¥{high:,.0f}")
+        st.metric("高値", f"¥{metrics.high:,.0f}")
+        st.caption(f"期間高値: ¥{metrics.range_high:,.0f}")
     with col4:
-        st.metric("安値", f"¥{low:,.0f}")
-
+        st.metric("安値", f"¥{metrics.low:,.0f}")
+        st.caption(f"期間安値: ¥{metrics.range_low:,.0f}")
@@ -4,6 +4,8 @@
 import streamlit as st
 from typing import Dict, Optional
 
+from domain.indicators import INDICATOR_LABELS, INDICATOR_UNLOCK_LEVELS, SMA_UNLOCK_LEVELS
+
 
 def handle_level_up_ui(result: Optional[Dict]) -> None:
     """
@@ -39,18 +41,26 @@ def handle_level_up_ui(result: Optional[Dict]) -> None:
             'condition': lambda: True,
             'action': lambda: None
         },
-        4: {
+        SMA_UNLOCK_LEVELS[25]: {
             'toast_message': f"🎉 レベルアップ！ レベル {old_level} → レベル {new_level}",
             'condition': lambda: True,
             'action': lambda: setattr(st.session_state, 'sma_25_enabled', True)
         },
-        5: {
+        SMA_UNLOCK_LEVELS[75]: {
             'toast_message': f"🎉 レベルアップ！ レベル {old_level} → レベル {new_level}",
             'condition': lambda: True,
             'action': lambda: setattr(st.session_state, 'sma_75_enabled', True)
         }
     }
 
+    # テクニカル指標が解放されるレベル
+    for indicator_name, unlock_level in INDICATOR_UNLOCK_LEVELS.items():
+        level_handlers.setdefault(unlock_level, {
+            'toast_message': f"🛠 レベル {new_level} で「{INDICATOR_LABELS[indicator_name]}」が解放されました！",
+            'condition': lambda: True,
+            'action': lambda: None
+        })
+
     # 現在のレベルに対応する処理を実行
     if new_level in level_handlers:
         handler = level_handlers[new_level]
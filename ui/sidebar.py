@@ -6,6 +6,9 @@ from datetime import date, timedelta
 from typing import Dict, Optional
 import pandas as pd
 
+from domain.calculations import MAX_DISPLAY_BUSINESS_DAYS
+from domain.indicators import INDICATOR_LABELS, INDICATOR_UNLOCK_LEVELS, SMA_UNLOCK_LEVELS
+
 
 def render_control_sidebar(
     current_date: date,
@@ -60,7 +63,10 @@ def render_display_period_selector() -> int:
     period_options = {
         "3ヶ月（約60営業日）": 60,
         "6ヶ月（約120営業日）": 120,
-        "1年（約250営業日）": 250
+        "1年（約250営業日）": 250,
+        # 長い期間は本数が多くなりすぎないよう週足・月足にまとめて描画する
+        "2年（約500営業日）": 500,
+        "5年（約1250営業日）": MAX_DISPLAY_BUSINESS_DAYS
     }
 
     selected_period = st.sidebar.selectbox(
@@ -123,7 +129,12 @@ def render_trading_sidebar(
     return None
 
 
-def render_equipment_sidebar(player_level: int, sma_25_enabled: bool, sma_75_enabled: bool) -> Dict[str, bool]:
+def render_equipment_sidebar(
+    player_level: int,
+    sma_25_enabled: bool,
+    sma_75_enabled: bool,
+    indicators_enabled: Optional[Dict[str, bool]] = None
+) -> Dict:
     """
     装備設定サイドバーを描画
 
@@ -131,30 +142,47 @@ def render_equipment_sidebar(player_level: int, sma_25_enabled: bool, sma_75_ena
         player_level: プレイヤーのレベル
         sma_25_enabled: SMA25の現在の状態
         sma_75_enabled: SMA75の現在の状態
+        indicators_enabled: その他の指標の現在の状態 {指標名: bool}
 
     Returns:
-        dict: {'sma_25_enabled': bool, 'sma_75_enabled': bool}
+        dict: {'sma_25_enabled': bool, 'sma_75_enabled': bool, 'indicators': {指標名: bool}}
     """
+    indicators_enabled = indicators_enabled or {}
     st.sidebar.markdown("---")
     with st.sidebar.expander("🛠 装備（インジケーター）", expanded=True):
         new_sma_25_enabled = sma_25_enabled
         new_sma_75_enabled = sma_75_enabled
 
         # 移動平均線 (25日) のチェックボックス
-        if player_level < 4:
-            st.checkbox("🔒 移動平均線 (25日) - Lv.4で解放", value=False, disabled=True)
+        if player_level < SMA_UNLOCK_LEVELS[25]:
+            st.checkbox(f"🔒 移動平均線 (25日) - Lv.{SMA_UNLOCK_LEVELS[25]}で解放", value=False, disabled=True)
         else:
             new_sma_25_enabled = st.checkbox("📈 移動平均線 (25日)", value=sma_25_enabled)
 
         # 移動平均線 (75日) のチェックボックス
-        if player_level < 5:
-            st.checkbox("🔒 移動平均線 (75日) - Lv.5で解放", value=False, disabled=True)
+        if player_level < SMA_UNLOCK_LEVELS[75]:
+            st.checkbox(f"🔒 移動平均線 (75日) - Lv.{SMA_UNLOCK_LEVELS[75]}で解放", value=False, disabled=True)
         else:
             new_sma_75_enabled = st.checkbox("📈 移動平均線 (75日)", value=sma_75_enabled)
 
+        # その他のテクニカル指標（レベルに応じて解放）
+        new_indicators_enabled = {}
+        for name, unlock_level in INDICATOR_UNLOCK_LEVELS.items():
+            label = INDICATOR_LABELS[name]
+            if player_level < unlock_level:
+                st.checkbox(f"🔒 {label} - Lv.{unlock_level}で解放", value=False, disabled=True, key=f"indicator_{name}_locked")
+                new_indicators_enabled[name] = False
+            else:
+                new_indicators_enabled[name] = st.checkbox(
+                    f"📈 {label}",
+                    value=indicators_enabled.get(name, False),
+                    key=f"indicator_{name}"
+                )
+
     return {
         'sma_25_enabled': new_sma_25_enabled,
-        'sma_75_enabled': new_sma_75_enabled
+        'sma_75_enabled': new_sma_75_enabled,
+        'indicators': new_indicators_enabled
     }
 
 
@@ -184,6 +212,24 @@ def render_skip_buttons_sidebar(current_date: date, end_date: date) -> Optional[
     return None
 
 
+def render_scenario_sidebar(scenario_count: int) -> bool:
+    """
+    シナリオ選択をサイドバーに描画（シナリオパックがない場合は何も描画しない）
+
+    Args:
+        scenario_count: シナリオパックに収録されているシナリオ数
+
+    Returns:
+        bool: ランダムシナリオボタンが押されたかどうか
+    """
+    if scenario_count == 0:
+        return False
+    st.sidebar.markdown("---")
+    st.sidebar.markdown("**🎲 シナリオ**")
+    st.sidebar.caption(f"{scenario_count}件のシナリオから選びます。")
+    return st.sidebar.button("ランダムなシナリオで始める", use_container_width=True)
+
+
 def render_debug_sidebar() -> bool:
     """
     デバッグボタンをサイドバーに描画